@@ -1,94 +1,49 @@
 import tkinter as tk
 from tkinter import messagebox, filedialog, ttk
-import json
-import os
-from datetime import datetime
-import csv
-from PIL import Image, ImageTk
-import sys
-import threading  # Importar threading para el Lock
-
-# Crear un objeto Lock global
-file_lock = threading.Lock()
+import queue
+from datetime import date
+from queue_store import abrir_store
+from cola_hospital import PRIORIDADES, TurnoDuplicado
+import metricas
+from exportacion import ExportacionEnSegundoPlano, tipos_archivo
+from estimacion import formato_espera
+from asignacion import Asignador
+from persistencia import Persistencia
+from logos import logo
 
 class ModuloAdmision:
     def __init__(self):
         self.archivo_datos = 'datos_hospital.json'
+        metricas.iniciar('admision')
+        store = abrir_store(self.archivo_datos)
+        store.archivar()  # Días anteriores al archivo histórico, snapshot sólo de hoy
+        # Las escrituras van al hilo de persistencia; la ventana lee la réplica
+        self.persistencia = Persistencia(store)
+        self.store = self.persistencia.replica
+        self.asignador = Asignador(self.store)
+        self.dia_actual = date.today().isoformat()
         self.datos = self.cargar_datos()
         self.logo = None
         self.setup_ui()
+        self.persistencia.iniciar(self.root)
+        self.root.after(60000, self.revisar_cambio_dia)
 
-    def cargar_datos(self):
-        with file_lock:  # Bloquear acceso al archivo
-            datos_base = {
-                'especialidades': [
-                    {'nombre': 'Traumatología', 'consultorio': 'Consultorio 1'},
-                    {'nombre': 'Internista', 'consultorio': 'Consultorio 2'},
-                    {'nombre': 'Cirugía', 'consultorio': 'Consultorio 3'},
-                    {'nombre': 'Pediatría', 'consultorio': 'Consultorio 4'},
-                    {'nombre': 'Ginecología', 'consultorio': 'Consultorio 5'},
-                    {'nombre': 'Neurología', 'consultorio': 'Consultorio 6'},
-                    {'nombre': 'Urólogo', 'consultorio': 'Consultorio 7'},
-                    {'nombre': 'Cardiología', 'consultorio': 'Consultorio 8'},
-                    {'nombre': 'Radiología', 'consultorio': 'Consultorio 9'},
-                    {'nombre': 'Medicina', 'consultorio': 'Consultorio 10'},
-                    {'nombre': 'Obstetricia 1', 'consultorio': 'Consultorio 11'},
-                    {'nombre': 'Obstetricia 2', 'consultorio': 'Consultorio 12'},
-                    {'nombre': 'Psicología', 'consultorio': 'Consultorio 13'},
-                    {'nombre': 'Dental', 'consultorio': 'Consultorio 14'}
-                ],
-                'pacientes': {
-                    "Consultorio 1" : [],
-                    "Consultorio 2" : [],
-                    "Consultorio 3" : [],
-                    "Consultorio 4" : [],
-                    "Consultorio 5" : [],
-                    "Consultorio 6" : [],
-                    "Consultorio 7" : [],
-                    "Consultorio 8" : [],
-                    "Consultorio 9" : [],
-                    "Consultorio 10" : [],
-                    "Consultorio 11" : [],
-                    "Consultorio 12" : [],
-                    "Consultorio 13" : [],
-                    "Consultorio 14" : [],
-                    
-                    },
-                'ultimo_llamado': None
-            }
+    def revisar_cambio_dia(self):
+        """A medianoche archiva el día que terminó."""
+        try:
+            hoy = date.today().isoformat()
+            if hoy != self.dia_actual:
+                self.persistencia.enviar('archivar', hoy, clave='archivar')
+                self.dia_actual = hoy
+        except Exception as e:
+            print(f"No se pudo archivar el día anterior: {e}")
+        finally:
+            self.root.after(60000, self.revisar_cambio_dia)
 
-            try:
-                if os.path.exists(self.archivo_datos):
-                    with open(self.archivo_datos, 'r', encoding='utf-8') as f:
-                        datos = json.load(f)
-                        self.validar_estructura_datos(datos, datos_base)
-                        return datos
-                else:
-                    self.guardar_datos(datos_base)
-                    return datos_base
-            except Exception as e:
-                messagebox.showerror("Error", f"No se pudo cargar los datos: {str(e)}")
-                return datos_base
-
-    def validar_estructura_datos(self, datos, datos_base):
-        """Valida que la estructura de los datos esté completa, de lo contrario, la ajusta."""
-        for key in datos_base:
-            if key not in datos:
-                datos[key] = datos_base[key]
-        return datos
-
-    def guardar_datos(self, datos=None):
-        with file_lock:  # Bloquear acceso al archivo
-            """Guarda los datos en un archivo JSON de manera segura."""
-            if not datos:
-                datos = self.datos
-            try:
-                with open(self.archivo_datos, 'w', encoding='utf-8') as f:
-                    json.dump(datos, f, indent=4, ensure_ascii=False)
-                return True
-            except Exception as e:
-                messagebox.showerror("Error", f"No se pudieron guardar los datos: {str(e)}")
-                return False
+    @metricas.cronometro('cargar_datos')
+    def cargar_datos(self):
+        """Devuelve el estado actual de la cola (la réplica ya tiene los eventos recibidos)."""
+        return self.store.datos
 
     def setup_ui(self):
         self.root = tk.Tk()
@@ -121,7 +76,7 @@ class ModuloAdmision:
 
         # Crear el label para mostrar información
         self.info_label = tk.Label(main_frame, text="", font=('Arial', 12), fg='#009688', bg='#f0f8ff')
-        self.info_label.grid(row=5, column=0, columnspan=2, pady=10)
+        self.info_label.grid(row=6, column=0, columnspan=2, pady=10)
 
         # Frame para botones
         self.dibujar_botones(main_frame)
@@ -132,17 +87,8 @@ class ModuloAdmision:
     def cargar_logo(self, logo_frame):
         """Carga el logo del hospital de manera segura y lo coloca en la parte superior centrado."""
         try:
-             # Usamos la ruta correcta dependiendo de si es un ejecutable o no
-            if getattr(sys, 'frozen', False):
-               # Si el archivo es un ejecutable, la ruta será relativa al ejecutable
-               logo_path = os.path.join(sys._MEIPASS, 'logo_hospital.png')
-            else:
-               # Si estamos en desarrollo, usamos la ruta relativa al script
-               logo_path = 'logo_hospital.png'
-               
-            image = Image.open(logo_path)
-            image = image.resize((200, 200), Image.LANCZOS)  # Tamaño ajustado del logo
-            self.logo = ImageTk.PhotoImage(image)
+            # Ya redimensionado y en caché (ver logos.py), sin decodificar el original
+            self.logo = logo(200, 200)
             logo_label = tk.Label(logo_frame, image=self.logo, bg='#f0f8ff')
             logo_label.pack()  # Alineado al centro
         except Exception as e:
@@ -170,6 +116,7 @@ class ModuloAdmision:
                                                values=self.especialidades, state='readonly')
         self.especialidad_menu.config(font=('Arial', 12), width=38)
         self.especialidad_menu.grid(row=2, column=1, pady=5, sticky='ew')
+        self.especialidad_menu.bind('<<ComboboxSelected>>', self.sugerir_consultorio)
 
         tk.Label(main_frame, text="Consultorio:", **estilo_label).grid(row=3, column=0, sticky='w')
         self.consultorio_var = tk.StringVar(self.root)
@@ -181,16 +128,80 @@ class ModuloAdmision:
         self.consultorio_menu.config(font=('Arial', 12), width=38)
         self.consultorio_menu.grid(row=3, column=1, pady=5, sticky='ew')
 
+        tk.Label(main_frame, text="Prioridad:", **estilo_label).grid(row=4, column=0, sticky='w')
+        self.prioridad_var = tk.StringVar(self.root, value=PRIORIDADES[0])
+        self.prioridad_menu = ttk.Combobox(main_frame, textvariable=self.prioridad_var,
+                                            values=PRIORIDADES, state='readonly')
+        self.prioridad_menu.config(font=('Arial', 12), width=38)
+        self.prioridad_menu.grid(row=4, column=1, pady=5, sticky='ew')
+
+    def sugerir_consultorio(self, event=None):
+        """Preselecciona la sala del grupo de la especialidad con menor espera estimada."""
+        try:
+            sugerencia = self.asignador.sugerir(self.especialidad_var.get())
+        except Exception as e:
+            print(f"No se pudo sugerir consultorio: {e}")
+            return
+        if sugerencia is None:
+            self.info_label.config(text="No hay consultorios abiertos para esta especialidad")
+            return
+        consultorio, especialidad, minutos = sugerencia
+        self.especialidad_var.set(especialidad)
+        self.consultorio_var.set(consultorio)
+        self.info_label.config(text=f"Sugerido: {consultorio} (espera {formato_espera(minutos)})")
+
+    def mostrar_cierre_consultorio(self):
+        """Cierra o reabre una sala; al cerrar, su cola pasa a las demás salas del grupo."""
+        ventana = tk.Toplevel(self.root)
+        ventana.title("Cerrar / Abrir Consultorio")
+        ventana.geometry("420x180")
+        ventana.configure(bg='#f0f8ff')
+        ventana.transient(self.root)
+
+        tk.Label(ventana, text="Consultorio:", font=('Arial', 12), bg='#f0f8ff').pack(pady=(15, 5))
+        consultorio = tk.StringVar(ventana)
+        ttk.Combobox(ventana, textvariable=consultorio, values=self.todos_consultorios,
+                     state='readonly', font=('Arial', 12), width=20).pack()
+
+        def cerrar():
+            sala = consultorio.get()
+            if not sala:
+                return
+            ventana.destroy()
+            # Las reasignaciones se escriben en el hilo de persistencia, sobre su store
+            self.persistencia.enviar(
+                lambda store: self.asignador.cerrar(sala, store),
+                al_terminar=lambda movidos: messagebox.showinfo(
+                    "Consultorio cerrado", f"{sala} cerrado. {movidos} pacientes reasignados.", parent=self.root),
+                al_fallar=lambda e: messagebox.showerror(
+                    "Error", f"No se pudo redistribuir la cola: {e}", parent=self.root))
+
+        def abrir():
+            if consultorio.get():
+                self.asignador.abrir(consultorio.get())
+                ventana.destroy()
+
+        botones = tk.Frame(ventana, bg='#f0f8ff')
+        botones.pack(pady=15)
+        tk.Button(botones, text="Cerrar y redistribuir", command=cerrar, bg='#f44336', fg='white',
+                  font=('Arial', 11)).pack(side=tk.LEFT, padx=5)
+        tk.Button(botones, text="Reabrir", command=abrir, bg='#4CAF50', fg='white',
+                  font=('Arial', 11)).pack(side=tk.LEFT, padx=5)
+
     def dibujar_botones(self, main_frame):
         """Dibuja los botones con un estilo atractivo."""
         btn_frame = tk.Frame(main_frame, bg='#f0f8ff')
-        btn_frame.grid(row=4, column=0, columnspan=2, pady=20)
+        btn_frame.grid(row=5, column=0, columnspan=2, pady=20)
 
         estilo_boton = {'font': ('Arial', 12), 'bd': 2, 'relief': tk.RAISED, 'padx': 10, 'pady': 5, 'width': 20}
         tk.Button(btn_frame, text="Registrar Paciente", command=self.registrar_paciente,
                   bg='#4CAF50', fg='white', **estilo_boton).pack(side=tk.LEFT, padx=10)
         tk.Button(btn_frame, text="Ver Reporte", command=self.mostrar_reporte,
                   bg='#607D8B', fg='white', **estilo_boton).pack(side=tk.LEFT, padx=10)
+        tk.Button(btn_frame, text="Estadísticas", command=self.mostrar_estadisticas,
+                  bg='#795548', fg='white', **estilo_boton).pack(side=tk.LEFT, padx=10)
+        tk.Button(main_frame, text="Cerrar / abrir consultorio", command=self.mostrar_cierre_consultorio,
+                  font=('Arial', 10), bg='#f0f8ff', relief=tk.FLAT, fg='#0066cc').grid(row=7, column=0, columnspan=2)
 
     def registrar_paciente(self):
         nombre = self.nombre_entry.get().strip()
@@ -208,38 +219,21 @@ class ModuloAdmision:
             messagebox.showerror("Error", "Debe seleccionar un consultorio", parent=self.root)
             return
 
-        try:
-            hoy = datetime.now().strftime("%Y-%m-%d")
-            existe_paciente = any(
-                p['nombre'].lower() == nombre.lower() and
-                p['fecha_registro'].startswith(hoy) and
-                not p['atendido']
-                for p in self.datos['pacientes']
-            )
-
-            if existe_paciente:
-                messagebox.showwarning("Advertencia", "Este paciente ya tiene un turno pendiente para hoy", parent=self.root)
-                return
-
-            nuevo_id = max([p['id'] for p in self.datos['pacientes']], default=0) + 1
-            nuevo_paciente = {
-                'id': nuevo_id,
-                'nombre': nombre,
-                'especialidad': especialidad,
-                'consultorio': consultorio,
-                'fecha_registro': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                'atendido': False
-            }
+        prioridad = PRIORIDADES.index(self.prioridad_var.get())
+        self.persistencia.enviar('registrar', nombre, especialidad, consultorio, prioridad,
+                                 al_terminar=self.paciente_registrado, al_fallar=self.registro_fallido)
 
-            self.datos['pacientes'].append(nuevo_paciente)
+    def paciente_registrado(self, nuevo_paciente):
+        self.info_label.config(text=f"Paciente registrado con éxito. Turno: {nuevo_paciente.id}")
+        self.nombre_entry.delete(0, tk.END)
+        self.prioridad_var.set(PRIORIDADES[0])
+        self.mostrar_dialogo_ticket(nuevo_paciente)
 
-            if self.guardar_datos():
-                self.info_label.config(text=f"Paciente registrado con éxito. Turno: {nuevo_paciente['id']}")
-                self.nombre_entry.delete(0, tk.END)
-                self.mostrar_dialogo_ticket(nuevo_paciente)
-
-        except Exception as e:
-            messagebox.showerror("Error", f"Ocurrió un error inesperado: {str(e)}", parent=self.root)
+    def registro_fallido(self, error):
+        if isinstance(error, TurnoDuplicado):
+            messagebox.showwarning("Advertencia", "Este paciente ya tiene un turno pendiente para hoy", parent=self.root)
+        else:
+            messagebox.showerror("Error", f"Ocurrió un error inesperado: {str(error)}", parent=self.root)
 
     def mostrar_dialogo_ticket(self, paciente):
         """Muestra un diálogo con la información del paciente y un botón para imprimir el ticket."""
@@ -256,23 +250,24 @@ class ModuloAdmision:
 
         # Logo en ticket
         try:
-            image = Image.open("logo_hospital.png")
-            image = image.resize((90, 90), Image.LANCZOS)
-            logo_ticket = ImageTk.PhotoImage(image)
-            tk.Label(frame, image=logo_ticket).pack(pady=10)
-            dialogo.logo = logo_ticket  # Mantener referencia
-        except:
+            tk.Label(frame, image=logo(90, 90)).pack(pady=10)  # La misma imagen para todos los tickets
+        except Exception:
             tk.Label(frame, text="HOSPITAL DE APOYO PALPA", font=('Arial', 14, 'italic')).pack()
 
         # Información del ticket
         info_frame = tk.Frame(frame)
         info_frame.pack(fill=tk.BOTH, expand=True)
 
-        tk.Label(info_frame, text=f"Turno: {paciente['id']}", font=('Arial', 12, 'bold')).pack(anchor='w')
-        tk.Label(info_frame, text=f"Paciente: {paciente['nombre']}", font=('Arial', 12)).pack(anchor='w', pady=5)
-        tk.Label(info_frame, text=f"Especialidad: {paciente['especialidad']}", font=('Arial', 12)).pack(anchor='w')
-        tk.Label(info_frame, text=f"Consultorio: {paciente['consultorio']}", font=('Arial', 12)).pack(anchor='w', pady=5)
-        tk.Label(info_frame, text=f"Fecha: {paciente['fecha_registro']}", font=('Arial', 10)).pack(anchor='w')
+        tk.Label(info_frame, text=f"Turno: {paciente.id}", font=('Arial', 12, 'bold')).pack(anchor='w')
+        tk.Label(info_frame, text=f"Paciente: {paciente.nombre}", font=('Arial', 12)).pack(anchor='w', pady=5)
+        tk.Label(info_frame, text=f"Especialidad: {paciente.especialidad}", font=('Arial', 12)).pack(anchor='w')
+        tk.Label(info_frame, text=f"Consultorio: {paciente.consultorio}", font=('Arial', 12)).pack(anchor='w', pady=5)
+        if paciente.prioridad:
+            tk.Label(info_frame, text=f"Prioridad: {PRIORIDADES[paciente.prioridad]}",
+                     font=('Arial', 12, 'bold'), fg='#c62828').pack(anchor='w')
+        tk.Label(info_frame, text=f"Fecha: {paciente.fecha_registro}", font=('Arial', 10)).pack(anchor='w')
+        tk.Label(info_frame, text=f"Espera estimada: {self.texto_espera(paciente)}",
+                 font=('Arial', 12, 'bold'), fg='#004a99').pack(anchor='w', pady=5)
 
         # Botones
         btn_frame = tk.Frame(frame)
@@ -282,6 +277,13 @@ class ModuloAdmision:
         tk.Button(btn_frame, text="Cerrar", command=dialogo.destroy,
                  bg='#f44336', fg='white', font=('Arial', 12)).pack(side=tk.RIGHT, padx=10)
 
+    def texto_espera(self, paciente):
+        try:
+            return formato_espera(self.store.espera_estimada(paciente))
+        except Exception as e:
+            print(f"No se pudo estimar la espera: {e}")
+            return "-"
+
     def imprimir_ticket(self, paciente, ventana):
         try:
             filepath = filedialog.asksaveasfilename(
@@ -295,11 +297,14 @@ class ModuloAdmision:
                 with open(filepath, 'w', encoding='utf-8') as f:
                     f.write("=== HOSPITAL DE APOYO PALPA ===\n")
                     f.write("       TICKET DE REGISTRO\n\n")
-                    f.write(f"Turno: {paciente['id']}\n")
-                    f.write(f"Paciente: {paciente['nombre']}\n")
-                    f.write(f"Especialidad: {paciente['especialidad']}\n")
-                    f.write(f"Consultorio: {paciente['consultorio']}\n")
-                    f.write(f"Fecha: {paciente['fecha_registro']}\n\n")
+                    f.write(f"Turno: {paciente.id}\n")
+                    f.write(f"Paciente: {paciente.nombre}\n")
+                    f.write(f"Especialidad: {paciente.especialidad}\n")
+                    f.write(f"Consultorio: {paciente.consultorio}\n")
+                    if paciente.prioridad:
+                        f.write(f"Prioridad: {PRIORIDADES[paciente.prioridad]}\n")
+                    f.write(f"Fecha: {paciente.fecha_registro}\n")
+                    f.write(f"Espera estimada: {self.texto_espera(paciente)}\n\n")
                     f.write("Presente este ticket en recepción\n")
                     f.write("=== Gracias por su visita ===\n")
 
@@ -310,24 +315,66 @@ class ModuloAdmision:
             messagebox.showerror("Error", f"No se pudo generar el ticket: {str(e)}", parent=ventana)
 
     def mostrar_reporte(self):
+        self.datos = self.cargar_datos()
         # Ventana emergente para el reporte
         reporte = tk.Toplevel(self.root)
         reporte.title("Reporte de Pacientes")
         reporte.geometry("800x600")
         reporte.configure(bg='#f0f8ff')
 
-        # Botón para exportar CSV
+        # Rango de fechas (AAAA-MM-DD); sólo se leen los días archivados de ese rango
+        filtro = tk.Frame(reporte, bg='#f0f8ff')
+        filtro.pack(pady=(10, 0))
+        hoy = date.today().isoformat()
+        tk.Label(filtro, text="Desde:", font=('Arial', 12), bg='#f0f8ff').pack(side=tk.LEFT)
+        desde_entry = tk.Entry(filtro, font=('Arial', 12), width=12)
+        desde_entry.insert(0, hoy)
+        desde_entry.pack(side=tk.LEFT, padx=5)
+        tk.Label(filtro, text="Hasta:", font=('Arial', 12), bg='#f0f8ff').pack(side=tk.LEFT)
+        hasta_entry = tk.Entry(filtro, font=('Arial', 12), width=12)
+        hasta_entry.insert(0, hoy)
+        hasta_entry.pack(side=tk.LEFT, padx=5)
+
+        # Consultorio y especialidad
+        filtro_sala = tk.Frame(reporte, bg='#f0f8ff')
+        filtro_sala.pack(pady=(5, 0))
+        especialidades = self.datos.get('especialidades', [])
+        tk.Label(filtro_sala, text="Consultorio:", font=('Arial', 12), bg='#f0f8ff').pack(side=tk.LEFT)
+        consultorio_combo = ttk.Combobox(
+            filtro_sala, state='readonly', font=('Arial', 12), width=16,
+            values=["Todos"] + sorted({e['consultorio'] for e in especialidades}, key=lambda c: int(c.split()[-1])))
+        consultorio_combo.current(0)
+        consultorio_combo.pack(side=tk.LEFT, padx=5)
+        tk.Label(filtro_sala, text="Especialidad:", font=('Arial', 12), bg='#f0f8ff').pack(side=tk.LEFT)
+        especialidad_combo = ttk.Combobox(
+            filtro_sala, state='readonly', font=('Arial', 12), width=18,
+            values=["Todas"] + [e['nombre'] for e in especialidades])
+        especialidad_combo.current(0)
+        especialidad_combo.pack(side=tk.LEFT, padx=5)
+
+        def filtros():
+            return {
+                'desde': desde_entry.get().strip() or None,
+                'hasta': hasta_entry.get().strip() or None,
+                'consultorio': consultorio_combo.get() if consultorio_combo.current() > 0 else None,
+                'especialidad': especialidad_combo.get() if especialidad_combo.current() > 0 else None,
+            }
+
+        tk.Button(filtro, text="Consultar", command=lambda: cargar(0, reiniciar=True),
+                  font=('Arial', 12), bg='#2196F3', fg='white', padx=10).pack(side=tk.LEFT, padx=5)
+
+        # Botón para exportar (CSV, CSV comprimido o Parquet)
         btn_export = tk.Button(
-           reporte,
-           text="Exportar CSV",
-           command=lambda: self.exportar_csv(self.datos.get('pacientes', [])),
+           filtro,
+           text="Exportar",
+           command=lambda: self.exportar_reporte(filtros(), reporte),
            font=('Arial', 12),
            bg='#4CAF50',
            fg='white',
            padx=10,
            pady=5
         )
-        btn_export.pack(pady=(10, 0))
+        btn_export.pack(side=tk.LEFT, padx=5)
 
         # Treeview con encabezados
         columnas = ("ID", "Nombre", "Especialidad", "Consultorio", "Fecha Registro", "Atendido", "Fecha Atención")
@@ -342,22 +389,61 @@ class ModuloAdmision:
         tree.configure(yscrollcommand=vsb.set)
         vsb.pack(side='right', fill='y')
 
-        # Carga de datos
-        for p in self.datos.get('pacientes', []):
+        # Paginación: sólo la página visible está en memoria; se guarda el
+        # cursor del inicio de cada página ya vista para poder volver
+        navegacion = tk.Frame(reporte, bg='#f0f8ff')
+        navegacion.pack(pady=(0, 5))
+        btn_anterior = tk.Button(navegacion, text="◀ Anterior", font=('Arial', 11),
+                                 command=lambda: cargar(estado['pagina'] - 1))
+        btn_anterior.pack(side=tk.LEFT, padx=5)
+        lbl_pagina = tk.Label(navegacion, font=('Arial', 11), bg='#f0f8ff')
+        lbl_pagina.pack(side=tk.LEFT, padx=5)
+        btn_siguiente = tk.Button(navegacion, text="Siguiente ▶", font=('Arial', 11),
+                                  command=lambda: cargar(estado['pagina'] + 1))
+        btn_siguiente.pack(side=tk.LEFT, padx=5)
+        estado = {'pagina': 0, 'cursores': [None]}
+
+        # Carga de datos: la página se lee en el hilo de persistencia
+        def cargar(pagina, reiniciar=False):
+            if reiniciar:
+                estado['cursores'] = [None]
+            cursor, consulta = estado['cursores'][pagina], filtros()
+            self.persistencia.enviar(lambda store: store.pagina(cursor=cursor, **consulta),
+                                     al_terminar=lambda resultado: mostrar(pagina, *resultado),
+                                     al_fallar=lambda e: reporte.winfo_exists() and messagebox.showerror(
+                                         "Error", f"No se pudo consultar el reporte: {e}", parent=reporte))
+
+        def mostrar(pagina, filas, siguiente):
+            if not reporte.winfo_exists():
+                return
+            del estado['cursores'][pagina + 1:]
+            if siguiente is not None:
+                estado['cursores'].append(siguiente)
+            estado['pagina'] = pagina
+            tree.delete(*tree.get_children())
+            for p in filas:
+                insertar(p)
+            lbl_pagina.config(text=f"Página {pagina + 1}")
+            btn_anterior.config(state=tk.NORMAL if pagina > 0 else tk.DISABLED)
+            btn_siguiente.config(state=tk.NORMAL if siguiente is not None else tk.DISABLED)
+
+        def insertar(p):
             tree.insert(
                 "",
                 tk.END,
                 values=(
-                    p.get("id", ""),
-                    p.get("nombre", ""),
-                    p.get("especialidad", ""),
-                    p.get("consultorio", ""),
-                    p.get("fecha_registro", ""),
-                    "Sí" if p.get("atendido") else "No",
-                    p.get("fecha_atencion", "")
+                    p.id,
+                    p.nombre,
+                    p.especialidad,
+                    p.consultorio,
+                    p.fecha_registro,
+                    "Sí" if p.atendido else "No",
+                    p.fecha_atencion or ""
                 )
             )
 
+        cargar(0)
+
         # Botón para cerrar la ventana
         tk.Button(
             reporte,
@@ -370,41 +456,117 @@ class ModuloAdmision:
             pady=5
        ).pack(pady=(0,10))
         
-    def exportar_csv(self, pacientes):
+    def mostrar_estadisticas(self):
+        """Esperas y atenciones por especialidad o consultorio, de los acumulados ya calculados."""
+        ventana = tk.Toplevel(self.root)
+        ventana.title("Estadísticas de Atención")
+        ventana.geometry("900x500")
+        ventana.configure(bg='#f0f8ff')
+
+        filtro = tk.Frame(ventana, bg='#f0f8ff')
+        filtro.pack(pady=(10, 0))
+        hoy = date.today().isoformat()
+        tk.Label(filtro, text="Desde:", font=('Arial', 12), bg='#f0f8ff').pack(side=tk.LEFT)
+        desde_entry = tk.Entry(filtro, font=('Arial', 12), width=12)
+        desde_entry.insert(0, hoy)
+        desde_entry.pack(side=tk.LEFT, padx=5)
+        tk.Label(filtro, text="Hasta:", font=('Arial', 12), bg='#f0f8ff').pack(side=tk.LEFT)
+        hasta_entry = tk.Entry(filtro, font=('Arial', 12), width=12)
+        hasta_entry.insert(0, hoy)
+        hasta_entry.pack(side=tk.LEFT, padx=5)
+        por = tk.StringVar(value='especialidad')
+        for texto, valor in (("Por especialidad", 'especialidad'), ("Por consultorio", 'consultorio')):
+            tk.Radiobutton(filtro, text=texto, variable=por, value=valor, font=('Arial', 11),
+                           bg='#f0f8ff', command=lambda: cargar()).pack(side=tk.LEFT, padx=5)
+        tk.Button(filtro, text="Consultar", command=lambda: cargar(),
+                  font=('Arial', 12), bg='#2196F3', fg='white', padx=10).pack(side=tk.LEFT, padx=5)
+
+        columnas = ("Nombre", "Registrados", "Atendidos", "Espera media (min)", "Espera p90 (min)",
+                    "Servicio medio (min)", "Hora pico")
+        tree = ttk.Treeview(ventana, columns=columnas, show="headings")
+        for col in columnas:
+            tree.heading(col, text=col)
+            tree.column(col, anchor='w' if col == "Nombre" else 'e', width=120)
+        tree.pack(fill='both', expand=True, padx=10, pady=10)
+
+        def cargar():
+            self.persistencia.enviar('resumen_estadisticas', desde_entry.get().strip() or None,
+                                     hasta_entry.get().strip() or None, por.get(), al_terminar=mostrar,
+                                     al_fallar=lambda e: ventana.winfo_exists() and messagebox.showerror(
+                                         "Error", f"No se pudo calcular las estadísticas: {e}", parent=ventana))
+
+        def mostrar(resumen):
+            if not ventana.winfo_exists():
+                return
+            tree.delete(*tree.get_children())
+            for nombre, r in resumen.items():
+                def minutos(valor):
+                    return "-" if valor is None else f"{valor:.1f}"
+                tree.insert("", tk.END, values=(
+                    nombre, r['registrados'], r['atendidos'],
+                    minutos(r['espera_media_min']), minutos(r['espera_p90_min']),
+                    minutos(r['servicio_medio_min']),
+                    "-" if r['hora_pico'] is None else f"{r['hora_pico']:02d}:00"
+                ))
+
+        cargar()
+
+        tk.Button(ventana, text="Cerrar", command=ventana.destroy, font=('Arial', 12),
+                  bg='#f44336', fg='white', padx=10, pady=5).pack(pady=(0, 10))
+
+    def exportar_reporte(self, filtros, ventana):
+        """Exporta el reporte en un hilo aparte, con una ventana de avance."""
         filepath = filedialog.asksaveasfilename(
             defaultextension=".csv",
-            filetypes=[("Archivos CSV","*.csv")],
-            title="Guardar Reporte como CSV"
+            filetypes=tipos_archivo(),
+            title="Guardar Reporte",
+            parent=ventana
         )
         if not filepath:
            return
 
-        try:
-           with open(filepath, 'w', newline='', encoding='utf-8') as f:
-               writer = csv.writer(f)
-               # Cabecera
-               writer.writerow([
-                  "ID", "Nombre", "Especialidad",
-                  "Consultorio", "Fecha Registro",
-                  "Atendido", "Fecha Atención"
-               ])
-               # Filas
-               for p in pacientes:
-                   writer.writerow([
-                       p.get("id", ""),
-                       p.get("nombre", ""),
-                       p.get("especialidad", ""),
-                       p.get("consultorio", ""),
-                       p.get("fecha_registro", ""),
-                       "Sí" if p.get("atendido") else "No",
-                       p.get("fecha_atencion", "")
-                   ])
-           messagebox.showinfo("Éxito", f"Reporte exportado a:\n{filepath}", parent=self.root)
-        except Exception as e:
-           messagebox.showerror("Error", f"No se pudo exportar CSV:\n{e}", parent=self.root)
-           
+        progreso = tk.Toplevel(ventana)
+        progreso.title("Exportando")
+        progreso.geometry("360x140")
+        progreso.configure(bg='#f0f8ff')
+        progreso.transient(ventana)
+        etiqueta = tk.Label(progreso, text="Preparando...", font=('Arial', 12), bg='#f0f8ff')
+        etiqueta.pack(pady=(15, 5))
+        barra = ttk.Progressbar(progreso, mode='indeterminate', length=300)
+        barra.pack(pady=5)
+        barra.start(15)
+
+        exportacion = ExportacionEnSegundoPlano(self.persistencia.store, filepath, filtros)
+        tk.Button(progreso, text="Cancelar", command=exportacion.cancelar,
+                  font=('Arial', 11), bg='#f44336', fg='white').pack(pady=5)
+
+        def revisar():
+            try:
+                while True:
+                    tipo, valor = exportacion.mensajes.get_nowait()
+                    if tipo == 'avance':
+                        etiqueta.config(text=f"{valor} filas exportadas")
+                        continue
+                    progreso.destroy()
+                    if tipo == 'fin':
+                        messagebox.showinfo("Éxito", f"Reporte exportado a:\n{filepath}\n({valor} filas)", parent=ventana)
+                    elif tipo == 'error':
+                        messagebox.showerror("Error", f"No se pudo exportar el reporte:\n{valor}", parent=ventana)
+                    return
+            except queue.Empty:
+                progreso.after(100, revisar)
+
+        revisar()
+
     def run(self):
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        metricas.listo(self.root)
         self.root.mainloop()
+        metricas.detener()
+
+    def on_close(self):
+        self.persistencia.detener()  # Termina los registros ya enviados antes de salir
+        self.root.destroy()
 
 if __name__ == "__main__":
     app = ModuloAdmision()
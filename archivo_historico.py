@@ -0,0 +1,69 @@
+"""Archivo histórico de pacientes particionado por día.
+
+Cada día cerrado se guarda en un segmento comprimido
+``historial/AAAA-MM-DD.jsonl.gz`` (un paciente por línea) que se reemplaza
+entero con ``escribir_atomico`` al agregarle pacientes. El archivo de
+datos en vivo sólo conserva el día actual, y los reportes abren únicamente
+los segmentos del rango consultado.
+"""
+import gzip
+import json
+import os
+import zlib
+
+from bloqueo import escribir_atomico
+from esquema import Paciente
+
+DIRECTORIO_HISTORIAL = 'historial'
+EXTENSION = '.jsonl.gz'
+
+
+class ArchivoHistorico:
+    def __init__(self, directorio=DIRECTORIO_HISTORIAL):
+        self.directorio = directorio
+
+    def _ruta(self, dia):
+        return os.path.join(self.directorio, dia + EXTENSION)
+
+    def dias(self):
+        """Días archivados, en orden."""
+        try:
+            nombres = os.listdir(self.directorio)
+        except FileNotFoundError:
+            return []
+        return sorted(n[:-len(EXTENSION)] for n in nombres if n.endswith(EXTENSION))
+
+    def leer_dia(self, dia):
+        ruta = self._ruta(dia)
+        if not os.path.exists(ruta):
+            return
+        with gzip.open(ruta, 'rt', encoding='utf-8') as f:
+            try:
+                for linea in f:
+                    try:
+                        yield Paciente.desde_dict(json.loads(linea))
+                    except (ValueError, KeyError):
+                        continue  # Línea incompleta de un corte de luz
+            except (EOFError, gzip.BadGzipFile, zlib.error):
+                return  # Segmento cortado (archivos de versiones anteriores): hasta el último registro completo
+
+    def agregar_dia(self, dia, pacientes):
+        """Agrega pacientes al segmento del día, sin duplicar los ya archivados."""
+        os.makedirs(self.directorio, exist_ok=True)
+        existentes = list(self.leer_dia(dia))
+        ids = {p.id for p in existentes}
+        nuevos = [p for p in pacientes if p.id not in ids]
+        if not nuevos:
+            return 0
+        # El segmento se reescribe entero en un temporal: un corte deja el anterior intacto
+        lineas = (json.dumps(p.a_dict(), ensure_ascii=False) + '\n'
+                  for p in existentes + sorted(nuevos, key=lambda x: x.id))
+        escribir_atomico(self._ruta(dia), gzip.compress(''.join(lineas).encode('utf-8')))
+        return len(nuevos)
+
+    def consultar(self, desde=None, hasta=None):
+        """Genera los pacientes archivados entre ``desde`` y ``hasta`` (AAAA-MM-DD, inclusive)."""
+        for dia in self.dias():
+            if (desde and dia < desde) or (hasta and dia > hasta):
+                continue
+            yield from self.leer_dia(dia)
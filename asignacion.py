@@ -0,0 +1,98 @@
+"""Asignación de consultorio por menor espera estimada.
+
+Las especialidades con varias salas ('Obstetricia 1', 'Obstetricia 2')
+forman un grupo. Al registrar, se sugiere la sala del grupo donde el
+paciente nuevo esperaría menos según la cola actual y el ritmo de atención
+de cada sala (``estimacion.EstimadorEspera``). Si una sala cierra, sus
+pacientes en espera se reparten entre las demás del grupo conservando su
+orden de llegada.
+
+Con SISTEMACOLAS_COLA_COMPARTIDA=1 las salas del grupo además se ayudan al
+llamar: un consultorio sin pacientes toma al que lleva más tiempo esperando
+en otra sala del grupo (ver ``QueueStore.llamar_siguiente``).
+"""
+import os
+import re
+
+from cola_hospital import dia_de
+from esquema import segundos_de
+from queue_store import ConflictoVersion, ahora
+
+VARIABLE_COLA_COMPARTIDA = 'SISTEMACOLAS_COLA_COMPARTIDA'
+
+
+def grupo_de(especialidad):
+    """'Obstetricia 2' -> 'Obstetricia'"""
+    return re.sub(r'\s+\d+$', '', especialidad)
+
+
+def cola_compartida():
+    return os.environ.get(VARIABLE_COLA_COMPARTIDA, '') not in ('', '0')
+
+
+def hermanas(especialidades, consultorio):
+    """Las otras salas del grupo de ``consultorio``."""
+    propia = next((e['nombre'] for e in especialidades if e['consultorio'] == consultorio), None)
+    if propia is None:
+        return []
+    return [e['consultorio'] for e in especialidades
+            if e['consultorio'] != consultorio and grupo_de(e['nombre']) == grupo_de(propia)]
+
+
+def elegir(consultorios, delante, estimador, momento):
+    """Consultorio con menor espera estimada y esa espera en minutos.
+
+    ``delante(consultorio)`` devuelve cuántos pacientes esperan en esa sala;
+    ``momento`` son segundos (``esquema.segundos_de``).
+    """
+    return min(((c, estimador.espera(c, delante(c), momento)) for c in consultorios),
+               key=lambda opcion: opcion[1])
+
+
+class Asignador:
+    def __init__(self, store):
+        self.store = store
+        self.cerrados = set()
+
+    def opciones(self, especialidad, store=None):
+        """Salas abiertas del grupo de ``especialidad``: consultorio -> nombre de su especialidad."""
+        store = store or self.store
+        grupo = grupo_de(especialidad)
+        return {e['consultorio']: e['nombre'] for e in store.datos['especialidades']
+                if grupo_de(e['nombre']) == grupo and e['consultorio'] not in self.cerrados}
+
+    def sugerir(self, especialidad, store=None):
+        """(consultorio, especialidad, minutos) de la sala con menor espera, o None si no hay.
+
+        ``store`` reemplaza al del asignador, por ejemplo el del hilo de persistencia.
+        """
+        store = store or self.store
+        opciones = self.opciones(especialidad, store)
+        if not opciones:
+            return None
+        momento = ahora()
+        hoy = dia_de(momento)
+        consultorio, minutos = elegir(opciones, lambda c: store.cola.cuantos_en_espera(c, hoy),
+                                      store.estimador, segundos_de(momento))
+        return consultorio, opciones[consultorio], minutos
+
+    def cerrar(self, consultorio, store=None):
+        """Cierra la sala y reparte sus pacientes en espera; devuelve cuántos se movieron."""
+        store = store or self.store
+        self.cerrados.add(consultorio)
+        especialidad = store.especialidad_de(consultorio)
+        if especialidad is None or not self.opciones(especialidad, store):
+            return 0
+        store.actualizar()
+        movidos = 0
+        for p in store.cola.en_espera(consultorio, dia_de(ahora())):
+            destino, nombre, _ = self.sugerir(especialidad, store)
+            try:
+                store.reasignar(p.id, destino, nombre)
+                movidos += 1
+            except ConflictoVersion:
+                continue  # Lo llamaron mientras tanto
+        return movidos
+
+    def abrir(self, consultorio):
+        self.cerrados.discard(consultorio)
@@ -0,0 +1,256 @@
+"""Audio de los anuncios de la sala de espera.
+
+Cada anuncio se arma encadenando clips: frases fijas y consultorios se
+sintetizan una sola vez (``precalentar``) y los nombres de pacientes se
+guardan en una caché LRU en disco con límite de tamaño. Así un llamado o
+re-llamado repetido empieza a sonar sin esperar a la red.
+
+La síntesis usa gTTS si hay conexión y, si no, un motor local (pyttsx3)
+cuando está instalado.
+"""
+import hashlib
+import importlib.util
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import metricas
+
+DIRECTORIO_CACHE = 'audio_cache'
+LIMITE_CACHE_BYTES = 50 * 1024 * 1024
+
+FRASE_PACIENTE = "Paciente"
+FRASE_DIRIGIRSE = "favor dirigirse al"
+FRASE_PASAR = "favor pasar al"
+FRASES_FIJAS = [FRASE_PACIENTE, FRASE_DIRIGIRSE, FRASE_PASAR] + [f"Consultorio {i}" for i in range(1, 15)]
+
+
+class MotorGTTS:
+    """Google TTS (requiere red)."""
+    nombre = 'gtts'
+    extension = '.mp3'
+
+    def sintetizar(self, texto, ruta):
+        from gtts import gTTS  # Importación diferida: tarda y sólo se usa al sintetizar
+        gTTS(text=texto, lang='es', slow=False).save(ruta)
+
+
+class MotorPyttsx3:
+    """Voz del sistema operativo (SAPI en Windows), funciona sin red."""
+    nombre = 'pyttsx3'
+    extension = '.wav'
+
+    def __init__(self):
+        self._motor = None  # Se inicia al primer uso: pyttsx3.init() demora el arranque
+        self._lock = threading.Lock()
+
+    def sintetizar(self, texto, ruta):
+        with self._lock:
+            if self._motor is None:
+                import pyttsx3
+                self._motor = pyttsx3.init()
+            self._motor.save_to_file(texto, ruta)
+            self._motor.runAndWait()
+
+
+def motores_disponibles():
+    """Motores en orden de preferencia; el local sólo si está instalado."""
+    motores = [MotorGTTS()]
+    if importlib.util.find_spec('pyttsx3') is not None:
+        motores.append(MotorPyttsx3())
+    return motores
+
+
+class CacheAudio:
+    """Caché LRU de clips en disco, con expulsión por tamaño total.
+
+    Un mismo clip se sintetiza una sola vez aunque lo pidan a la vez
+    ``precalentar`` y el hilo de reproducción: el segundo espera al primero.
+    """
+
+    def __init__(self, directorio=DIRECTORIO_CACHE, limite_bytes=LIMITE_CACHE_BYTES, motores=None):
+        self.directorio = directorio
+        self.limite_bytes = limite_bytes
+        self.motores = motores if motores is not None else motores_disponibles()
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()  # archivo -> tamaño, el menos usado primero
+        self._en_curso = {}  # clave -> lock del hilo que la está sintetizando
+        self._total = 0
+        os.makedirs(directorio, exist_ok=True)
+        archivos = []
+        for nombre in os.listdir(directorio):
+            ruta = os.path.join(directorio, nombre)
+            if nombre.startswith('.') or not os.path.isfile(ruta):
+                continue
+            st = os.stat(ruta)
+            archivos.append((st.st_mtime, nombre, st.st_size))
+        for _, nombre, tamano in sorted(archivos):
+            self._entradas[nombre] = tamano
+            self._total += tamano
+
+    @staticmethod
+    def _clave(texto):
+        return hashlib.sha1(texto.strip().lower().encode('utf-8')).hexdigest()
+
+    def buscar(self, texto):
+        """Ruta del clip ya sintetizado, o None."""
+        clave = self._clave(texto)
+        with self._lock:
+            for motor in self.motores:
+                nombre = clave + motor.extension
+                if nombre in self._entradas:
+                    self._entradas.move_to_end(nombre)
+                    ruta = os.path.join(self.directorio, nombre)
+                    try:
+                        os.utime(ruta)  # El orden LRU sobrevive a reinicios
+                    except OSError:
+                        pass
+                    return ruta
+        return None
+
+    def obtener(self, texto):
+        """Ruta del clip para ``texto``, sintetizándolo si no está en caché."""
+        ruta = self.buscar(texto)
+        if ruta:
+            return ruta
+        clave = self._clave(texto)
+        with self._lock:
+            en_curso = self._en_curso.setdefault(clave, threading.Lock())
+        with en_curso:
+            # Si otro hilo lo sintetizó mientras esperábamos, ya está en la caché
+            ruta = self.buscar(texto) or self._sintetizar(texto, clave)
+        # Si falló, el lock queda: quien reintente lo hará de a uno
+        with self._lock:
+            self._en_curso.pop(clave, None)
+        return ruta
+
+    def _sintetizar(self, texto, clave):
+        ultimo_error = None
+        for motor in self.motores:
+            nombre = clave + motor.extension
+            ruta = os.path.join(self.directorio, nombre)
+            temporal = os.path.join(self.directorio, '.' + nombre)
+            try:
+                motor.sintetizar(texto, temporal)
+                os.replace(temporal, ruta)
+            except Exception as e:
+                ultimo_error = e
+                if os.path.exists(temporal):
+                    os.remove(temporal)
+                continue
+            self._agregar(nombre, os.path.getsize(ruta))
+            return ruta
+        raise RuntimeError(f"No se pudo sintetizar '{texto}': {ultimo_error}")
+
+    def _agregar(self, nombre, tamano):
+        with self._lock:
+            self._total += tamano - self._entradas.pop(nombre, 0)
+            self._entradas[nombre] = tamano
+            while self._total > self.limite_bytes and len(self._entradas) > 1:
+                viejo, tam = self._entradas.popitem(last=False)
+                self._total -= tam
+                try:
+                    os.remove(os.path.join(self.directorio, viejo))
+                except OSError:
+                    pass
+
+
+class AudioAnuncios:
+    """Arma la lista de clips de cada anuncio a partir de la caché."""
+
+    def __init__(self, cache=None):
+        self.cache = cache or CacheAudio()
+
+    def precalentar(self):
+        """Sintetiza en segundo plano las frases fijas que faltan en la caché."""
+        def trabajo():
+            for frase in FRASES_FIJAS:
+                try:
+                    self.cache.obtener(frase)
+                except Exception as e:
+                    print(f"No se pudo preparar el audio '{frase}': {e}")
+        threading.Thread(target=trabajo, daemon=True).start()
+
+    def partes_llamado(self, nombre, consultorio, rellamado=False):
+        return [FRASE_PACIENTE, nombre, FRASE_PASAR if rellamado else FRASE_DIRIGIRSE, consultorio]
+
+    def clips(self, partes):
+        """Rutas de los clips de un anuncio, en orden."""
+        return [self.cache.obtener(p) for p in partes]
+
+
+class ReproductorAnuncios:
+    """Reproduce los anuncios en un hilo propio para no bloquear la interfaz.
+
+    Política ante ráfagas (por ejemplo cinco consultorios llamando a la vez):
+    los anuncios se reproducen en orden de llegada, un anuncio que ya está
+    en la cola no se repite, y si hay más de ``max_pendientes`` se descarta
+    el más antiguo (el paciente sigue visible en la pantalla).
+    """
+
+    def __init__(self, audio, max_pendientes=8):
+        self.audio = audio
+        self.max_pendientes = max_pendientes
+        self._pendientes = OrderedDict()  # clave -> partes
+        self._cond = threading.Condition()
+        self._activo = True
+        self._hilo = threading.Thread(target=self._trabajar, name='anuncios', daemon=True)
+        self._hilo.start()
+
+    def anunciar(self, clave, partes):
+        """Encola un anuncio; vuelve de inmediato."""
+        with self._cond:
+            if clave in self._pendientes:
+                return False
+            while len(self._pendientes) >= self.max_pendientes:
+                self._pendientes.popitem(last=False)
+                metricas.contar('anuncios_descartados')
+            self._pendientes[clave] = partes
+            self._cond.notify()
+            return True
+
+    def detener(self):
+        with self._cond:
+            self._activo = False
+            self._pendientes.clear()
+            self._cond.notify()
+
+    def _trabajar(self):
+        try:
+            import pygame  # Importación diferida: sólo la usa este hilo
+            # El mezclador se inicia una sola vez y queda abierto
+            pygame.mixer.init(frequency=22050, size=-16, channels=2, buffer=512)
+        except Exception as e:
+            print(f"No se pudo iniciar el audio: {e}")
+            pygame = None
+
+        while True:
+            with self._cond:
+                while self._activo and not self._pendientes:
+                    self._cond.wait()
+                if not self._activo:
+                    break
+                _, partes = self._pendientes.popitem(last=False)
+            inicio = time.perf_counter()
+            try:
+                if pygame is None:
+                    raise RuntimeError("audio no disponible")
+                for clip in self.audio.clips(partes):
+                    pygame.mixer.music.load(clip)
+                    pygame.mixer.music.play()
+                    while pygame.mixer.music.get_busy():
+                        time.sleep(0.02)
+                    pygame.mixer.music.unload()
+                metricas.observar('reproducir_anuncio', time.perf_counter() - inicio)
+            except Exception as e:
+                print(f"No se pudo reproducir el anuncio: {e}")
+                metricas.contar('anuncios_fallidos')
+                try:
+                    import winsound
+                    winsound.Beep(1000, 500)
+                except Exception:
+                    pass
+
+        if pygame is not None:
+            pygame.mixer.quit()
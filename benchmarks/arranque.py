@@ -0,0 +1,98 @@
+"""Perfil de arranque de las tres estaciones.
+
+Para cada estación mide, en un proceso nuevo:
+
+- la importación del módulo con ``python -X importtime`` (total y los
+  módulos que más tardan);
+- si hay pantalla, el arranque en frío hasta la primera ventana usable:
+  se lanza la estación con SISTEMACOLAS_SALIR_AL_INICIAR=1, que imprime
+  ``arranque_s`` y cierra la ventana en cuanto queda esperando eventos. La
+  primera corrida de cada estación parte sin ``logo_cache/``.
+
+    python benchmarks/arranque.py --repeticiones 5
+"""
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ESTACIONES = {'admision': [], 'consultoria': ['1'], 'sala_espera': []}
+OBJETIVO_S = 1.0
+
+
+def perfil_importacion(modulo):
+    """(segundos, [(cumulativo_us, propio_us, nombre)]) o (None, error)."""
+    inicio = time.perf_counter()
+    r = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {modulo}'],
+                       cwd=RAIZ, capture_output=True, text=True)
+    duracion = time.perf_counter() - inicio
+    if r.returncode != 0:
+        return None, r.stderr.strip().splitlines()[-1]
+    modulos = []
+    for linea in r.stderr.splitlines():
+        if not linea.startswith('import time:') or 'cumulative' in linea:
+            continue
+        propio, cumulativo, nombre = linea[len('import time:'):].split('|')
+        modulos.append((int(cumulativo), int(propio), nombre.rstrip()))
+    return duracion, modulos
+
+
+def hay_pantalla():
+    return os.name == 'nt' or bool(os.environ.get('DISPLAY'))
+
+
+def arranque(modulo, argumentos, directorio):
+    """(segundos de reloj hasta la primera ventana, arranque_s informado por la estación)."""
+    entorno = dict(os.environ, SISTEMACOLAS_SALIR_AL_INICIAR='1')
+    inicio = time.perf_counter()
+    r = subprocess.run([sys.executable, os.path.join(RAIZ, f'{modulo}.py'), *argumentos],
+                       cwd=directorio, env=entorno, capture_output=True, text=True, timeout=60)
+    duracion = time.perf_counter() - inicio
+    informado = next((float(l.split('=')[1]) for l in r.stdout.splitlines() if l.startswith('arranque_s=')), None)
+    if informado is None:
+        raise RuntimeError((r.stderr.strip().splitlines() or ['la estación no informó arranque_s'])[-1])
+    return duracion, informado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--top', type=int, default=8, help="módulos más lentos a mostrar")
+    args = parser.parse_args()
+
+    for modulo, argumentos in ESTACIONES.items():
+        print(f"== {modulo}")
+        duracion, modulos = perfil_importacion(modulo)
+        if duracion is None:
+            print(f"  no se pudo importar: {modulos}")
+            continue
+        total = next(c for c, _, n in modulos if n.strip() == modulo)
+        print(f"  importación: {total / 1000:.1f} ms ({duracion * 1000:.0f} ms con el intérprete)")
+        for cumulativo, propio, nombre in sorted(modulos, key=lambda m: -m[1])[:args.top]:
+            print(f"    {propio / 1000:7.1f} ms propio {cumulativo / 1000:8.1f} ms total  {nombre.strip()}")
+
+        if not hay_pantalla():
+            print("  sin pantalla: no se mide la primera ventana")
+            continue
+        with tempfile.TemporaryDirectory() as tmp:
+            shutil.copy(os.path.join(RAIZ, 'logo_hospital.png'), tmp)
+            try:
+                medidas = [arranque(modulo, argumentos, tmp) for _ in range(args.repeticiones)]
+            except (RuntimeError, subprocess.TimeoutExpired) as e:
+                print(f"  no se pudo abrir la ventana: {e}")
+                continue
+        frio, _ = medidas[0]
+        reloj = statistics.median(m[0] for m in medidas[1:] or medidas)
+        interno = statistics.median(m[1] for m in medidas[1:] or medidas)
+        marca = "OK" if reloj < OBJETIVO_S else f"supera {OBJETIVO_S:.0f} s"
+        print(f"  primera ventana: {frio:.2f} s sin caché de logos, {reloj:.2f} s con caché "
+              f"({interno:.2f} s desde importar metricas) [{marca}]")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""Simula la asignación de sala en una especialidad con dos consultorios.
+
+Compara, sobre muchos días sintéticos, la elección a mano del consultorio
+(la mayoría elige el primero de la lista), la alternancia y la sugerencia
+por menor espera estimada de ``asignacion.elegir``. Opcionalmente una de
+las salas cierra a media jornada: sin redistribución su cola queda sin
+atender (y se cuenta como espera hasta el fin de la jornada); con el
+asignador pasa a la otra sala.
+
+    python benchmarks/asignacion.py --dias 200 --pacientes 48
+    python benchmarks/asignacion.py --cierre 180
+"""
+import argparse
+import heapq
+import os
+import random
+import statistics
+import sys
+from collections import deque
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from asignacion import elegir
+from esquema import segundos_de
+from estimacion import EstimadorEspera
+
+INICIO = datetime(2025, 1, 6, 8, 0)
+SALAS = {'Consultorio 11': 12.0, 'Consultorio 12': 16.0}  # minutos medios por paciente
+JORNADA_MIN = 360
+PREFERENCIA_PRIMERA = 0.7  # A mano, la mayoría elige la primera sala de la lista
+
+
+def fecha(minuto):
+    """Minuto de la jornada -> segundos como ``esquema.segundos_de``."""
+    return segundos_de((INICIO + timedelta(minutes=minuto)).strftime("%Y-%m-%d %H:%M:%S"))
+
+
+def simular_dia(politica, pacientes, rng, cierre=None):
+    salas = list(SALAS)
+    colas = {s: deque() for s in salas}  # (minuto de llegada, id)
+    ocupada = dict.fromkeys(salas, False)
+    abierta = dict.fromkeys(salas, True)
+    estimador = EstimadorEspera()
+    esperas = []
+    fin = 0.0
+    turno = 0
+
+    eventos = []
+    t = 0.0
+    for i in range(pacientes):
+        t += rng.expovariate(pacientes / JORNADA_MIN)
+        heapq.heappush(eventos, (t, 1, 'llegada', i))
+    if cierre is not None:
+        heapq.heappush(eventos, (cierre, 0, 'cierre', salas[0]))
+
+    def atender(sala, ahora):
+        nonlocal fin
+        if not abierta[sala] or not colas[sala]:
+            ocupada[sala] = False
+            return
+        llegada, _ = colas[sala].popleft()
+        esperas.append(ahora - llegada)
+        estimador.atender(sala, fecha(ahora))
+        ocupada[sala] = True
+        duracion = rng.expovariate(1 / SALAS[sala])
+        fin = max(fin, ahora + duracion)
+        heapq.heappush(eventos, (ahora + duracion, 2, 'libre', sala))
+
+    while eventos:
+        t, _, tipo, dato = heapq.heappop(eventos)
+        abiertas = [s for s in salas if abierta[s]]
+        if tipo == 'llegada':
+            if politica == 'manual':
+                sala = abiertas[0] if rng.random() < PREFERENCIA_PRIMERA or len(abiertas) == 1 else abiertas[1]
+            elif politica == 'alternada':
+                sala = abiertas[turno % len(abiertas)]
+                turno += 1
+            else:
+                sala, _ = elegir(abiertas, lambda s: len(colas[s]), estimador, fecha(t))
+            colas[sala].append((t, dato))
+            if not ocupada[sala]:
+                atender(sala, t)
+        elif tipo == 'libre':
+            atender(dato, t)
+        elif tipo == 'cierre':
+            abierta[dato] = False
+            if politica == 'asignador':
+                # La cola de la sala cerrada pasa a las otras, en orden de llegada
+                for llegada, pid in colas[dato]:
+                    destino, _ = elegir([s for s in salas if abierta[s]], lambda s: len(colas[s]),
+                                        estimador, fecha(t))
+                    colas[destino].append((llegada, pid))
+                    colas[destino] = deque(sorted(colas[destino]))
+                    if not ocupada[destino]:
+                        atender(destino, t)
+                colas[dato].clear()
+
+    # Quien quedó en una sala cerrada espera, como mínimo, hasta el fin de la jornada
+    sin_atender = 0
+    for cola in colas.values():
+        sin_atender += len(cola)
+        esperas += [fin - llegada for llegada, _ in cola]
+    return esperas, fin, sin_atender
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dias', type=int, default=200)
+    parser.add_argument('--pacientes', type=int, default=48, help="pacientes por día en la especialidad")
+    parser.add_argument('--cierre', type=float, help="minuto en que cierra la primera sala")
+    parser.add_argument('--semilla', type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{args.dias} días, {args.pacientes} pacientes/día, salas {SALAS}"
+          + (f", cierre al minuto {args.cierre:.0f}" if args.cierre is not None else ""))
+    print(f"{'política':12} {'espera media':>13} {'p90':>8} {'fin jornada':>12} {'sin atender':>12}")
+    for politica in ('manual', 'alternada', 'asignador'):
+        rng = random.Random(args.semilla)  # Mismas llegadas y duraciones para cada política
+        todas, fines, pendientes = [], [], 0
+        for _ in range(args.dias):
+            esperas, fin, sin_atender = simular_dia(politica, args.pacientes, rng, args.cierre)
+            todas += esperas
+            fines.append(fin)
+            pendientes += sin_atender
+        p90 = statistics.quantiles(todas, n=10)[-1]
+        print(f"{politica:12} {statistics.mean(todas):10.1f} min {p90:5.1f} min "
+              f"{statistics.mean(fines) / 60:9.2f} h {pendientes / args.dias:12.1f}")
+
+
+if __name__ == '__main__':
+    main()
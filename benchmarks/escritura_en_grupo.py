@@ -0,0 +1,162 @@
+"""Registros en ráfaga: una escritura por registro contra escritura en grupo.
+
+Una admisión registra pacientes a ``--tasas`` registros por segundo durante
+``--segundos``, a través de ``Persistencia`` como la ventana real. Sin
+agrupar cada registro es una escritura con su ``fsync``; con ventana 0 se
+juntan los que ya esperaban en la cola y con la ventana por defecto
+(50 ms) también los que llegan durante ella.
+Informa registros confirmados por segundo, escrituras al log y la
+latencia hasta la confirmación del turno. La fila ``ráfaga`` envía
+``--rafaga`` registros de una vez y mide el máximo que sostiene el disco.
+
+Con ``--caida`` además se mata un proceso de admisión (SIGKILL) en plena
+ráfaga, después de dejar una línea cortada en el log, y se verifica al
+reabrir que todo turno confirmado está en el log y que los turnos
+siguientes se registran bien.
+
+    python benchmarks/escritura_en_grupo.py --tasas 1 10 100 --segundos 5 --caida
+"""
+import argparse
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from queue_store import QueueStore
+from persistencia import Persistencia, VENTANA_GRUPO_MS
+
+
+class StoreContado(QueueStore):
+    """Cuenta las escrituras al log (una por llamada a ``_transacciones``)."""
+    escrituras = 0
+
+    def _transacciones(self, construcciones):
+        StoreContado.escrituras += 1
+        return super()._transacciones(construcciones)
+
+
+class RaizFalsa:
+    def after(self, ms, funcion):
+        return None
+
+    def after_cancel(self, pendiente):
+        pass
+
+
+def admision(archivo, tasa, total, ventana_ms, al_confirmar=None):
+    """Registra ``total`` pacientes a ``tasa`` por segundo; devuelve (latencias, escrituras, segundos)."""
+    persistencia = Persistencia(StoreContado(archivo), ventana_ms=ventana_ms)
+    persistencia.iniciar(RaizFalsa())
+    latencias = []
+    StoreContado.escrituras = 0
+
+    def confirmar(paciente, enviado):
+        latencias.append(time.perf_counter() - enviado)
+        if al_confirmar is not None:
+            al_confirmar(paciente)
+
+    inicio = time.perf_counter()
+    for i in range(total):
+        # Llegadas a ritmo fijo; el bucle hace de ventana (procesar ~ root.after)
+        while time.perf_counter() < inicio + i / tasa:
+            persistencia.procesar()
+            time.sleep(0.001)
+        enviado = time.perf_counter()
+        persistencia.enviar('registrar', f"Paciente {i}", "Medicina", "Consultorio 10",
+                            al_terminar=lambda p, enviado=enviado: confirmar(p, enviado))
+    while len(latencias) < total:
+        persistencia.procesar()
+        time.sleep(0.001)
+    duracion = time.perf_counter() - inicio
+    persistencia.detener()
+    return latencias, StoreContado.escrituras, duracion
+
+
+def percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+
+def hijo(archivo, tasa):
+    """Proceso que registra sin parar e imprime cada turno confirmado."""
+    def informar(paciente):
+        print(paciente.id, flush=True)
+    admision(archivo, tasa, int(tasa * 3600), VENTANA_GRUPO_MS, informar)
+
+
+def prueba_caida(tasa):
+    with tempfile.TemporaryDirectory() as tmp:
+        archivo = os.path.join(tmp, 'datos_hospital.json')
+        QueueStore(archivo).compactar()
+        proceso = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--hijo', archivo, str(tasa)],
+                                   stdout=subprocess.PIPE, text=True)
+        confirmados = []
+        limite = time.time() + 2
+        while time.time() < limite:
+            linea = proceso.stdout.readline()
+            if not linea:
+                break
+            confirmados.append(int(linea))
+        proceso.send_signal(signal.SIGKILL if hasattr(signal, 'SIGKILL') else signal.SIGTERM)
+        proceso.wait()
+        confirmados += [int(l) for l in proceso.stdout.read().split()]
+        with open(os.path.join(tmp, 'datos_hospital.log'), 'ab') as f:
+            f.write(b'{"op": "registro", "paciente": {"id": 99')  # Escritura cortada por la caída
+
+        store = QueueStore(archivo)
+        perdidos = [i for i in confirmados if i not in store.cola.pacientes]
+        nuevo = store.registrar("Después de la caída", "Medicina", "Consultorio 10")
+        releido = QueueStore(archivo)
+    print(f"caída: {len(confirmados)} turnos confirmados antes de matar el proceso, "
+          f"{len(store.cola.pacientes)} en el log")
+    errores = []
+    if perdidos:
+        errores.append(f"se perdieron {len(perdidos)} turnos confirmados: {perdidos[:10]}")
+    if nuevo.id not in releido.cola.pacientes:
+        errores.append("el registro posterior a la caída no se puede leer")
+    return errores
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tasas', type=float, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--segundos', type=float, default=5)
+    parser.add_argument('--rafaga', type=int, default=500, help="registros enviados de una vez")
+    parser.add_argument('--ventana', type=float, nargs='+', default=[0, VENTANA_GRUPO_MS],
+                        help="ventanas de agrupamiento a comparar con el registro individual, en ms")
+    parser.add_argument('--caida', action='store_true', help="verifica que no se pierden turnos confirmados")
+    parser.add_argument('--hijo', nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.hijo:
+        hijo(args.hijo[0], float(args.hijo[1]))
+        return
+
+    for tasa in args.tasas + [float('inf')]:
+        total = args.rafaga if tasa == float('inf') else int(tasa * args.segundos)
+        for ventana in [None] + args.ventana:
+            with tempfile.TemporaryDirectory() as tmp:
+                latencias, escrituras, duracion = admision(
+                    os.path.join(tmp, 'datos_hospital.json'), tasa, total, ventana)
+            if tasa != float('inf'):
+                duracion = max(duracion, args.segundos)  # El último llega antes de terminar el período
+            etiqueta = 'ráfaga' if tasa == float('inf') else f"{tasa:.0f}/s"
+            modo = 'sin agrupar' if ventana is None else f"ventana {ventana:3.0f} ms"
+            print(f"{etiqueta:>8} {modo:>14}: {len(latencias) / duracion:7.1f} registros/s, "
+                  f"{escrituras:4d} escrituras ({len(latencias) / escrituras:5.1f} por escritura), "
+                  f"confirmación p50 {statistics.median(latencias) * 1000:6.1f} ms "
+                  f"p99 {percentil(latencias, 0.99) * 1000:6.1f} ms")
+
+    errores = prueba_caida(max(args.tasas)) if args.caida else []
+    for e in errores:
+        print(f"ERROR: {e}")
+    sys.exit(1 if errores else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""Prueba de estrés de la cola compartida entre salas de una especialidad.
+
+Se arma un grupo de ``--salas`` consultorios de la misma especialidad y la
+admisión registra todos los pacientes en la primera sala. Cada sala es un
+proceso con su store parcial del grupo que llama con
+``llamar_siguiente(sala, grupo)``: las salas vacías toman pacientes de la
+primera. Al final se verifica que cada paciente se llamó una sola vez, que
+quedó en la sala que lo llamó y que todas las salas atendieron.
+
+    python benchmarks/estres_cola_compartida.py --salas 8 --pacientes 400
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from queue_store import QueueStore, ahora
+from cola_hospital import dia_de
+
+
+def preparar(archivo, salas):
+    store = QueueStore(archivo)
+    store.datos['especialidades'] = [{'nombre': f"Obstetricia {i}", 'consultorio': f"Sala {i}"}
+                                     for i in range(1, salas + 1)]
+    store.compactar()
+
+
+def admision(archivo, pacientes):
+    store = QueueStore(archivo)
+    for i in range(pacientes):
+        store.registrar(f"Paciente {i}", "Obstetricia 1", "Sala 1")
+
+
+def sala(archivo, numero, salas, pacientes, resultados):
+    nombre = f"Sala {numero}"
+    grupo = [f"Sala {i}" for i in range(1, salas + 1) if i != numero]
+    store = QueueStore(archivo, consultorio=(nombre, *grupo))
+    llamados = tomados = 0
+    limite = time.time() + 120
+    while time.time() < limite:
+        p = store.llamar_siguiente(nombre, grupo)
+        if p is None:
+            hoy = dia_de(ahora())
+            if store.cola.ultimo_id >= pacientes and not any(
+                    store.cola.cuantos_en_espera(c, hoy) for c in (nombre, *grupo)):
+                break
+            time.sleep(0.001)
+            continue
+        llamados += 1
+        tomados += numero != 1
+        time.sleep(random.uniform(0, 0.002))  # Atención del paciente
+    resultados.put((numero, llamados, tomados))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--salas', type=int, default=8)
+    parser.add_argument('--pacientes', type=int, default=400)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        archivo = os.path.join(tmp, 'datos_hospital.json')
+        preparar(archivo, args.salas)
+        resultados = multiprocessing.Queue()
+        procesos = [multiprocessing.Process(target=admision, args=(archivo, args.pacientes))]
+        procesos += [multiprocessing.Process(target=sala, args=(archivo, i, args.salas, args.pacientes, resultados))
+                     for i in range(1, args.salas + 1)]
+
+        inicio = time.perf_counter()
+        for p in procesos:
+            p.start()
+        por_sala = sorted(resultados.get() for _ in range(args.salas))
+        for p in procesos:
+            p.join()
+        duracion = time.perf_counter() - inicio
+
+        with open(os.path.join(tmp, 'datos_hospital.log'), encoding='utf-8') as f:
+            eventos = [json.loads(linea) for linea in f]
+        final = QueueStore(archivo)
+
+    llamados = Counter(e['id'] for e in eventos if e['op'] == 'llamado')
+    movidos = [e for e in eventos if e['op'] == 'llamado' and 'paciente' in e]
+    versiones = [e['v'] for e in eventos]
+
+    print(f"{len(eventos)} eventos en {duracion:.2f} s")
+    for numero, n, tomados in por_sala:
+        print(f"  Sala {numero}: {n} llamados" + (f" (tomados de otra sala: {tomados})" if numero != 1 else ""))
+    errores = []
+    if any(n > 1 for n in llamados.values()):
+        errores.append("hay pacientes llamados más de una vez")
+    if len(llamados) != args.pacientes:
+        errores.append(f"sólo se llamaron {len(llamados)} de {args.pacientes} pacientes")
+    if sum(r[1] for r in por_sala) != args.pacientes:
+        errores.append("las salas no coinciden con el log en la cantidad de llamados")
+    if len(movidos) != sum(r[2] for r in por_sala):
+        errores.append("no todo paciente tomado de otra sala cambió de consultorio en su llamado")
+    por_consultorio = Counter(p.consultorio for p in final.cola.pacientes.values())
+    if any(por_consultorio[f"Sala {numero}"] != n for numero, n, _ in por_sala):
+        errores.append("hay pacientes que no quedaron en la sala que los llamó")
+    if any(p.consultorio != f"Sala {int(p.especialidad.split()[-1])}" for p in final.cola.pacientes.values()):
+        errores.append("hay pacientes con consultorio y especialidad que no coinciden")
+    if any(n == 0 for _, n, _ in por_sala):
+        errores.append("alguna sala no atendió a nadie")
+    if versiones != list(range(1, len(eventos) + 1)):
+        errores.append("las versiones del log no son consecutivas")
+
+    for e in errores:
+        print(f"ERROR: {e}")
+    sys.exit(1 if errores else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""Prueba de estrés: N consultorios simulados contra una admisión.
+
+Cada estación es un proceso distinto que comparte el mismo archivo de datos,
+igual que en el hospital. Al final se verifica que no se perdió ningún
+registro y que ningún paciente fue llamado dos veces.
+
+    python benchmarks/estres_concurrencia.py --consultorios 28 --pacientes 500
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from queue_store import QueueStore, ConflictoVersion, ESPECIALIDADES_BASE, ahora
+from cola_hospital import dia_de
+
+
+def admision(archivo, pacientes, consultorios):
+    store = QueueStore(archivo)
+    for i in range(pacientes):
+        esp = ESPECIALIDADES_BASE[i % consultorios]
+        store.registrar(f"Paciente {i}", esp['nombre'], esp['consultorio'])
+
+
+def consultorio(archivo, numero, pacientes, resultados):
+    store = QueueStore(archivo)
+    nombre = f"Consultorio {numero}"
+    llamados = conflictos = 0
+    limite = time.time() + 120
+    while time.time() < limite:
+        store.actualizar()
+        primero = store.cola.primero(nombre, dia_de(ahora()))
+        if primero is None:
+            if store.cola.ultimo_id >= pacientes:
+                break
+            time.sleep(0.001)
+            continue
+        try:
+            store.llamar(primero.id)
+            llamados += 1
+        except ConflictoVersion:
+            conflictos += 1
+    resultados.put((numero, llamados, conflictos, store.bloqueo.espera))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--consultorios', type=int, default=28,
+                        help="procesos de consultorio (más de 14 comparten sala)")
+    parser.add_argument('--pacientes', type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        archivo = os.path.join(tmp, 'datos_hospital.json')
+        salas = min(args.consultorios, 14)
+        resultados = multiprocessing.Queue()
+        procesos = [multiprocessing.Process(target=admision, args=(archivo, args.pacientes, salas))]
+        procesos += [multiprocessing.Process(target=consultorio,
+                                             args=(archivo, i % salas + 1, args.pacientes, resultados))
+                     for i in range(args.consultorios)]
+
+        inicio = time.perf_counter()
+        for p in procesos:
+            p.start()
+        por_estacion = [resultados.get() for _ in range(args.consultorios)]
+        for p in procesos:
+            p.join()
+        duracion = time.perf_counter() - inicio
+
+        with open(os.path.join(tmp, 'datos_hospital.log'), encoding='utf-8') as f:
+            eventos = [json.loads(linea) for linea in f]
+
+    registros = [e['paciente']['id'] for e in eventos if e['op'] == 'registro']
+    llamados = Counter(e['id'] for e in eventos if e['op'] == 'llamado')
+    versiones = [e['v'] for e in eventos]
+
+    print(f"{len(eventos)} eventos en {duracion:.2f} s ({len(eventos) / duracion:.0f} ops/s)")
+    print(f"Conflictos resueltos por CAS: {sum(r[2] for r in por_estacion)}")
+    errores = []
+    if sorted(registros) != list(range(1, args.pacientes + 1)):
+        errores.append("se perdieron o duplicaron registros")
+    if any(n > 1 for n in llamados.values()):
+        errores.append("hay pacientes llamados más de una vez")
+    if len(llamados) != args.pacientes:
+        errores.append(f"sólo se llamaron {len(llamados)} de {args.pacientes} pacientes")
+    if versiones != list(range(1, len(eventos) + 1)):
+        errores.append("las versiones del log no son consecutivas")
+
+    for e in errores:
+        print(f"ERROR: {e}")
+    sys.exit(1 if errores else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""Bloqueo de la interfaz con el archivo en una unidad lenta.
+
+Simula un consultorio que llama pacientes mientras su ventana dibuja a
+~60 Hz. El store de prueba agrega ``--demora`` milisegundos a cada escritura,
+como un recurso compartido de red cargado. Se comparan dos modos:
+
+- sincrónico: el manejador del botón llama al store (como antes de
+  ``persistencia``) y el cuadro espera la escritura;
+- hilo: el botón hace ``Persistencia.enviar`` y el bucle sólo corre
+  ``procesar()``, igual que ``root.after`` en las estaciones.
+
+Informa la latencia hasta la confirmación (p50/p99) y el cuadro más largo
+del bucle; con el hilo el cuadro no depende de la demora del disco.
+
+    python benchmarks/latencia_persistencia.py --demora 80 --llamados 40
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from queue_store import QueueStore
+from persistencia import Persistencia
+
+CUADRO_S = 1 / 60
+
+
+class StoreLento(QueueStore):
+    demora = 0.0
+
+    def _transaccion(self, construir, version_esperada=None):
+        time.sleep(self.demora)
+        return super()._transaccion(construir, version_esperada)
+
+
+class RaizFalsa:
+    """Sin ventana: el benchmark llama a ``procesar()`` en su propio bucle."""
+
+    def after(self, ms, funcion):
+        return None
+
+    def after_cancel(self, pendiente):
+        pass
+
+
+def preparar(archivo, pacientes):
+    store = QueueStore(archivo)
+    for i in range(pacientes):
+        store.registrar(f"Paciente {i}", "Medicina General", "Consultorio 1")
+
+
+def percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+
+def bucle(llamados, cada, pulsar, procesar, pendientes):
+    """Dibuja cuadros; cada ``cada`` cuadros pulsa el botón. Devuelve los tiempos de cuadro."""
+    cuadros = []
+    pulsados = 0
+    n = 0
+    while pulsados < llamados or pendientes():
+        inicio = time.perf_counter()
+        if pulsados < llamados and n % cada == 0:
+            pulsar()
+            pulsados += 1
+        procesar()
+        trabajo = time.perf_counter() - inicio
+        time.sleep(max(0.0, CUADRO_S - trabajo))
+        cuadros.append(time.perf_counter() - inicio)
+        n += 1
+    return cuadros
+
+
+def sincronico(archivo, llamados, cada):
+    store = StoreLento(archivo, consultorio='Consultorio 1')
+    latencias = []
+
+    def pulsar():
+        inicio = time.perf_counter()
+        store.llamar_siguiente('Consultorio 1')
+        latencias.append(time.perf_counter() - inicio)
+
+    cuadros = bucle(llamados, cada, pulsar, lambda: None, lambda: False)
+    return latencias, cuadros
+
+
+def con_hilo(archivo, llamados, cada):
+    persistencia = Persistencia(StoreLento(archivo, consultorio='Consultorio 1'))
+    persistencia.iniciar(RaizFalsa())
+    latencias = []
+    enviados = []
+
+    def pulsar():
+        inicio = time.perf_counter()
+        enviados.append(inicio)
+        persistencia.enviar('llamar_siguiente', 'Consultorio 1',
+                            al_terminar=lambda _: latencias.append(time.perf_counter() - inicio))
+
+    cuadros = bucle(llamados, cada, pulsar, persistencia.procesar, lambda: len(latencias) < len(enviados))
+    persistencia.detener()
+    return latencias, cuadros
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--demora', type=float, default=80, help="ms agregados a cada escritura")
+    parser.add_argument('--llamados', type=int, default=40)
+    parser.add_argument('--cada', type=int, default=6, help="cuadros entre pulsaciones del botón")
+    args = parser.parse_args()
+    StoreLento.demora = args.demora / 1000
+
+    for nombre, modo in (('sincrónico', sincronico), ('hilo', con_hilo)):
+        with tempfile.TemporaryDirectory() as tmp:
+            archivo = os.path.join(tmp, 'datos_hospital.json')
+            preparar(archivo, args.llamados)
+            latencias, cuadros = modo(archivo, args.llamados, args.cada)
+        print(f"{nombre:>11}: confirmación p50 {statistics.median(latencias) * 1000:6.1f} ms "
+              f"p99 {percentil(latencias, 0.99) * 1000:6.1f} ms | cuadro máx {max(cuadros) * 1000:6.1f} ms "
+              f"p99 {percentil(cuadros, 0.99) * 1000:6.1f} ms ({len(cuadros)} cuadros)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""Mide la migración del esquema 1 a la versión actual con varios meses de datos sintéticos.
+
+Del esquema 1 se prueban las dos formas que tenía el archivo: la lista plana
+(admision.py, sala_espera.py) y el diccionario ``"Consultorio N" -> lista``
+de consultoria.py, donde los pacientes no repiten el consultorio.
+
+    python benchmarks/migracion.py --meses 6 --por-dia 300
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import esquema
+from queue_store import ESPECIALIDADES_BASE
+
+
+def generar_v1(meses, por_dia):
+    """Archivo en el formato antiguo: lista plana de diccionarios."""
+    pacientes = []
+    inicio = datetime.now() - timedelta(days=30 * meses)
+    for d in range(30 * meses):
+        dia = inicio + timedelta(days=d)
+        for _ in range(por_dia):
+            esp = random.choice(ESPECIALIDADES_BASE)
+            registro = dia.replace(hour=7) + timedelta(seconds=random.randint(0, 6 * 3600))
+            atencion = registro + timedelta(minutes=random.randint(5, 120))
+            pacientes.append({
+                'id': len(pacientes) + 1,
+                'nombre': f"Paciente {random.randint(1, 10**6)}",
+                'especialidad': esp['nombre'],
+                'consultorio': esp['consultorio'],
+                'fecha_registro': registro.strftime("%Y-%m-%d %H:%M:%S"),
+                'atendido': True,
+                'fecha_atencion': atencion.strftime("%Y-%m-%d %H:%M:%S")
+            })
+    return {'especialidades': ESPECIALIDADES_BASE, 'pacientes': pacientes, 'ultimo_llamado': None}
+
+
+def por_consultorio(v1):
+    """El mismo archivo en la forma de consultoria.py: ``"Consultorio N" -> lista`` sin el consultorio."""
+    particiones = {}
+    for p in v1['pacientes']:
+        particiones.setdefault(p['consultorio'], []).append({k: v for k, v in p.items() if k != 'consultorio'})
+    return dict(v1, pacientes=particiones)
+
+
+def medir(funcion, repeticiones=3):
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--meses', type=int, default=6)
+    parser.add_argument('--por-dia', type=int, default=300)
+    args = parser.parse_args()
+
+    v1 = generar_v1(args.meses, args.por_dia)
+    texto_v1 = json.dumps(v1, indent=4, ensure_ascii=False)
+    t_migrar, actual = medir(lambda: esquema.migrar(v1))
+    v1_dict = por_consultorio(v1)
+    t_migrar_dict, actual_dict = medir(lambda: esquema.migrar(v1_dict))
+    if actual_dict['pacientes'] != actual['pacientes']:
+        print("ERROR: la forma por consultorio no migra a los mismos pacientes")
+        sys.exit(1)
+    texto_actual = json.dumps(actual, ensure_ascii=False, separators=(',', ':'))
+    v = f"v{esquema.VERSION_ESQUEMA}"
+
+    t_v1, _ = medir(lambda: json.loads(texto_v1))
+    t_actual, _ = medir(lambda: list(esquema.leer_pacientes(json.loads(texto_actual))))
+    t_part, _ = medir(lambda: list(esquema.leer_pacientes(json.loads(texto_actual), 'Consultorio 3')))
+
+    print(f"{len(v1['pacientes'])} pacientes ({args.meses} meses x {args.por_dia}/día)")
+    for etiqueta, valor in ((f"migración v1 -> {v}", f"{t_migrar * 1000:8.1f} ms"),
+                            ("  desde la forma por consult.", f"{t_migrar_dict * 1000:8.1f} ms"),
+                            (f"tamaño v1 / {v}", f"{len(texto_v1) / 1e6:8.2f} MB / {len(texto_actual) / 1e6:.2f} MB"),
+                            ("carga v1 (json)", f"{t_v1 * 1000:8.1f} ms"),
+                            (f"carga {v} (registros)", f"{t_actual * 1000:8.1f} ms"),
+                            (f"carga {v} (una partición)", f"{t_part * 1000:8.1f} ms")):
+        print(f"{etiqueta + ':':27}{valor}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""Compara los formatos del snapshot: tamaño, escritura y lectura.
+
+Arma un snapshot sintético (``--pacientes`` en ``--dias`` días, como un
+archivo que todavía no se archivó) y mide, para cada formato de
+``serializacion`` disponible y para el JSON indentado original:
+
+- bytes en disco;
+- codificar + escribir el archivo (``compactar``);
+- leer + decodificar el snapshot completo (admisión, sala de espera);
+- leer sólo la partición de un consultorio (``QueueStore`` parcial);
+- cargar un ``QueueStore`` completo desde ese archivo.
+
+    python benchmarks/serializacion.py --pacientes 5000 50000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import esquema
+import serializacion
+from esquema import Paciente
+from queue_store import ESPECIALIDADES_BASE, QueueStore
+
+
+def generar(pacientes, dias):
+    inicio = datetime.now().replace(hour=7, minute=0, second=0, microsecond=0) - timedelta(days=dias - 1)
+    lista = []
+    for i in range(1, pacientes + 1):
+        esp = random.choice(ESPECIALIDADES_BASE)
+        registro = inicio + timedelta(days=i * dias // (pacientes + 1), seconds=random.randint(0, 8 * 3600))
+        atendido = random.random() < 0.8
+        atencion = registro + timedelta(minutes=random.randint(5, 120)) if atendido else None
+        lista.append(Paciente(i, f"Paciente {random.randint(1, 10**6)}", esp['nombre'], esp['consultorio'],
+                              registro.strftime("%Y-%m-%d %H:%M:%S"), atendido,
+                              atencion and atencion.strftime("%Y-%m-%d %H:%M:%S"),
+                              random.choice((0, 0, 0, 1, 2, 3))))
+    return {
+        'version_esquema': esquema.VERSION_ESQUEMA,
+        'columnas': esquema.COLUMNAS,
+        'especialidades': ESPECIALIDADES_BASE,
+        'pacientes': esquema.particionar(lista),
+        'ultimo_llamado': None,
+        'ultimo_id': pacientes,
+        'log_offset': 0,
+        'version': pacientes,
+    }
+
+
+def medir(funcion, repeticiones=3):
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, resultado
+
+
+class JsonIndentado:
+    """El formato original: ``json.dump(indent=4)`` de la lista de diccionarios."""
+    nombre = 'json indentado'
+
+    def codificar(self, datos):
+        pacientes = [p.a_dict() for p in esquema.leer_pacientes(datos)]
+        original = dict(datos, pacientes=pacientes, version_esquema=1)
+        return json.dumps(original, ensure_ascii=False, indent=4).encode('utf-8')
+
+    def decodificar(self, contenido, consultorio=None):
+        return esquema.migrar(json.loads(contenido.decode('utf-8')))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pacientes', type=int, nargs='+', default=[5000, 50000])
+    parser.add_argument('--dias', type=int, default=30)
+    args = parser.parse_args()
+
+    formatos = [JsonIndentado()] + [f for f in serializacion.FORMATOS.values() if f.disponible()]
+    faltan = [f.nombre for f in serializacion.FORMATOS.values() if not f.disponible()]
+    for n in args.pacientes:
+        datos = generar(n, args.dias)
+        print(f"== {n} pacientes en {args.dias} días" + (f" (no disponibles: {', '.join(faltan)})" if faltan else ""))
+        with tempfile.TemporaryDirectory() as tmp:
+            for formato in formatos:
+                ruta = os.path.join(tmp, 'datos_hospital.json')
+                t_escribir, _ = medir(lambda: serializacion.escribir_archivo(ruta, datos, formato))
+                with open(ruta, 'rb') as f:
+                    contenido = f.read()
+                t_leer, leido = medir(lambda: formato.decodificar(open(ruta, 'rb').read()))
+                t_parcial, _ = medir(lambda: formato.decodificar(open(ruta, 'rb').read(), 'Consultorio 3'))
+                if leido['pacientes'] != datos['pacientes']:
+                    print(f"  ERROR: {formato.nombre} no devuelve los mismos pacientes")
+                    sys.exit(1)
+                if isinstance(formato, JsonIndentado):
+                    t_store = float('nan')  # QueueStore lo migra igual que el JSON compacto
+                else:
+                    t_store, _ = medir(lambda: QueueStore(ruta), repeticiones=1)
+                print(f"  {formato.nombre:>14}: {len(contenido) / 1024:9.1f} KB  escribir {t_escribir * 1000:7.1f} ms  "
+                      f"leer {t_leer * 1000:7.1f} ms  un consultorio {t_parcial * 1000:7.1f} ms  "
+                      f"QueueStore {t_store * 1000:7.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""Carga del servidor de colas con muchos clientes simulados.
+
+Levanta ``ServidorColas`` en un puerto local sobre un archivo temporal y
+conecta ``--admisiones`` clientes que registran pacientes y
+``--consultorios`` clientes que llaman al siguiente, todos en hilos del
+mismo proceso. Sólo se registran pacientes en las especialidades de los
+consultorios simulados. Al final verifica que no haya turnos perdidos ni duplicados
+y que cada réplica haya recibido todos los eventos.
+
+    python benchmarks/servidor_carga.py --admisiones 4 --consultorios 14 --pacientes 200
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from queue_store import QueueStore, ESPECIALIDADES_BASE
+from servidor_colas import ServidorColas
+from cliente_colas import ClienteColas
+
+
+def iniciar_servidor(archivo):
+    """Servidor en un hilo con su propio bucle asyncio; devuelve el puerto."""
+    listo = threading.Event()
+    estado = {}
+
+    def correr():
+        async def principal():
+            servidor = await ServidorColas(QueueStore(archivo), puerto=0).iniciar()
+            estado['puerto'] = servidor.puerto
+            listo.set()
+            await asyncio.Event().wait()
+        asyncio.run(principal())
+
+    threading.Thread(target=correr, daemon=True).start()
+    listo.wait()
+    return estado['puerto']
+
+
+def admision(direccion, indice, cantidad, especialidades, latencias):
+    cliente = ClienteColas(direccion)
+    for i in range(cantidad):
+        esp = especialidades[(indice + i) % len(especialidades)]
+        inicio = time.perf_counter()
+        cliente.registrar(f"Paciente {indice}-{i}", esp['nombre'], esp['consultorio'])
+        latencias.append(time.perf_counter() - inicio)
+    cliente.cerrar()
+
+
+def consultorio(direccion, nombre, fin, llamados, latencias):
+    cliente = ClienteColas(direccion, consultorio=nombre)
+    while True:
+        inicio = time.perf_counter()
+        p = cliente.llamar_siguiente(nombre)
+        if p is None:
+            if fin.is_set():
+                break
+            time.sleep(0.01)
+            continue
+        latencias.append(time.perf_counter() - inicio)
+        llamados.append(p.id)
+    cliente.cerrar()
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--admisiones', type=int, default=4)
+    parser.add_argument('--consultorios', type=int, default=14)
+    parser.add_argument('--pacientes', type=int, default=200, help="pacientes por admisión")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        archivo = os.path.join(directorio, 'datos_hospital.json')
+        direccion = ('127.0.0.1', iniciar_servidor(archivo))
+        observador = ClienteColas(direccion)
+
+        fin = threading.Event()
+        llamados, lat_registro, lat_llamado = [], [], []
+        especialidades = ESPECIALIDADES_BASE[:max(1, min(args.consultorios, len(ESPECIALIDADES_BASE)))]
+        hilos_consultorio = [threading.Thread(target=consultorio, args=(direccion, s, fin, llamados, lat_llamado))
+                             for s in dict.fromkeys(e['consultorio'] for e in especialidades)]
+        hilos_admision = [threading.Thread(target=admision,
+                                           args=(direccion, i, args.pacientes, especialidades, lat_registro))
+                          for i in range(args.admisiones)]
+
+        inicio = time.perf_counter()
+        for h in hilos_consultorio + hilos_admision:
+            h.start()
+        for h in hilos_admision:
+            h.join()
+        fin.set()
+        for h in hilos_consultorio:
+            h.join()
+        duracion = time.perf_counter() - inicio
+
+        total = args.admisiones * args.pacientes
+        observador._esperar_version(2 * total)
+        pacientes = observador.cola.pacientes
+        errores = []
+        if len(pacientes) != total:
+            errores.append(f"{len(pacientes)} pacientes en la réplica, se esperaban {total}")
+        if len(llamados) != len(set(llamados)):
+            errores.append(f"{len(llamados) - len(set(llamados))} pacientes llamados dos veces")
+        if len(llamados) != total:
+            errores.append(f"{len(llamados)} llamados, se esperaban {total}")
+        if any(not p.atendido for p in pacientes.values()):
+            errores.append("la réplica tiene pacientes sin atender")
+        if observador.version != 2 * total:
+            errores.append(f"versión {observador.version}, se esperaba {2 * total}")
+        observador.cerrar()
+
+    print(f"{total} registros y {len(llamados)} llamados en {duracion:.2f} s "
+          f"({args.admisiones} admisiones, {len(hilos_consultorio)} consultorios)")
+    for nombre, lat in (('registrar', lat_registro), ('llamar_siguiente', lat_llamado)):
+        print(f"{nombre:17} media {statistics.mean(lat) * 1000:6.2f} ms  "
+              f"p50 {percentil(lat, 0.5) * 1000:6.2f} ms  p99 {percentil(lat, 0.99) * 1000:6.2f} ms")
+    if errores:
+        print("ERRORES:\n  " + "\n  ".join(errores))
+        sys.exit(1)
+    print("OK: sin turnos perdidos ni duplicados")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,230 @@
+"""Simulación de días completos de atención, sin ventanas.
+
+Reproduce un día sintético sobre ``QueueStore`` en un directorio temporal:
+llegadas de Poisson repartidas entre las 14 especialidades y tiempos de
+atención exponenciales por consultorio (cada sala con su propio ritmo). Las
+operaciones se ejecutan en el orden que dicta el reloj simulado, pero sin
+esperar. En paralelo, una réplica de la sala de espera y otra de un
+consultorio refrescan cada ``--refresco`` operaciones, como lo hace el
+hilo de ``persistencia``.
+
+Informa p50/p99 de registrar, llamar al siguiente y refrescar, y los bytes
+escritos por operación. Cada corrida se agrega a ``benchmarks/resultados.jsonl``
+y se compara con la última corrida del mismo tamaño.
+
+    python benchmarks/simulacion.py --pacientes 500 5000
+    python benchmarks/simulacion.py --pacientes 50000 --semilla 7
+"""
+import argparse
+import heapq
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from queue_store import QueueStore, ESPECIALIDADES_BASE, ahora
+from cola_hospital import dia_de
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+ARCHIVO_RESULTADOS = os.path.join(DIRECTORIO, 'resultados.jsonl')
+JORNADA_S = 8 * 3600
+OCUPACION = 0.9  # Fracción del día que cada consultorio pasa atendiendo
+UMBRAL_REGRESION = 0.20
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+
+def tamano(ruta):
+    try:
+        return os.path.getsize(ruta)
+    except FileNotFoundError:
+        return 0
+
+
+class Medidor:
+    def __init__(self):
+        self.latencias = {}
+        self.bytes = {}
+
+    def medir(self, nombre, funcion, archivo=None):
+        antes = tamano(archivo) if archivo else 0
+        inicio = time.perf_counter()
+        resultado = funcion()
+        self.latencias.setdefault(nombre, []).append(time.perf_counter() - inicio)
+        if archivo:
+            self.bytes[nombre] = self.bytes.get(nombre, 0) + tamano(archivo) - antes
+        return resultado
+
+    def resumen(self):
+        resumen = {}
+        for nombre, lat in self.latencias.items():
+            resumen[nombre] = {
+                'ops': len(lat),
+                'p50_ms': round(percentil(lat, 0.5) * 1000, 3),
+                'p99_ms': round(percentil(lat, 0.99) * 1000, 3),
+            }
+            if nombre in self.bytes:
+                resumen[nombre]['bytes_op'] = round(self.bytes[nombre] / len(lat), 1)
+        return resumen
+
+
+def refrescar(store, consultorio=None):
+    """Lo que hace una pantalla en cada cambio: aplicar eventos y armar sus filas."""
+    store.actualizar()
+    store.tomar_eventos()
+    hoy = dia_de(ahora())
+    if consultorio:
+        filas = list(store.cola.en_espera(consultorio, hoy)) + list(store.cola.historial(consultorio, hoy))
+    else:
+        filas = list(store.cola.espera_del_dia(hoy)) + list(store.cola.atendidos_del_dia(hoy))
+    return len(filas)
+
+
+def simular(pacientes, semilla, cada_refresco):
+    rng = random.Random(semilla)
+    salas = [e['consultorio'] for e in ESPECIALIDADES_BASE]
+    # Cada sala tiene su propio ritmo; la media mantiene la ocupación pedida
+    servicio_medio = OCUPACION * JORNADA_S * len(salas) / pacientes
+    ritmo = {s: servicio_medio * rng.uniform(0.6, 1.4) for s in salas}
+
+    eventos = []  # (tiempo simulado, orden, tipo, dato)
+    t = 0.0
+    for i in range(pacientes):
+        t += rng.expovariate(pacientes / JORNADA_S)
+        heapq.heappush(eventos, (t, i, 'llegada', (i, rng.choice(ESPECIALIDADES_BASE))))
+    orden = pacientes
+    libre = dict.fromkeys(salas, True)
+    medidor = Medidor()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        archivo = os.path.join(directorio, 'datos_hospital.json')
+        store = QueueStore(archivo)
+        sala = QueueStore(archivo)
+        sala.escuchar()
+        consultorio = QueueStore(archivo, consultorio=salas[0])
+        consultorio.escuchar()
+        log = store.archivo_log
+
+        operaciones = 0
+        inicio = time.perf_counter()
+        while eventos:
+            t, _, tipo, dato = heapq.heappop(eventos)
+            if tipo == 'llegada':
+                i, esp = dato
+                medidor.medir('registrar', lambda: store.registrar(
+                    f"Paciente {i}", esp['nombre'], esp['consultorio']), log)
+                sala_destino = esp['consultorio']
+                if not libre[sala_destino]:
+                    continue
+                libre[sala_destino] = False
+                dato = sala_destino
+            # La sala queda libre: llama al siguiente si hay alguien esperando
+            p = medidor.medir('llamar_siguiente', lambda: store.llamar_siguiente(dato), log)
+            if p is None:
+                libre[dato] = True
+            else:
+                orden += 1
+                heapq.heappush(eventos, (t + rng.expovariate(1 / ritmo[dato]), orden, 'libre', dato))
+            operaciones += 1
+            if operaciones % cada_refresco == 0:
+                medidor.medir('refresco_sala', lambda: refrescar(sala))
+                medidor.medir('refresco_consultorio', lambda: refrescar(consultorio, salas[0]))
+        duracion = time.perf_counter() - inicio
+
+        bytes_log = tamano(log)
+        medidor.medir('compactar', store.compactar, archivo)
+        atendidos = sum(1 for p in store.cola.pacientes.values() if p.atendido)
+
+    return {
+        'pacientes': pacientes,
+        'atendidos': atendidos,
+        'duracion_s': round(duracion, 3),
+        'bytes_log': bytes_log,
+        'operaciones': medidor.resumen(),
+    }
+
+
+def revision_git():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=DIRECTORIO,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def anterior(pacientes, semilla):
+    """Última corrida guardada con los mismos parámetros."""
+    ultima = None
+    try:
+        with open(ARCHIVO_RESULTADOS, 'r', encoding='utf-8') as f:
+            for linea in f:
+                r = json.loads(linea)
+                if r['pacientes'] == pacientes and r.get('semilla') == semilla:
+                    ultima = r
+    except FileNotFoundError:
+        pass
+    return ultima
+
+
+def imprimir(resultado, previo):
+    print(f"\n{resultado['pacientes']} pacientes/día: {resultado['atendidos']} atendidos, "
+          f"{resultado['duracion_s']:.2f} s, log {resultado['bytes_log'] / 1e6:.2f} MB"
+          + (f"  (vs {previo['revision']} del {previo['fecha']})" if previo else ""))
+    regresiones = []
+    for nombre, m in resultado['operaciones'].items():
+        linea = f"  {nombre:22} {m['ops']:7} ops  p50 {m['p50_ms']:8.3f} ms  p99 {m['p99_ms']:8.3f} ms"
+        if 'bytes_op' in m:
+            linea += f"  {m['bytes_op']:8.1f} B/op"
+        antes = previo and previo['operaciones'].get(nombre)
+        if antes and antes['p99_ms'] > 0:
+            cambio = m['p99_ms'] / antes['p99_ms'] - 1
+            linea += f"  p99 {cambio:+.0%}"
+            if cambio > UMBRAL_REGRESION:
+                regresiones.append(nombre)
+        print(linea)
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pacientes', type=int, nargs='+', default=[500, 5000],
+                        help="pacientes por día a simular (uno o varios tamaños)")
+    parser.add_argument('--semilla', type=int, default=1)
+    parser.add_argument('--refresco', type=int, default=10,
+                        help="operaciones entre refrescos de las pantallas")
+    parser.add_argument('--no-guardar', action='store_true', help="no agregar a resultados.jsonl")
+    args = parser.parse_args()
+
+    regresiones = []
+    for pacientes in args.pacientes:
+        resultado = simular(pacientes, args.semilla, args.refresco)
+        resultado.update({
+            'fecha': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'revision': revision_git(),
+            'python': platform.python_version(),
+            'plataforma': platform.platform(),
+            'semilla': args.semilla,
+        })
+        regresiones += [f"{pacientes}: {n}" for n in imprimir(resultado, anterior(pacientes, args.semilla))]
+        if not args.no_guardar:
+            with open(ARCHIVO_RESULTADOS, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(resultado, ensure_ascii=False) + '\n')
+
+    if regresiones:
+        print(f"\nRegresiones de p99 mayores a {UMBRAL_REGRESION:.0%}: " + ", ".join(regresiones))
+
+
+if __name__ == '__main__':
+    main()
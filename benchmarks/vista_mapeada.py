@@ -0,0 +1,146 @@
+"""Pantalla de sala de espera: réplica completa contra la vista mapeada.
+
+Arma un día con ``--pacientes`` turnos repartidos en las especialidades
+base (la mitad ya atendidos) y compara, para la sala de espera:
+
+- réplica: ``QueueStore`` completo, como antes de ``vista_mapeada``;
+- vista: ``LectorVista`` más el store vacío (``consultorio=()``) que sólo
+  sigue el log para los llamados.
+
+Informa la memoria que reserva cada una al abrir (tracemalloc), el tiempo de
+apertura y el de un refresco de las listas (espera completa + las filas
+visibles de atendidos), y el costo de ``version()``. Al final mide cuánto
+agrega publicar la vista a cada registro (SISTEMACOLAS_VISTA=1 contra 0).
+
+    python benchmarks/vista_mapeada.py --pacientes 1000 5000 20000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import esquema
+import serializacion
+import vista_mapeada
+from esquema import Paciente
+from queue_store import ESPECIALIDADES_BASE, QueueStore
+from vista_mapeada import LectorVista, ruta_vista
+
+FILAS_VISIBLES = 20
+
+
+def generar(archivo, pacientes):
+    """Snapshot con ``pacientes`` turnos de hoy; la mitad ya atendidos."""
+    inicio = datetime.now().replace(hour=7, minute=0, second=0, microsecond=0)
+    lista = []
+    for i in range(1, pacientes + 1):
+        esp = random.choice(ESPECIALIDADES_BASE)
+        registro = inicio + timedelta(seconds=i * 8 * 3600 // pacientes)
+        atendido = i <= pacientes // 2
+        atencion = registro + timedelta(minutes=random.randint(5, 60)) if atendido else None
+        lista.append(Paciente(i, f"Paciente {random.randint(1, 10**6)} de {esp['nombre']}", esp['nombre'],
+                              esp['consultorio'], registro.strftime("%Y-%m-%d %H:%M:%S"), atendido,
+                              atencion and atencion.strftime("%Y-%m-%d %H:%M:%S"),
+                              random.choice((0, 0, 0, 1, 2, 3))))
+    serializacion.escribir_archivo(archivo, {
+        'version_esquema': esquema.VERSION_ESQUEMA,
+        'columnas': esquema.COLUMNAS,
+        'especialidades': ESPECIALIDADES_BASE,
+        'pacientes': esquema.particionar(lista),
+        'ultimo_llamado': None,
+        'ultimo_id': pacientes,
+        'log_offset': 0,
+        'version': pacientes,
+    })
+    QueueStore(archivo).compactar()  # Publica la vista de todos los consultorios
+
+
+def medir(funcion, repeticiones=5):
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, resultado
+
+
+def abrir(funcion):
+    """(segundos, bytes reservados que siguen vivos, resultado) de abrir una fuente."""
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    resultado = funcion()
+    segundos = time.perf_counter() - inicio
+    memoria = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return segundos, memoria, resultado
+
+
+def refrescar(cola, hoy):
+    """Lo que lee ``SalaEspera._cargar_listas``: toda la espera y las filas visibles de atendidos."""
+    espera = cola.espera_del_dia(hoy)
+    atendidos = cola.atendidos_del_dia(hoy)
+    return len(espera), atendidos[:FILAS_VISIBLES]
+
+
+def escrituras(archivo, cantidad):
+    """Milisegundos por ``registrar`` (cada uno con su escritura) con la vista activa o no."""
+    resultado = {}
+    for valor in ('0', '1'):
+        os.environ[vista_mapeada.VARIABLE_VISTA] = valor
+        store = QueueStore(archivo)
+        inicio = time.perf_counter()
+        for i in range(cantidad):
+            esp = random.choice(ESPECIALIDADES_BASE)
+            store.registrar(f"Nuevo {valor}-{i}", esp['nombre'], esp['consultorio'])
+        resultado[valor] = (time.perf_counter() - inicio) / cantidad * 1000
+    os.environ[vista_mapeada.VARIABLE_VISTA] = '1'
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pacientes', type=int, nargs='+', default=[1000, 5000, 20000])
+    parser.add_argument('--escrituras', type=int, default=200, help="registros para medir la publicación")
+    args = parser.parse_args()
+    hoy = datetime.now().strftime("%Y-%m-%d")
+
+    errores = []
+    for n in args.pacientes:
+        print(f"== {n} pacientes hoy")
+        with tempfile.TemporaryDirectory() as tmp:
+            archivo = os.path.join(tmp, 'datos_hospital.json')
+            generar(archivo, n)
+
+            t_replica, m_replica, replica = abrir(lambda: QueueStore(archivo))
+            t_vista, m_vista, (lector, _) = abrir(lambda: (LectorVista(ruta_vista(archivo)),
+                                                          QueueStore(archivo, consultorio=())))
+            r_replica, esperado = medir(lambda: refrescar(replica.cola, hoy))
+            r_vista, obtenido = medir(lambda: refrescar(lector, hoy))
+            if esperado[0] != obtenido[0] or [p.id for p in esperado[1]] != [p.id for p in obtenido[1]]:
+                errores.append(f"{n} pacientes: la vista no muestra lo mismo que la réplica")
+            t_version, _ = medir(lambda: [lector.version() for _ in range(1000)])
+
+            for nombre, segundos, memoria, refresco in (('réplica', t_replica, m_replica, r_replica),
+                                                        ('vista', t_vista, m_vista, r_vista)):
+                print(f"  {nombre:>8}: abrir {segundos * 1000:7.1f} ms  memoria {memoria / 1024:8.1f} KB  "
+                      f"refresco {refresco * 1000:6.2f} ms")
+            en_uso = vista_mapeada.CABECERA.unpack(lector._leer(0, vista_mapeada.CABECERA.size))[4]
+            print(f"  version(): {t_version * 1000:.2f} µs  vista en uso: {en_uso / 1024:.0f} KB "
+                  f"de {vista_mapeada.TAMANO_VISTA // 1024} KB")
+            costo = escrituras(archivo, args.escrituras)
+            print(f"  registrar: {costo['0']:.2f} ms sin publicar, {costo['1']:.2f} ms publicando la vista")
+            lector.cerrar()
+
+    for e in errores:
+        print(f"ERROR: {e}")
+    sys.exit(1 if errores else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""Bloqueo entre procesos y escritura atómica de archivos.
+
+Las estaciones (admisión, consultorios y sala de espera) son procesos
+distintos que comparten los mismos archivos, así que un ``threading.Lock``
+no basta: se usa un bloqueo consultivo del sistema operativo sobre un
+archivo ``.lock`` junto al archivo de datos.
+"""
+import os
+import tempfile
+import threading
+import time
+
+if os.name == 'nt':
+    import msvcrt
+else:
+    import fcntl
+
+
+class BloqueoArchivo:
+    """Bloqueo exclusivo entre procesos (y entre hilos del mismo proceso)."""
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.espera = 0.0  # Segundos de espera de la última adquisición
+        self._hilos = threading.Lock()
+        self._fd = None
+
+    def __enter__(self):
+        inicio = time.perf_counter()
+        self._hilos.acquire()
+        try:
+            self._fd = os.open(self.ruta, os.O_RDWR | os.O_CREAT, 0o666)
+            if os.name == 'nt':
+                # msvcrt no tiene una espera indefinida: se reintenta
+                while True:
+                    try:
+                        os.lseek(self._fd, 0, os.SEEK_SET)
+                        msvcrt.locking(self._fd, msvcrt.LK_NBLCK, 1)
+                        break
+                    except OSError:
+                        time.sleep(0.005)
+            else:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+        except BaseException:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+            self._hilos.release()
+            raise
+        self.espera = time.perf_counter() - inicio
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            if os.name == 'nt':
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+            self._hilos.release()
+        return False
+
+
+def escribir_atomico(ruta, contenido):
+    """Escribe en un temporal y lo reemplaza con ``os.replace``.
+
+    Un lector concurrente ve el archivo anterior o el nuevo, nunca uno
+    truncado o a medio escribir.
+    """
+    if isinstance(contenido, str):
+        contenido = contenido.encode('utf-8')
+    directorio = os.path.dirname(os.path.abspath(ruta))
+    fd, temporal = tempfile.mkstemp(prefix='.tmp_', dir=directorio)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(contenido)
+            f.flush()
+            os.fsync(f.fileno())
+        for intento in range(50):
+            try:
+                os.replace(temporal, ruta)
+                break
+            except PermissionError:
+                # En Windows falla si otro proceso tiene el destino abierto
+                if intento == 49:
+                    raise
+                time.sleep(0.01)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+
+
+def agregar_linea(ruta, datos):
+    """Agrega bytes al final del archivo (modo append) y fuerza su escritura a disco."""
+    fd = os.open(ruta, os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, 'O_BINARY', 0), 0o666)
+    try:
+        pendiente = memoryview(datos)
+        while pendiente:
+            pendiente = pendiente[os.write(fd, pendiente):]
+        os.fsync(fd)
+    finally:
+        os.close(fd)
@@ -0,0 +1,180 @@
+"""Cliente del servidor de colas (ver ``servidor_colas.py``).
+
+``ClienteColas`` ofrece la misma interfaz que ``QueueStore`` para que las
+estaciones no distingan el modo archivo del modo servidor: mantiene una
+réplica local de la cola alimentada por una conexión de suscripción y envía
+las operaciones por una segunda conexión que se reutiliza entre pedidos.
+"""
+import json
+import queue
+import socket
+import threading
+import time
+
+from queue_store import EstadoCola, ConflictoVersion, TAMANO_PAGINA
+from cola_hospital import TurnoDuplicado
+from esquema import Paciente
+
+PUERTO_POR_DEFECTO = 8765
+
+ERRORES = {
+    'TurnoDuplicado': TurnoDuplicado,
+    'ConflictoVersion': ConflictoVersion,
+}
+
+
+def _direccion(texto):
+    host, _, puerto = texto.partition(':')
+    return host or '127.0.0.1', int(puerto or PUERTO_POR_DEFECTO)
+
+
+class ClienteColas(EstadoCola):
+    def __init__(self, direccion, consultorio=None, timeout=5.0):
+        self.direccion = _direccion(direccion) if isinstance(direccion, str) else direccion
+        self.consultorio = consultorio
+        self.timeout = timeout
+        self._lock = threading.RLock()
+        self._lock_pedidos = threading.Lock()
+        self._sock = None
+        self._lector = None
+        self._entrantes = queue.Queue()  # Mensajes de la suscripción aún no aplicados
+        self._recibidos = 0
+        self._activo = True
+        self._conectado = threading.Event()
+        self.version = 0
+        self.datos = {'especialidades': [], 'ultimo_llamado': None}
+        threading.Thread(target=self._suscribirse, name='suscripcion', daemon=True).start()
+        if not self._conectado.wait(timeout):
+            self._activo = False
+            raise ConnectionError(f"No responde el servidor de colas en {self.direccion[0]}:{self.direccion[1]}")
+        self.actualizar()
+
+    # Suscripción
+
+    def _suscribirse(self):
+        """Recibe el snapshot y los eventos del servidor; se reconecta si se corta."""
+        while self._activo:
+            try:
+                with socket.create_connection(self.direccion, timeout=self.timeout) as sock:
+                    sock.settimeout(None)
+                    sock.sendall(b'{"op": "suscribir"}\n')
+                    for linea in sock.makefile('rb'):
+                        self._entrantes.put(json.loads(linea))
+                        self._recibidos += 1
+                        self._conectado.set()
+            except (OSError, ValueError) as e:
+                print(f"Suscripción al servidor interrumpida: {e}")
+            time.sleep(1)
+
+    def firma_cambios(self):
+        return self._recibidos
+
+    def actualizar(self):
+        """Aplica los mensajes recibidos del servidor y devuelve los eventos aplicados."""
+        with self._lock:
+            eventos = []
+            while True:
+                try:
+                    mensaje = self._entrantes.get_nowait()
+                except queue.Empty:
+                    return eventos
+                if mensaje.get('op') == 'estado':
+                    self._cargar_estado(mensaje['datos'])
+                    if self.feed is not None:
+                        self.feed.append({'op': 'recarga', 'v': self.version})
+                elif self._recibir(mensaje):
+                    eventos.append(mensaje)
+
+    def _esperar_version(self, version):
+        """Espera a que la réplica local incluya la operación confirmada."""
+        limite = time.monotonic() + self.timeout
+        while True:
+            self.actualizar()
+            if self.version >= version or time.monotonic() > limite:
+                return
+            time.sleep(0.002)
+
+    # Pedidos
+
+    def _pedir(self, **pedido):
+        with self._lock_pedidos:
+            try:
+                if self._sock is None:
+                    self._sock = socket.create_connection(self.direccion, timeout=self.timeout)
+                    self._lector = self._sock.makefile('rb')
+                self._sock.sendall(json.dumps(pedido, ensure_ascii=False).encode('utf-8') + b'\n')
+                linea = self._lector.readline()
+                if not linea:
+                    raise ConnectionError("El servidor cerró la conexión")
+            except OSError:
+                self.cerrar_conexion()
+                raise
+        respuesta = json.loads(linea)
+        if not respuesta.get('ok'):
+            raise ERRORES.get(respuesta.get('error'), RuntimeError)(respuesta.get('mensaje'))
+        if 'v' in respuesta:
+            self._esperar_version(respuesta['v'])
+        return respuesta
+
+    def _paciente(self, datos):
+        if datos is None:
+            return None
+        # El consultorio con réplica parcial no guarda pacientes de otras salas
+        return self.cola.pacientes.get(datos['id']) or Paciente.desde_dict(datos)
+
+    def cerrar_conexion(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = self._lector = None
+
+    def cerrar(self):
+        self._activo = False
+        self.cerrar_conexion()
+
+    def registrar(self, nombre, especialidad, consultorio, prioridad=0):
+        respuesta = self._pedir(op='registrar', nombre=nombre, especialidad=especialidad, consultorio=consultorio,
+                                prioridad=prioridad)
+        return self._paciente(respuesta['paciente'])
+
+    def llamar(self, paciente_id, version_esperada=None, consultorio=None):
+        respuesta = self._pedir(op='llamar', id=paciente_id, version_esperada=version_esperada,
+                                consultorio=consultorio)
+        return self._paciente(respuesta['paciente'])
+
+    def reasignar(self, paciente_id, consultorio, especialidad):
+        respuesta = self._pedir(op='reasignar', id=paciente_id, consultorio=consultorio, especialidad=especialidad)
+        return self._paciente(respuesta['paciente'])
+
+    def llamar_siguiente(self, consultorio, grupo=()):
+        respuesta = self._pedir(op='llamar_siguiente', consultorio=consultorio, grupo=list(grupo))
+        return self._paciente(respuesta['paciente'])
+
+    def rellamar(self, mensaje, paciente_id=None):
+        self._pedir(op='rellamar', mensaje=mensaje, id=paciente_id)
+
+    def confirmar_rellamado(self):
+        self._pedir(op='confirmar_rellamado')
+
+    def consultar(self, desde=None, hasta=None):
+        for datos in self._pedir(op='consultar', desde=desde, hasta=hasta)['pacientes']:
+            yield Paciente.desde_dict(datos)
+
+    def pagina(self, desde=None, hasta=None, cursor=None, tamano=TAMANO_PAGINA,
+               consultorio=None, especialidad=None):
+        respuesta = self._pedir(op='pagina', desde=desde, hasta=hasta, cursor=cursor, tamano=tamano,
+                                consultorio=consultorio, especialidad=especialidad)
+        siguiente = respuesta['cursor']
+        return [Paciente.desde_dict(d) for d in respuesta['pacientes']], tuple(siguiente) if siguiente else None
+
+    def resumen_estadisticas(self, desde=None, hasta=None, por='especialidad'):
+        return self._pedir(op='estadisticas', desde=desde, hasta=hasta, por=por)['resumen']
+
+    def archivar(self, hoy=None):
+        """El servidor archiva según su propia fecha; ``hoy`` se ignora."""
+        return self._pedir(op='archivar')['archivados']
+
+    def compactar(self):
+        """El servidor es dueño del snapshot; no hay nada que hacer en la estación."""
@@ -0,0 +1,230 @@
+"""Modelo en memoria de la cola del hospital con índices.
+
+Evita filtrar y ordenar toda la lista de pacientes en cada refresco:
+
+- una cola por (día, consultorio) con un carril por prioridad, en orden de
+  llegada dentro de cada carril, con alta y baja O(1);
+- un índice nombre+día de turnos pendientes para detectar duplicados en O(1);
+- un contador de turnos monótono;
+- los atendidos de cada consultorio, el más reciente primero (el historial
+  muestra los últimos ``TAMANO_HISTORIAL``). Se ordenan por hora de
+  atención y turno, tanto al cargar un snapshot como al llamar, así todas
+  las estaciones (y la vista de la sala de espera) muestran el mismo orden.
+
+Los índices usan la clave del día y las fechas en segundos que cada
+``Paciente`` calcula al crearse; ninguna operación vuelve a leer las fechas
+como texto.
+"""
+import heapq
+import itertools
+from collections import OrderedDict, defaultdict, deque
+
+TAMANO_HISTORIAL = 20
+
+# Carriles de prioridad; cada paciente guarda el índice (0 = general)
+PRIORIDADES = ('General', 'Adulto mayor', 'Gestante', 'Emergencia')
+# Minutos que adelanta cada carril. Es un envejecimiento lineal: quien ya
+# esperó más que el adelanto de un carril pasa delante de los que llegan a él,
+# así ningún paciente general queda relegado indefinidamente.
+ADELANTO_MIN = (0, 30, 30, 120)
+
+
+def dia_de(fecha):
+    """'2025-04-27 10:15:00' -> '2025-04-27'"""
+    return fecha[:10]
+
+
+def _insertar_atendido(atendidos, p):
+    """Agrega ``p`` a ``atendidos`` (el más reciente primero) en su lugar por hora de atención y turno.
+
+    Casi siempre va al principio; dos llamados en el mismo segundo, o relojes
+    de estaciones algo distintos, lo dejan unas posiciones más atrás.
+    """
+    clave = (p.segundos_atencion, p.id)
+    i = 0
+    for q in atendidos:
+        if (q.segundos_atencion, q.id) <= clave:
+            break
+        i += 1
+    atendidos.insert(i, p)
+
+
+def clave_prioridad(p):
+    """Orden de atención en el día: minuto de llegada menos el adelanto de su prioridad, segundo y turno."""
+    minuto, segundo = divmod(p.segundos_registro % 86400, 60)
+    return (minuto - ADELANTO_MIN[p.prioridad], segundo, p.id)
+
+
+def etiqueta_prioridad(p):
+    """' [Gestante]' para los pacientes con prioridad, '' para los generales."""
+    return f" [{PRIORIDADES[p.prioridad]}]" if p.prioridad else ""
+
+
+class TurnoDuplicado(ValueError):
+    """El paciente ya tiene un turno pendiente para ese día."""
+
+
+class ColaPrioridad:
+    """Pacientes en espera de un consultorio, un carril FIFO por prioridad.
+
+    Dentro de un carril el orden de llegada coincide con ``clave_prioridad``:
+    el siguiente paciente sale de comparar las cabezas de los carriles y la
+    cola completa de mezclarlos, sin reordenar. La clave de cada paciente se
+    calcula una vez al encolarlo y se guarda en ``claves`` (id -> clave).
+    """
+    __slots__ = ('carriles', 'claves')
+
+    def __init__(self, claves=None):
+        self.carriles = [OrderedDict() for _ in PRIORIDADES]
+        self.claves = {} if claves is None else claves
+
+    def __len__(self):
+        return sum(len(c) for c in self.carriles)
+
+    def __iter__(self):
+        """Pacientes en orden de atención."""
+        return mezclar([c for c in self.carriles if c], self.claves)
+
+    def agregar(self, p):
+        """Agrega al final de su carril; si llegó antes que el último, reordena ese carril."""
+        carril = self.carriles[p.prioridad]
+        carril[p.id] = p
+        self.claves[p.id] = clave_prioridad(p)
+        anteriores = reversed(carril.values())
+        next(anteriores)
+        previo = next(anteriores, None)
+        if previo is not None and (previo.segundos_registro, previo.id) > (p.segundos_registro, p.id):
+            self.carriles[p.prioridad] = OrderedDict(
+                (x.id, x) for x in sorted(carril.values(), key=lambda x: (x.segundos_registro, x.id)))
+
+    def quitar(self, p):
+        if self.carriles[p.prioridad].pop(p.id, None) is not None:
+            self.claves.pop(p.id, None)
+
+    def primero(self):
+        cabezas = [next(iter(c.values())) for c in self.carriles if c]
+        return min(cabezas, key=lambda x: self.claves[x.id]) if cabezas else None
+
+
+def mezclar(carriles, claves):
+    """Une carriles ya ordenados (id -> paciente) en orden de atención."""
+    if len(carriles) == 1:
+        return iter(carriles[0].values())
+    return heapq.merge(*(c.values() for c in carriles), key=lambda x: claves[x.id])
+
+
+class ColaHospital:
+    def __init__(self, pacientes=()):
+        self.pacientes = {}  # id -> paciente
+        self.ultimo_id = 0
+        self._claves = {}  # id -> clave_prioridad de cada paciente en espera
+        self._espera = defaultdict(lambda: ColaPrioridad(self._claves))  # (dia, consultorio)
+        self._pendientes = {}  # (nombre en minúsculas, dia) -> id
+        self._historial = defaultdict(deque)  # (dia, consultorio) -> atendidos, el más reciente primero
+        self._atendidos = defaultdict(deque)  # dia -> atendidos, el más reciente primero
+        self.cargar(pacientes)
+
+    def cargar(self, pacientes):
+        """Indexa pacientes de un snapshot (pueden venir ya atendidos y en cualquier orden)."""
+        atendidos = []
+        for p in sorted(pacientes, key=lambda x: (x.segundos_registro, x.id)):
+            if p.atendido:
+                self.pacientes[p.id] = p
+                self.ultimo_id = max(self.ultimo_id, p.id)
+                atendidos.append(p)
+            else:
+                self.agregar(p)
+        atendidos.sort(key=lambda x: (x.segundos_atencion, x.id))
+        for p in atendidos:
+            self._indexar_atendido(p)
+
+    def siguiente_id(self):
+        return self.ultimo_id + 1
+
+    def duplicado(self, nombre, dia):
+        return (nombre.lower(), dia) in self._pendientes
+
+    def agregar(self, p):
+        if p.id in self.pacientes:
+            return
+        self.pacientes[p.id] = p
+        self.ultimo_id = max(self.ultimo_id, p.id)
+        self._espera[(p.dia, p.consultorio)].agregar(p)
+        self._pendientes[(p.nombre.lower(), p.dia)] = p.id
+
+    def quitar(self, paciente_id):
+        """Saca a un paciente en espera (por ejemplo, pasó a un consultorio de otra réplica)."""
+        p = self.pacientes.get(paciente_id)
+        if p is None or p.atendido:
+            return None
+        del self.pacientes[paciente_id]
+        self._espera[(p.dia, p.consultorio)].quitar(p)
+        clave = (p.nombre.lower(), p.dia)
+        if self._pendientes.get(clave) == paciente_id:
+            del self._pendientes[clave]
+        return p
+
+    def reasignar(self, paciente_id, consultorio, especialidad):
+        """Pasa a un paciente en espera a otro consultorio sin perder su orden de llegada."""
+        p = self.pacientes.get(paciente_id)
+        if p is None or p.atendido:
+            return p
+        self._espera[(p.dia, p.consultorio)].quitar(p)
+        p.consultorio = consultorio
+        p.especialidad = especialidad
+        self._espera[(p.dia, consultorio)].agregar(p)
+        return p
+
+    def atender(self, paciente_id, fecha_atencion):
+        p = self.pacientes.get(paciente_id)
+        if p is None or p.atendido:
+            return p
+        self._espera[(p.dia, p.consultorio)].quitar(p)
+        clave = (p.nombre.lower(), p.dia)
+        if self._pendientes.get(clave) == paciente_id:
+            del self._pendientes[clave]
+        p.atender(fecha_atencion)
+        self._indexar_atendido(p)
+        return p
+
+    def _indexar_atendido(self, p):
+        _insertar_atendido(self._historial[(p.dia, p.consultorio)], p)
+        _insertar_atendido(self._atendidos[p.dia], p)
+
+    def en_espera(self, consultorio, dia):
+        """Pacientes en espera del consultorio, en orden de atención."""
+        cola = self._espera.get((dia, consultorio))
+        return list(cola) if cola else []
+
+    def cuantos_en_espera(self, consultorio, dia):
+        return len(self._espera.get((dia, consultorio), ()))
+
+    def primero(self, consultorio, dia):
+        cola = self._espera.get((dia, consultorio))
+        if not cola:
+            return None
+        return cola.primero()
+
+    def delante(self, p):
+        """Cuántos pacientes de su consultorio se atienden antes que ``p``."""
+        cola = self._espera.get((p.dia, p.consultorio))
+        for i, q in enumerate(cola or ()):
+            if q.id == p.id:
+                return i
+        return len(cola or ())
+
+    def historial(self, consultorio, dia):
+        """Últimos atendidos del consultorio, el más reciente primero."""
+        return list(itertools.islice(self._historial.get((dia, consultorio), ()), TAMANO_HISTORIAL))
+
+    def atendidos(self, consultorio, dia):
+        """Todos los atendidos del consultorio en el día, el más reciente primero."""
+        return list(self._historial.get((dia, consultorio), ()))
+
+    def espera_del_dia(self, dia):
+        """Todos los pacientes en espera del día, en orden de atención."""
+        carriles = [c for (d, _), cola in self._espera.items() if d == dia for c in cola.carriles if c]
+        return list(mezclar(carriles, self._claves))
+
+    def atendidos_del_dia(self, dia):
+        return list(self._atendidos.get(dia, ()))
@@ -1,16 +1,15 @@
 import tkinter as tk
 from tkinter import simpledialog, messagebox
-import json
-import os
-import time
-import threading  # Importar threading para el Lock
 from datetime import datetime
-import keyboard
-from PIL import Image, ImageTk
 import sys
-
-# Crear un objeto Lock global
-file_lock = threading.Lock()
+import keyboard
+from queue_store import abrir_store
+from persistencia import Persistencia
+from vista_incremental import ListaVirtual
+from asignacion import cola_compartida, hermanas
+from cola_hospital import etiqueta_prioridad
+from logos import logo
+import metricas
 
 class ModuloConsultorio:
     def __init__(self, consultorio_id):
@@ -21,8 +20,22 @@ class ModuloConsultorio:
             self.consultorio_id = consultorio_id
             self.archivo_datos = 'datos_hospital.json'
             self.paciente_actual = None
+            metricas.iniciar(f"consultorio_{consultorio_id}")
             self.logo = None
             
+            # Sólo se carga la partición de este consultorio
+            sala = f"Consultorio {consultorio_id}"
+            store = abrir_store(self.archivo_datos, consultorio=sala)
+            self.grupo = hermanas(store.datos['especialidades'], sala) if cola_compartida() else []
+            if self.grupo:
+                # Cola compartida: también las salas hermanas, de las que puede tomar pacientes
+                anterior = store
+                store = abrir_store(self.archivo_datos, consultorio=(sala, *self.grupo))
+                if hasattr(anterior, 'cerrar'):
+                    anterior.cerrar()
+            # El disco lo toca sólo el hilo de persistencia; la ventana lee la réplica
+            self.persistencia = Persistencia(store)
+            self.store = self.persistencia.replica
             self.datos = self.cargar_datos()
             self.setup_ui()
             self.setup_hotkeys()
@@ -34,57 +47,17 @@ class ModuloConsultorio:
             raise
 
     def refresh_data(self):
-        try:
-            self.datos = self.cargar_datos()
-            self.actualizar_listas()
-        except Exception as e:
-            print(f"Error al refrescar datos: {e}")
-        finally:
-            self.root.after(3000, self.refresh_data)
+        """Refresca las listas sólo cuando otra estación modificó la cola."""
+        self.persistencia.iniciar(self.root, self.al_cambiar_datos)
 
+    def al_cambiar_datos(self, eventos):
+        self.datos = self.store.datos
+        self.actualizar_listas()
+
+    @metricas.cronometro('cargar_datos')
     def cargar_datos(self):
-        with file_lock:  # Bloquear acceso al archivo
-            datos_base = {
-                'especialidades': [
-                    {'nombre': 'Traumatología', 'consultorio': 'Consultorio 1'},
-                    {'nombre': 'Internista', 'consultorio': 'Consultorio 2'},
-                    {'nombre': 'Cirugía', 'consultorio': 'Consultorio 3'},
-                    {'nombre': 'Pediatría', 'consultorio': 'Consultorio 4'},
-                    {'nombre': 'Ginecología', 'consultorio': 'Consultorio 5'},
-                    {'nombre': 'Neurología', 'consultorio': 'Consultorio 6'},
-                    {'nombre': 'Urólogo', 'consultorio': 'Consultorio 7'},
-                    {'nombre': 'Cardiología', 'consultorio': 'Consultorio 8'},
-                    {'nombre': 'Radiología', 'consultorio': 'Consultorio 9'},
-                    {'nombre': 'Medicina', 'consultorio': 'Consultorio 10'},
-                    {'nombre': 'Obstetricia 1', 'consultorio': 'Consultorio 11'},
-                    {'nombre': 'Obstetricia 2', 'consultorio': 'Consultorio 12'},
-                    {'nombre': 'Psicología', 'consultorio': 'Consultorio 13'},
-                    {'nombre': 'Dental', 'consultorio': 'Consultorio 14'}
-                ],
-                'pacientes': [],
-                'ultimo_llamado': None
-            }
-        
-            if os.path.exists(self.archivo_datos):
-                try:
-                    with open(self.archivo_datos, 'r', encoding='utf-8') as f:
-                        return json.load(f)
-                except:
-                    return datos_base
-            else:
-                with open(self.archivo_datos, 'w', encoding='utf-8') as f:
-                    json.dump(datos_base, f, indent=4)
-                return datos_base
-
-    def guardar_datos(self):
-        with file_lock:  # Bloquear acceso al archivo
-            try:
-                with open(self.archivo_datos, 'w', encoding='utf-8') as f:
-                    json.dump(self.datos, f, indent=4, ensure_ascii=False)
-                return True
-            except Exception as e:
-                messagebox.showerror("Error", f"No se pudieron guardar los datos: {e}")
-                return False
+        """Estado actual de la cola (la réplica ya tiene los eventos recibidos)."""
+        return self.store.datos
 
     def setup_ui(self):
         self.root = tk.Tk()
@@ -134,9 +107,8 @@ class ModuloConsultorio:
         self.wait_listbox = tk.Listbox(wf, font=('Arial',12), selectbackground='#e0e0e0')
         self.wait_listbox.pack(expand=True, fill='both', padx=5, pady=5)
         
-        scroll_wait = tk.Scrollbar(wf, orient="vertical", command=self.wait_listbox.yview)
+        scroll_wait = tk.Scrollbar(wf, orient="vertical")
         scroll_wait.pack(side=tk.RIGHT, fill=tk.Y)
-        self.wait_listbox.config(yscrollcommand=scroll_wait.set)
 
         # Historial
         hf = tk.Frame(lf, bd=2, relief=tk.GROOVE, bg='#ffffff')
@@ -146,21 +118,16 @@ class ModuloConsultorio:
         self.hist_listbox = tk.Listbox(hf, font=('Arial',12), selectbackground='#e0e0e0')
         self.hist_listbox.pack(expand=True, fill='both', padx=5, pady=5)
         
-        scroll_hist = tk.Scrollbar(hf, orient="vertical", command=self.hist_listbox.yview)
+        scroll_hist = tk.Scrollbar(hf, orient="vertical")
         scroll_hist.pack(side=tk.RIGHT, fill=tk.Y)
-        self.hist_listbox.config(yscrollcommand=scroll_hist.set)
+
+        self.lista_espera = ListaVirtual(self.wait_listbox, self.fila_espera, "Sin pacientes en espera", scrollbar=scroll_wait)
+        self.lista_historial = ListaVirtual(self.hist_listbox, self.fila_historial, "Sin atenciones hoy", scrollbar=scroll_hist)
 
     def cargar_logo(self, logo_frame):
         try:
-            # Usamos la ruta correcta dependiendo de si es un ejecutable o no
-            if getattr(sys, 'frozen', False):
-               logo_path = os.path.join(sys._MEIPASS, 'logo_hospital.png')
-            else:
-               logo_path = 'logo_hospital.png'
-        
-            image = Image.open(logo_path)
-            image = image.resize((200, 200), Image.LANCZOS)
-            self.logo = ImageTk.PhotoImage(image)
+            # Ya redimensionado y en caché (ver logos.py), sin decodificar el original
+            self.logo = logo(200, 200)
             logo_label = tk.Label(logo_frame, image=self.logo, bg='#f0f0f0')
             logo_label.pack(side=tk.LEFT, padx=10)
         except Exception as e:
@@ -184,105 +151,84 @@ class ModuloConsultorio:
         esp = self.obtener_especialidad_consultorio()
         if not esp:
             return []
-            
+
+        # La cola ya está indexada por día y consultorio, en orden de atención (prioridad)
         hoy = datetime.now().strftime("%Y-%m-%d")
-        pacientes = self.datos['pacientes'].get(f"Consultorio {self.consultorio_id}", [])
-        lst = [p for p in pacientes if not p.get('atendido', False) and p['fecha_registro'].startswith(hoy)]
-        #lst = [p for p in self.datos['pacientes']
-               #if not p.get('atendido', False) #pacientes no atendidos
-               #and p['consultorio'] == f"Consultorio {self.consultorio_id}" #consultorio actual
-               #and p['fecha_registro'].startswith(hoy)] #pacientes registrados hoy
-        lst.sort(key=lambda x: x['fecha_registro']) #ordena los pacientes por la fecha de registro
-        return lst
+        return self.store.cola.en_espera(f"Consultorio {self.consultorio_id}", hoy)
 
     def obtener_historial_atencion(self):
         esp = self.obtener_especialidad_consultorio()
         if not esp:
             return []
-            
+
+        # Últimos 20 atendidos hoy en el consultorio, el más reciente primero
         hoy = datetime.now().strftime("%Y-%m-%d")
-        pacientes = self.datos['pacientes'].get(f"Consultorio {self.consultorio_id}", [])
-        # Filtra los pacientes que han sido atendidos y que están en la especialidad y consultorio correctos
-        lst = [p for p in pacientes if p.get('atendido', False) and p['fecha_registro'].startswith(hoy)]
-        #lst = [p for p in self.datos['pacientes']
-              #if p.get('atendido', False) #pacientes atendidos
-              #and p['especialidad'] == esp #filtra por especialidad
-              #and p['consultorio'] == f"Consultorio {self.consultorio_id}"  # Consultorio actual
-              #and p['fecha_registro'].startswith(hoy)] #pacientes registrados hoy
-        # Ordena los pacientes por la fecha de registro (descendente para ver los más recientes)
-        lst.sort(key=lambda x: x['fecha_registro'], reverse=True)
-        return lst[:20]
+        return self.store.cola.historial(f"Consultorio {self.consultorio_id}", hoy)
 
+    @metricas.cronometro('actualizar_listas')
     def actualizar_listas(self):
-        self.wait_listbox.delete(0, tk.END)
-        self.hist_listbox.delete(0, tk.END)
-        # Actualiza la lista de pacientes en espera
-        espera = self.obtener_pacientes_espera()
-        if espera:
-            for p in espera:
-                h = p['fecha_registro'].split(' ')[1][:5]  #solo muestra la hora
-                self.wait_listbox.insert(tk.END, f"{p['id']}. {p['nombre']} ({h})")
-        else:
-            self.wait_listbox.insert(tk.END, "Sin pacientes en espera")
-        # Actualiza el historial de pacientes atendidos
-        hist = self.obtener_historial_atencion()
-        if hist:
-            for p in hist:
-                h_reg = p['fecha_registro'].split(' ')[1][:5]
-                h_aten = p['fecha_atencion'].split(' ')[1][:5] if 'fecha_atencion' in p else ''
-                self.hist_listbox.insert(tk.END, f"{p['id']}. {p['nombre']} (Reg: {h_reg}, At: {h_aten})")
-        else:
-            self.hist_listbox.insert(tk.END, "Sin atenciones hoy")
+        # Sólo se modifican las filas que cambiaron desde el último refresco
+        self.lista_espera.sincronizar(self.obtener_pacientes_espera())
+        self.lista_historial.sincronizar(self.obtener_historial_atencion())
+
+    @staticmethod
+    def fila_espera(p):
+        return f"{p.id}. {p.nombre} ({p.hora_registro}){etiqueta_prioridad(p)}"  #solo muestra la hora
+
+    @staticmethod
+    def fila_historial(p):
+        return f"{p.id}. {p.nombre} (Reg: {p.hora_registro}, At: {p.hora_atencion})"
 
     def llamar_siguiente(self):
-        espera = self.obtener_pacientes_espera()
-        if not espera:
+        self.persistencia.enviar('llamar_siguiente', f"Consultorio {self.consultorio_id}", self.grupo,
+                                 al_terminar=self.mostrar_llamado, al_fallar=self.mostrar_error)
+
+    def mostrar_llamado(self, p):
+        if p is None:
             messagebox.showinfo("Info", "No hay pacientes en espera")
             return
-           
-        p = espera[0]
-        for d in self.datos['pacientes'].get(f"Consultorio {self.consultorio_id}", []):
-            if d['id'] == p['id']:
-                d['atendido'] = True
-                d['fecha_atencion'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                break
-                
-        if self.guardar_datos():
-            self.paciente_actual = p
-            self.status_label.config(text="OCUPADO", fg='red')
-            self.paciente_label.config(text=f"Paciente: {p['nombre']} (Turno {p['id']})")
-            self.actualizar_listas() # Actualiza las listas después de llamar al paciente
-            messagebox.showinfo("Paciente Llamado", f"Paciente {p['nombre']} está siendo atendido")
+
+        self.paciente_actual = p
+        self.status_label.config(text="OCUPADO", fg='red')
+        self.paciente_label.config(text=f"Paciente: {p.nombre} (Turno {p.id})")
+        self.actualizar_listas() # Actualiza las listas después de llamar al paciente
+        messagebox.showinfo("Paciente Llamado", f"Paciente {p.nombre} está siendo atendido")
 
     def re_llamar_paciente(self):
         hist = self.obtener_historial_atencion()
         if hist:
             ultimo_paciente = hist[0]
-            mensaje = f"RELLAMADO_Paciente {ultimo_paciente['nombre']}, favor pasar al consultorio {self.consultorio_id}"
+            mensaje = f"RELLAMADO_Paciente {ultimo_paciente.nombre}, favor pasar al consultorio {self.consultorio_id}"
             
-            # Limpiar cualquier llamado anterior
-            self.datos['ultimo_llamado'] = None
-            self.guardar_datos()
-            
-            # Registrar nuevo llamado
-            self.datos['ultimo_llamado'] = mensaje
-            
-            if self.guardar_datos():
-                messagebox.showinfo("Re-llamar Paciente", 
-                                  f"Paciente: {ultimo_paciente['nombre']}\nConsultorio: {self.consultorio_id}")
+            # Registrar nuevo llamado (reemplaza cualquier llamado anterior; si se
+            # pulsa varias veces seguidas se escribe una sola vez)
+            self.persistencia.enviar(
+                'rellamar', mensaje, ultimo_paciente.id, clave='rellamar', al_fallar=self.mostrar_error,
+                al_terminar=lambda _: messagebox.showinfo(
+                    "Re-llamar Paciente", f"Paciente: {ultimo_paciente.nombre}\nConsultorio: {self.consultorio_id}"))
         else:
             messagebox.showinfo("Info", "No hay pacientes en el historial para re-llamar")
 
+    def mostrar_error(self, error):
+        messagebox.showerror("Error", f"No se pudo guardar el cambio: {error}")
+
     def run(self):
         self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        metricas.listo(self.root)
         self.root.mainloop()
 
     def on_close(self):
+        self.persistencia.detener()
         keyboard.unhook_all_hotkeys()
+        metricas.detener()
         self.root.destroy()
 
 if __name__ == "__main__":
-    consultorio_id = simpledialog.askstring("Consultorio", "Ingrese el número de consultorio (1-14):")
+    # El número puede venir como argumento (acceso directo de cada PC)
+    if len(sys.argv) > 1:
+        consultorio_id = sys.argv[1]
+    else:
+        consultorio_id = simpledialog.askstring("Consultorio", "Ingrese el número de consultorio (1-14):")
     if consultorio_id:
         app = ModuloConsultorio(consultorio_id)
         app.run()
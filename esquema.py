@@ -0,0 +1,200 @@
+"""Esquema versionado de ``datos_hospital.json``.
+
+Versión 1 (histórica): ``pacientes`` era una lista plana de diccionarios
+(admision.py, sala_espera.py) o un diccionario ``"Consultorio N" -> lista``
+(consultoria.py), según qué estación creó el archivo.
+
+Versión 2: ``pacientes`` siempre está particionado por consultorio y cada
+paciente se guarda como una fila compacta (ver ``COLUMNAS``), sin repetir
+los nombres de los campos ni el consultorio. Cada estación puede cargar
+sólo su partición.
+
+Versión 3: agrega la columna ``prioridad`` (0 = general, ver
+``cola_hospital.PRIORIDADES``); las filas de la versión 2 quedan en 0.
+
+Uso para migrar un archivo existente (se deja una copia ``.bak``):
+
+    python esquema.py datos_hospital.json
+"""
+import shutil
+import sys
+from dataclasses import dataclass, field
+from datetime import date
+
+VERSION_ESQUEMA = 3
+
+# Orden de los campos en cada fila (el consultorio es la partición)
+COLUMNAS = ['id', 'nombre', 'especialidad', 'fecha_registro', 'atendido', 'fecha_atencion', 'prioridad']
+
+_dias = {}  # 'AAAA-MM-DD' -> (la misma cadena compartida, segundos desde 1970 al comienzo del día)
+_horas = [f"{h:02d}:{m:02d}" for h in range(24) for m in range(60)]  # Minuto del día -> 'HH:MM'
+_minutos = {hora: i * 60 for i, hora in enumerate(_horas)}  # 'HH:MM' -> segundos del día
+_segundos = {f"{s:02d}": s for s in range(60)}  # 'SS' -> segundos
+
+
+def _dia(fecha):
+    dia = _dias.get(fecha[:10])
+    if dia is None:
+        clave = fecha[:10]
+        dia = _dias[clave] = (clave, (date.fromisoformat(clave).toordinal() - date(1970, 1, 1).toordinal()) * 86400)
+    return dia
+
+
+def segundos_de(fecha):
+    """'2024-05-01 08:30:00' -> segundos desde 1970 (la hora local se toma tal cual); None -> 0.
+
+    Cada día se convierte una sola vez; la hora sale de tablas armadas de antemano.
+    """
+    if not fecha:
+        return 0
+    return _dia(fecha)[1] + _minutos[fecha[11:16]] + _segundos[fecha[17:19]]
+
+
+def hora_de(segundos):
+    """Segundos de ``segundos_de`` -> 'HH:MM' (cadenas compartidas, sin formatear)."""
+    return _horas[segundos % 86400 // 60]
+
+
+@dataclass(slots=True)
+class Paciente:
+    """Un turno. Las fechas se guardan como texto ('AAAA-MM-DD HH:MM:SS').
+
+    Al crearlo se calculan una vez la clave del día (``dia``, una cadena
+    compartida por todos los pacientes de ese día) y las fechas en segundos,
+    así filtrar, ordenar y mostrar la hora no vuelve a leer el texto. La
+    atención se marca con ``atender`` para mantenerlas al día.
+    """
+    id: int
+    nombre: str
+    especialidad: str
+    consultorio: str
+    fecha_registro: str
+    atendido: bool = False
+    fecha_atencion: str = None
+    prioridad: int = 0
+    dia: str = field(init=False, repr=False, compare=False)
+    segundos_registro: int = field(init=False, repr=False, compare=False)
+    segundos_atencion: int = field(init=False, repr=False, compare=False)  # 0 si no fue atendido
+
+    def __post_init__(self):
+        f = self.fecha_registro
+        self.dia, inicio = _dia(f)
+        self.segundos_registro = inicio + _minutos[f[11:16]] + _segundos[f[17:19]]
+        self.segundos_atencion = segundos_de(self.fecha_atencion) if self.fecha_atencion else 0
+
+    def atender(self, fecha_atencion):
+        self.atendido = True
+        self.fecha_atencion = fecha_atencion
+        self.segundos_atencion = segundos_de(fecha_atencion)
+
+    @property
+    def hora_registro(self):
+        return hora_de(self.segundos_registro)
+
+    @property
+    def hora_atencion(self):
+        return hora_de(self.segundos_atencion) if self.fecha_atencion else ''
+
+    @classmethod
+    def desde_dict(cls, d):
+        return cls(d['id'], d['nombre'], d['especialidad'], d['consultorio'],
+                   d['fecha_registro'], bool(d.get('atendido')), d.get('fecha_atencion'),
+                   d.get('prioridad', 0))
+
+    def a_dict(self):
+        d = {
+            'id': self.id,
+            'nombre': self.nombre,
+            'especialidad': self.especialidad,
+            'consultorio': self.consultorio,
+            'fecha_registro': self.fecha_registro,
+            'atendido': self.atendido
+        }
+        if self.fecha_atencion:
+            d['fecha_atencion'] = self.fecha_atencion
+        if self.prioridad:
+            d['prioridad'] = self.prioridad
+        return d
+
+    @classmethod
+    def desde_fila(cls, consultorio, fila):
+        id_, nombre, especialidad, fecha_registro, atendido, fecha_atencion, prioridad = fila
+        return cls(id_, nombre, especialidad, consultorio, fecha_registro, bool(atendido), fecha_atencion,
+                   prioridad)
+
+    def a_fila(self):
+        return [self.id, self.nombre, self.especialidad, self.fecha_registro,
+                int(self.atendido), self.fecha_atencion, self.prioridad]
+
+
+def version_de(datos):
+    return datos.get('version_esquema', 1)
+
+
+def migrar(datos):
+    """Devuelve ``datos`` en la versión actual del esquema (no modifica el original)."""
+    version = version_de(datos)
+    if version > VERSION_ESQUEMA:
+        raise ValueError(f"Esquema {version} más nuevo que el soportado ({VERSION_ESQUEMA})")
+    if version == VERSION_ESQUEMA:
+        return datos
+
+    if version == 2:
+        nuevos = dict(datos)
+        nuevos['version_esquema'] = VERSION_ESQUEMA
+        nuevos['columnas'] = COLUMNAS
+        nuevos['pacientes'] = {consultorio: [fila + [0] for fila in filas]
+                               for consultorio, filas in (datos.get('pacientes') or {}).items()}
+        return nuevos
+
+    pacientes = datos.get('pacientes') or []
+    if isinstance(pacientes, dict):
+        # Formato de consultoria.py: el consultorio es la clave y puede faltar en cada paciente
+        pacientes = [{**p, 'consultorio': p.get('consultorio', c)} for c, lista in pacientes.items() for p in lista]
+
+    nuevos = dict(datos)
+    nuevos['version_esquema'] = VERSION_ESQUEMA
+    nuevos['columnas'] = COLUMNAS
+    nuevos['pacientes'] = particionar(Paciente.desde_dict(p) for p in pacientes)
+    return nuevos
+
+
+def particionar(pacientes):
+    """Agrupa pacientes en filas compactas por consultorio, en orden de id."""
+    particiones = {}
+    for p in sorted(pacientes, key=lambda x: x.id):
+        particiones.setdefault(p.consultorio, []).append(p.a_fila())
+    return particiones
+
+
+def leer_pacientes(datos, consultorio=None):
+    """Genera los pacientes de un snapshot en la versión actual.
+
+    Con ``consultorio`` (un nombre o varios) sólo lee esas particiones.
+    """
+    particiones = datos.get('pacientes') or {}
+    if consultorio is not None:
+        nombres = (consultorio,) if isinstance(consultorio, str) else consultorio
+        particiones = {nombre: particiones.get(nombre, []) for nombre in nombres}
+    for nombre, filas in particiones.items():
+        for fila in filas:
+            yield Paciente.desde_fila(nombre, fila)
+
+
+def migrar_archivo(ruta):
+    import serializacion  # Importa este módulo: se difiere para evitar el ciclo
+
+    datos = serializacion.leer_archivo(ruta)
+    if version_de(datos) == VERSION_ESQUEMA:
+        return False
+    shutil.copyfile(ruta, ruta + '.bak')
+    serializacion.escribir_archivo(ruta, migrar(datos))
+    return True
+
+
+if __name__ == "__main__":
+    for ruta in sys.argv[1:] or ['datos_hospital.json']:
+        if migrar_archivo(ruta):
+            print(f"{ruta}: migrado a la versión {VERSION_ESQUEMA} (copia en {ruta}.bak)")
+        else:
+            print(f"{ruta}: ya está en la versión {VERSION_ESQUEMA}")
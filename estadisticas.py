@@ -0,0 +1,240 @@
+"""Estadísticas operativas acumuladas evento por evento.
+
+Por cada día y cada consultorio / especialidad se llevan contadores de
+registrados y atendidos, la espera (registro -> atención) en un histograma
+de minutos, el intervalo entre atenciones consecutivas del mismo
+consultorio y la cantidad de registros y atenciones por hora. Cada evento
+actualiza un puñado de contadores; nunca se recorre el historial.
+
+Los días archivados guardan sus acumulados junto al segmento
+(``historial/AAAA-MM-DD.stats.json``), así una consulta de un año sólo lee
+365 archivos pequeños. Uso sin interfaz:
+
+    python estadisticas.py --desde 2025-01-01 --hasta 2025-01-31 --por especialidad
+"""
+import argparse
+import bisect
+import json
+import os
+
+from bloqueo import escribir_atomico
+
+LIMITES_ESPERA_MIN = (5, 10, 15, 20, 30, 45, 60, 90, 120, 180, 240)
+EXTENSION_ESTADISTICAS = '.stats.json'
+AGRUPACIONES = ('consultorio', 'especialidad')
+
+
+class Acumulado:
+    """Contadores de un grupo (un consultorio o una especialidad) en un día."""
+    __slots__ = ('registrados', 'atendidos', 'suma_espera', 'max_espera', 'esperas',
+                 'servicios', 'suma_servicio', 'registros_hora', 'atenciones_hora')
+
+    def __init__(self):
+        self.registrados = 0
+        self.atendidos = 0
+        self.suma_espera = 0.0
+        self.max_espera = 0.0
+        self.esperas = [0] * (len(LIMITES_ESPERA_MIN) + 1)
+        self.servicios = 0
+        self.suma_servicio = 0.0
+        self.registros_hora = [0] * 24
+        self.atenciones_hora = [0] * 24
+
+    def sumar(self, otro):
+        self.registrados += otro.registrados
+        self.atendidos += otro.atendidos
+        self.suma_espera += otro.suma_espera
+        self.max_espera = max(self.max_espera, otro.max_espera)
+        self.servicios += otro.servicios
+        self.suma_servicio += otro.suma_servicio
+        for lista, suma in ((self.esperas, otro.esperas), (self.registros_hora, otro.registros_hora),
+                            (self.atenciones_hora, otro.atenciones_hora)):
+            for i, n in enumerate(suma):
+                lista[i] += n
+
+    def espera_percentil(self, p):
+        """Límite superior (minutos) de la cubeta que contiene el percentil ``p``."""
+        objetivo = p * self.atendidos
+        acumulado = 0
+        for limite, n in zip(LIMITES_ESPERA_MIN, self.esperas):
+            acumulado += n
+            if acumulado >= objetivo:
+                return min(limite, self.max_espera)
+        return self.max_espera
+
+    def resumen(self):
+        hora_pico = max(range(24), key=self.registros_hora.__getitem__) if self.registrados else None
+        return {
+            'registrados': self.registrados,
+            'atendidos': self.atendidos,
+            'espera_media_min': round(self.suma_espera / self.atendidos, 1) if self.atendidos else None,
+            'espera_p90_min': round(self.espera_percentil(0.9), 1) if self.atendidos else None,
+            'espera_max_min': round(self.max_espera, 1) if self.atendidos else None,
+            'servicio_medio_min': round(self.suma_servicio / self.servicios, 1) if self.servicios else None,
+            'hora_pico': hora_pico,
+            'registros_hora': list(self.registros_hora),
+            'atenciones_hora': list(self.atenciones_hora),
+        }
+
+    def a_dict(self):
+        return {c: getattr(self, c) for c in self.__slots__}
+
+    @classmethod
+    def desde_dict(cls, d):
+        a = cls()
+        for c in cls.__slots__:
+            setattr(a, c, d[c])
+        return a
+
+
+class Estadisticas:
+    """Acumulados por (día, agrupación, nombre), actualizados por cada evento."""
+
+    def __init__(self):
+        self.grupos = {}
+        self._ultima_atencion = {}  # (día, consultorio) -> minuto de la atención anterior
+
+    def _acumulados(self, dia, p):
+        for tipo, nombre in (('consultorio', p.consultorio), ('especialidad', p.especialidad)):
+            a = self.grupos.get((dia, tipo, nombre))
+            if a is None:
+                a = self.grupos[(dia, tipo, nombre)] = Acumulado()
+            yield a
+
+    def registrar(self, p):
+        hora = p.segundos_registro % 86400 // 3600
+        for a in self._acumulados(p.dia, p):
+            a.registrados += 1
+            a.registros_hora[hora] += 1
+
+    def atender(self, p):
+        if not p.fecha_atencion:
+            return
+        dia = p.dia
+        atencion = p.segundos_atencion / 60
+        espera = max(0.0, atencion - p.segundos_registro / 60)
+        cubeta = bisect.bisect_left(LIMITES_ESPERA_MIN, espera)
+        anterior = self._ultima_atencion.get((dia, p.consultorio))
+        servicio = atencion - anterior if anterior is not None else None
+        self._ultima_atencion[(dia, p.consultorio)] = atencion
+        hora = p.segundos_atencion % 86400 // 3600
+        for a in self._acumulados(dia, p):
+            a.atendidos += 1
+            a.suma_espera += espera
+            a.max_espera = max(a.max_espera, espera)
+            a.esperas[cubeta] += 1
+            a.atenciones_hora[hora] += 1
+            if servicio is not None and servicio >= 0:
+                a.servicios += 1
+                a.suma_servicio += servicio
+
+    @classmethod
+    def desde_pacientes(cls, pacientes):
+        """Acumula un día ya ocurrido (al cargar un snapshot o un segmento archivado)."""
+        e = cls()
+        atendidos = []
+        for p in pacientes:
+            e.registrar(p)
+            if p.atendido and p.fecha_atencion:
+                atendidos.append(p)
+        for p in sorted(atendidos, key=lambda x: (x.segundos_atencion, x.id)):
+            e.atender(p)
+        return e
+
+    def sumar(self, otra):
+        for clave, a in otra.grupos.items():
+            propio = self.grupos.get(clave)
+            if propio is None:
+                propio = self.grupos[clave] = Acumulado()
+            propio.sumar(a)
+        return self
+
+    def dias(self):
+        return sorted({dia for dia, _, _ in self.grupos})
+
+    def resumen(self, por='especialidad', desde=None, hasta=None):
+        """Resumen por consultorio o por especialidad de los días entre ``desde`` y ``hasta``."""
+        total = {}
+        for (dia, tipo, nombre), a in self.grupos.items():
+            if tipo != por or (desde and dia < desde) or (hasta and dia > hasta):
+                continue
+            if nombre not in total:
+                total[nombre] = Acumulado()
+            total[nombre].sumar(a)
+        return {nombre: a.resumen() for nombre, a in sorted(total.items())}
+
+    def a_dict(self):
+        return {'grupos': [[dia, tipo, nombre, a.a_dict()] for (dia, tipo, nombre), a in self.grupos.items()]}
+
+    @classmethod
+    def desde_dict(cls, d):
+        e = cls()
+        for dia, tipo, nombre, a in d['grupos']:
+            e.grupos[(dia, tipo, nombre)] = Acumulado.desde_dict(a)
+        return e
+
+
+class EstadisticasHistoricas:
+    """Acumulados de los días archivados, uno por segmento del ``ArchivoHistorico``."""
+
+    def __init__(self, historial):
+        self.historial = historial
+        self._cache = {}  # día -> Estadisticas (un día archivado no cambia)
+
+    def _ruta(self, dia):
+        return os.path.join(self.historial.directorio, dia + EXTENSION_ESTADISTICAS)
+
+    def recalcular(self, dia):
+        """Vuelve a acumular un día desde su segmento y lo guarda."""
+        e = Estadisticas.desde_pacientes(self.historial.leer_dia(dia))
+        os.makedirs(self.historial.directorio, exist_ok=True)
+        escribir_atomico(self._ruta(dia), json.dumps(e.a_dict(), ensure_ascii=False, separators=(',', ':')))
+        self._cache[dia] = e
+        return e
+
+    def del_dia(self, dia):
+        e = self._cache.get(dia)
+        if e is not None:
+            return e
+        try:
+            with open(self._ruta(dia), 'r', encoding='utf-8') as f:
+                e = self._cache[dia] = Estadisticas.desde_dict(json.load(f))
+            return e
+        except (OSError, ValueError, KeyError):
+            # Día archivado antes de existir las estadísticas
+            return self.recalcular(dia)
+
+    def consultar(self, desde=None, hasta=None):
+        total = Estadisticas()
+        for dia in self.historial.dias():
+            if (desde and dia < desde) or (hasta and dia > hasta):
+                continue
+            total.sumar(self.del_dia(dia))
+        return total
+
+
+def imprimir(resumen, por):
+    print(f"{por.capitalize():18} {'Reg':>6} {'Atend':>6} {'Espera':>7} {'p90':>6} {'Máx':>6} {'Serv.':>6} {'Pico':>5}")
+    for nombre, r in resumen.items():
+        def m(v):
+            return '-' if v is None else f"{v:.1f}"
+        pico = '-' if r['hora_pico'] is None else f"{r['hora_pico']:02d}h"
+        print(f"{nombre:18} {r['registrados']:6} {r['atendidos']:6} {m(r['espera_media_min']):>7} "
+              f"{m(r['espera_p90_min']):>6} {m(r['espera_max_min']):>6} {m(r['servicio_medio_min']):>6} {pico:>5}")
+
+
+if __name__ == "__main__":
+    from queue_store import ARCHIVO_DATOS, abrir_store
+
+    parser = argparse.ArgumentParser(description="Estadísticas de espera y atención")
+    parser.add_argument('--archivo', default=ARCHIVO_DATOS)
+    parser.add_argument('--desde')
+    parser.add_argument('--hasta')
+    parser.add_argument('--por', choices=AGRUPACIONES, default='especialidad')
+    parser.add_argument('--json', action='store_true', help="salida en JSON")
+    args = parser.parse_args()
+    resumen = abrir_store(args.archivo).resumen_estadisticas(args.desde, args.hasta, args.por)
+    if args.json:
+        print(json.dumps(resumen, ensure_ascii=False, indent=2))
+    else:
+        imprimir(resumen, args.por)
@@ -0,0 +1,73 @@
+"""Espera estimada por consultorio.
+
+Cada consultorio lleva una media móvil exponencial (EWMA) de los minutos
+entre atenciones consecutivas. Actualizarla con cada llamado cuesta O(1), y
+la espera de un paciente es la cantidad de personas delante de él por esa
+media, descontando lo que ya pasó desde el último llamado.
+
+Los momentos son segundos como los de ``esquema.segundos_de``: los
+llamados usan ``Paciente.segundos_atencion`` y quien estima muchas esperas
+convierte la hora actual una sola vez.
+"""
+import math
+
+ALFA = 0.2  # Peso de la última atención en la media
+SERVICIO_INICIAL_MIN = 10.0  # Antes de la primera atención del día
+MAX_INTERVALO_MIN = 60.0  # Intervalos más largos son pausas, no atenciones
+
+
+class EstimadorEspera:
+    def __init__(self):
+        self._media = {}  # consultorio -> minutos por atención
+        self._ultimo = {}  # consultorio -> segundos del último llamado
+
+    @classmethod
+    def desde_pacientes(cls, pacientes):
+        e = cls()
+        atendidos = [p for p in pacientes if p.atendido and p.fecha_atencion]
+        for p in sorted(atendidos, key=lambda x: (x.segundos_atencion, x.id)):
+            e.atender(p.consultorio, p.segundos_atencion)
+        return e
+
+    def atender(self, consultorio, segundos):
+        anterior = self._ultimo.get(consultorio)
+        self._ultimo[consultorio] = segundos
+        if anterior is None or anterior // 86400 != segundos // 86400:
+            return  # Primer llamado del día
+        intervalo = (segundos - anterior) / 60
+        if 0 < intervalo <= MAX_INTERVALO_MIN:
+            media = self._media.get(consultorio)
+            self._media[consultorio] = intervalo if media is None else media + ALFA * (intervalo - media)
+
+    def estado(self, consultorio):
+        """(minutos por atención o None, segundos del último llamado o None)."""
+        return self._media.get(consultorio), self._ultimo.get(consultorio)
+
+    def fijar(self, consultorio, media, ultimo):
+        """Restaura lo que devolvió ``estado`` (por ejemplo, leído de la vista compartida)."""
+        if media is not None:
+            self._media[consultorio] = media
+        if ultimo is not None:
+            self._ultimo[consultorio] = ultimo
+
+    def servicio(self, consultorio):
+        return self._media.get(consultorio, SERVICIO_INICIAL_MIN)
+
+    def espera(self, consultorio, delante, ahora):
+        """Minutos estimados para quien tiene ``delante`` personas antes en la cola (``ahora`` en segundos)."""
+        media = self.servicio(consultorio)
+        transcurrido = 0.0
+        ultimo = self._ultimo.get(consultorio)
+        if ultimo is not None and ultimo // 86400 == ahora // 86400:
+            transcurrido = min(media, max(0.0, (ahora - ultimo) / 60))
+        return max(0.0, (delante + 1) * media - transcurrido)
+
+
+def formato_espera(minutos):
+    """12.3 -> '~15 min', 95 -> '~1 h 35 min'"""
+    if minutos < 1:
+        return "ya"
+    minutos = int(math.ceil(minutos / 5) * 5)
+    if minutos < 60:
+        return f"~{minutos} min"
+    return f"~{minutos // 60} h {minutos % 60:02d} min"
@@ -0,0 +1,165 @@
+"""Exportación de reportes por bloques, fuera del hilo de la interfaz.
+
+Los pacientes se leen página por página con ``store.pagina`` (archivo
+histórico + día en curso) y se escriben en bloques de ``TAMANO_BLOQUE``
+filas, así la memoria usada no depende del largo del rango. El formato sale
+de la extensión del archivo:
+
+    .csv        CSV
+    .csv.gz     CSV comprimido con gzip
+    .parquet    columnar para análisis (requiere pyarrow)
+
+``ExportacionEnSegundoPlano`` corre la exportación en un hilo y deja el
+avance en una cola que la ventana revisa con ``root.after``.
+"""
+import csv
+import gzip
+import importlib.util
+import os
+import queue
+import threading
+
+from cola_hospital import PRIORIDADES
+
+TAMANO_BLOQUE = 1000
+ENCABEZADO = ["ID", "Nombre", "Especialidad", "Consultorio", "Fecha Registro", "Atendido", "Fecha Atención", "Prioridad"]
+
+
+class ExportacionCancelada(Exception):
+    pass
+
+
+def hay_parquet():
+    return importlib.util.find_spec('pyarrow') is not None
+
+
+def tipos_archivo():
+    """Opciones para ``filedialog.asksaveasfilename``."""
+    tipos = [("Archivos CSV", "*.csv"), ("CSV comprimido", "*.csv.gz")]
+    if hay_parquet():
+        tipos.append(("Parquet (columnar)", "*.parquet"))
+    return tipos
+
+
+def recorrer(store, desde=None, hasta=None, consultorio=None, especialidad=None, tamano=TAMANO_BLOQUE):
+    """Genera los pacientes del reporte en bloques, leyendo una página a la vez."""
+    cursor = None
+    while True:
+        filas, cursor = store.pagina(desde, hasta, cursor, tamano, consultorio, especialidad)
+        if filas:
+            yield filas
+        if cursor is None:
+            return
+
+
+def fila_csv(p):
+    return [p.id, p.nombre, p.especialidad, p.consultorio, p.fecha_registro,
+            "Sí" if p.atendido else "No", p.fecha_atencion or "", PRIORIDADES[p.prioridad]]
+
+
+def escribir_csv(ruta, bloques, comprimido=False):
+    """Escribe los bloques como CSV (con gzip si ``comprimido``); genera el total escrito."""
+    abrir = gzip.open if comprimido else open
+    total = 0
+    with abrir(ruta, 'wt', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(ENCABEZADO)
+        for bloque in bloques:
+            writer.writerows(fila_csv(p) for p in bloque)
+            total += len(bloque)
+            yield total
+
+
+def _fecha(segundos):
+    """Segundos de ``Paciente`` (hora local tal cual) -> valor de una columna ``timestamp('s')``."""
+    return segundos or None
+
+
+def escribir_parquet(ruta, bloques, comprimido=False):
+    """Escribe los bloques como Parquet, un grupo de filas por bloque."""
+    import pyarrow as pa  # Opcional: sólo se carga al exportar en este formato
+    import pyarrow.parquet as pq
+
+    esquema = pa.schema([
+        ('id', pa.int64()),
+        ('nombre', pa.string()),
+        ('especialidad', pa.string()),
+        ('consultorio', pa.string()),
+        ('fecha_registro', pa.timestamp('s')),
+        ('atendido', pa.bool_()),
+        ('fecha_atencion', pa.timestamp('s')),
+        ('prioridad', pa.string()),
+    ])
+    total = 0
+    with pq.ParquetWriter(ruta, esquema, compression='zstd') as writer:
+        for bloque in bloques:
+            writer.write_table(pa.table({
+                'id': [p.id for p in bloque],
+                'nombre': [p.nombre for p in bloque],
+                'especialidad': [p.especialidad for p in bloque],
+                'consultorio': [p.consultorio for p in bloque],
+                'fecha_registro': [_fecha(p.segundos_registro) for p in bloque],
+                'atendido': [p.atendido for p in bloque],
+                'fecha_atencion': [_fecha(p.segundos_atencion) for p in bloque],
+                'prioridad': [PRIORIDADES[p.prioridad] for p in bloque],
+            }, schema=esquema))
+            total += len(bloque)
+            yield total
+
+
+def exportar(store, ruta, filtros=None, al_avanzar=None, cancelar=None):
+    """Exporta el reporte a ``ruta`` y devuelve la cantidad de filas.
+
+    Se escribe en un archivo temporal junto al destino y se renombra al
+    terminar, así una exportación cancelada o fallida no deja un archivo a
+    medias.
+    """
+    escribir = escribir_parquet if ruta.endswith('.parquet') else escribir_csv
+    temporal = ruta + '.parcial'
+    escritura = escribir(temporal, recorrer(store, **(filtros or {})), ruta.endswith('.gz'))
+    total = 0
+    try:
+        for total in escritura:
+            if cancelar is not None and cancelar.is_set():
+                raise ExportacionCancelada()
+            if al_avanzar:
+                al_avanzar(total)
+        os.replace(temporal, ruta)
+    except BaseException:
+        escritura.close()  # Cierra el archivo antes de borrarlo
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+    return total
+
+
+class ExportacionEnSegundoPlano:
+    """Corre ``exportar`` en un hilo; el avance llega por ``mensajes``.
+
+    Mensajes: ``('avance', filas)``, ``('fin', filas)``, ``('cancelada', filas)``
+    y ``('error', texto)``.
+    """
+
+    def __init__(self, store, ruta, filtros=None):
+        self.mensajes = queue.Queue()
+        self._cancelar = threading.Event()
+        self._hilo = threading.Thread(target=self._trabajar, args=(store, ruta, filtros),
+                                      name='exportacion', daemon=True)
+        self._hilo.start()
+
+    def _trabajar(self, store, ruta, filtros):
+        avance = [0]
+
+        def al_avanzar(total):
+            avance[0] = total
+            self.mensajes.put(('avance', total))
+
+        try:
+            self.mensajes.put(('fin', exportar(store, ruta, filtros, al_avanzar, self._cancelar)))
+        except ExportacionCancelada:
+            self.mensajes.put(('cancelada', avance[0]))
+        except Exception as e:
+            self.mensajes.put(('error', str(e)))
+
+    def cancelar(self):
+        self._cancelar.set()
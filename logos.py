@@ -0,0 +1,79 @@
+"""Logo del hospital ya redimensionado para cada ventana.
+
+Decodificar el PNG original (114 KB) y redimensionarlo con LANCZOS en cada
+arranque y en cada ticket obligaba a importar PIL. ``logo(ancho, alto)``
+devuelve un ``tk.PhotoImage`` compartido por tamaño: la primera vez busca
+``logo_hospital_<ancho>x<alto>.png`` entre los recursos empaquetados o en
+``logo_cache/``, y si no está lo genera con PIL (importado sólo entonces) y
+lo guarda en la caché. Tk lee PNG por sí mismo, así que con los tamaños en
+caché PIL no se importa nunca.
+
+Para incluir los tamaños en los ejecutables, generarlos antes de empaquetar
+y agregarlos con ``--add-data``:
+
+    python logos.py
+"""
+import os
+import sys
+import tkinter as tk
+
+ARCHIVO_LOGO = 'logo_hospital.png'
+DIRECTORIO_CACHE = 'logo_cache'
+TAMANOS = ((200, 200), (90, 90), (800, 600))  # Admisión/consultorio, ticket, sala de espera
+
+_imagenes = {}  # (ancho, alto) -> PhotoImage
+
+
+def ruta_recurso(nombre):
+    """Ruta de un archivo empaquetado con PyInstaller, o relativa al directorio actual."""
+    if getattr(sys, 'frozen', False):
+        return os.path.join(sys._MEIPASS, nombre)
+    return nombre
+
+
+def nombre_redimensionado(ancho, alto):
+    base, extension = os.path.splitext(ARCHIVO_LOGO)
+    return f"{base}_{ancho}x{alto}{extension}"
+
+
+def generar(ancho, alto, destino):
+    """Redimensiona el logo original y lo guarda como PNG en ``destino``."""
+    from PIL import Image  # Importación diferida: sólo si el tamaño no está en caché
+
+    with Image.open(ruta_recurso(ARCHIVO_LOGO)) as imagen:
+        imagen.resize((ancho, alto), Image.LANCZOS).save(destino + '.tmp', format='PNG')
+    os.replace(destino + '.tmp', destino)
+    return destino
+
+
+def archivo_logo(ancho, alto):
+    """Ruta del PNG ya redimensionado; lo genera si falta o si el original es más nuevo."""
+    nombre = nombre_redimensionado(ancho, alto)
+    empaquetado = ruta_recurso(nombre)
+    if os.path.exists(empaquetado):
+        return empaquetado
+    en_cache = os.path.join(DIRECTORIO_CACHE, nombre)
+    try:
+        if os.path.getmtime(en_cache) >= os.path.getmtime(ruta_recurso(ARCHIVO_LOGO)):
+            return en_cache
+    except OSError:
+        pass
+    os.makedirs(DIRECTORIO_CACHE, exist_ok=True)
+    return generar(ancho, alto, en_cache)
+
+
+def logo(ancho, alto):
+    """``PhotoImage`` del logo en ese tamaño, reutilizado por todas las ventanas.
+
+    Lanza la excepción de lectura si no se puede cargar; cada ventana muestra
+    el nombre del hospital en su lugar.
+    """
+    imagen = _imagenes.get((ancho, alto))
+    if imagen is None:
+        imagen = _imagenes[(ancho, alto)] = tk.PhotoImage(file=archivo_logo(ancho, alto))
+    return imagen
+
+
+if __name__ == "__main__":
+    for ancho, alto in TAMANOS:
+        print(generar(ancho, alto, nombre_redimensionado(ancho, alto)))
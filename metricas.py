@@ -0,0 +1,241 @@
+"""Métricas livianas de cada estación.
+
+Contadores, valores y tiempos en memoria; los tiempos se agrupan en cubetas
+fijas (histograma), así observar un valor cuesta una búsqueda binaria y dos
+sumas, sin guardar cada medición.
+
+    import metricas
+
+    @metricas.cronometro('cargar_datos')
+    def cargar_datos(self): ...
+
+    metricas.iniciar('admision')  # metricas/admision.jsonl, rotado por tamaño
+
+Cada ``intervalo_s`` segundos se agrega una línea JSON con el estado
+acumulado al archivo de la estación. Si se define SISTEMACOLAS_METRICAS_PUERTO
+(o se pasa ``puerto``) se sirve además ``/metrics`` en formato de texto de
+Prometheus.
+"""
+import bisect
+import functools
+import json
+import os
+import threading
+import time
+
+DIRECTORIO_METRICAS = 'metricas'
+VARIABLE_PUERTO = 'SISTEMACOLAS_METRICAS_PUERTO'
+VARIABLE_SALIR = 'SISTEMACOLAS_SALIR_AL_INICIAR'
+INTERVALO_S = 60
+MAX_BYTES = 1024 * 1024
+COPIAS = 5
+
+INICIO = time.perf_counter()  # Referencia para ``arranque_s``
+
+# Límites superiores de las cubetas, en segundos
+LIMITES = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histograma:
+    __slots__ = ('cubetas', 'suma', 'cuenta', 'maximo')
+
+    def __init__(self):
+        self.cubetas = [0] * (len(LIMITES) + 1)
+        self.suma = 0.0
+        self.cuenta = 0
+        self.maximo = 0.0
+
+    def observar(self, valor):
+        self.cubetas[bisect.bisect_left(LIMITES, valor)] += 1
+        self.suma += valor
+        self.cuenta += 1
+        if valor > self.maximo:
+            self.maximo = valor
+
+    def percentil(self, p):
+        """Límite superior de la cubeta que contiene el percentil ``p``."""
+        objetivo = p * self.cuenta
+        acumulado = 0
+        for limite, n in zip(LIMITES, self.cubetas):
+            acumulado += n
+            if acumulado >= objetivo:
+                return min(limite, self.maximo)
+        return self.maximo
+
+
+class Metricas:
+    def __init__(self):
+        self.estacion = None
+        self.contadores = {}
+        self.valores = {}
+        self.tiempos = {}
+        self._lock = threading.Lock()
+        self._log = None
+        self._http = None
+        self._activo = False
+
+    def contar(self, nombre, n=1):
+        with self._lock:
+            self.contadores[nombre] = self.contadores.get(nombre, 0) + n
+
+    def fijar(self, nombre, valor):
+        self.valores[nombre] = valor
+
+    def observar(self, nombre, segundos):
+        with self._lock:
+            h = self.tiempos.get(nombre)
+            if h is None:
+                h = self.tiempos[nombre] = Histograma()
+            h.observar(segundos)
+
+    def cronometro(self, nombre):
+        """Decorador que registra la duración de cada llamada (también si falla)."""
+        def decorar(funcion):
+            @functools.wraps(funcion)
+            def envoltura(*args, **kwargs):
+                inicio = time.perf_counter()
+                try:
+                    return funcion(*args, **kwargs)
+                finally:
+                    self.observar(nombre, time.perf_counter() - inicio)
+            return envoltura
+        return decorar
+
+    def instantanea(self):
+        with self._lock:
+            return {
+                'fecha': time.strftime("%Y-%m-%d %H:%M:%S"),
+                'estacion': self.estacion,
+                'contadores': dict(self.contadores),
+                'valores': dict(self.valores),
+                'tiempos': {n: {'cuenta': h.cuenta,
+                                'suma_ms': round(h.suma * 1000, 3),
+                                'p50_ms': round(h.percentil(0.5) * 1000, 3),
+                                'p99_ms': round(h.percentil(0.99) * 1000, 3),
+                                'max_ms': round(h.maximo * 1000, 3)}
+                            for n, h in self.tiempos.items()},
+            }
+
+    def texto_prometheus(self):
+        etiqueta = f'{{estacion="{self.estacion}"}}' if self.estacion else ''
+        lineas = []
+        with self._lock:
+            for nombre, valor in sorted(self.contadores.items()):
+                lineas += [f"# TYPE colas_{nombre}_total counter", f"colas_{nombre}_total{etiqueta} {valor}"]
+            for nombre, valor in sorted(self.valores.items()):
+                lineas += [f"# TYPE colas_{nombre} gauge", f"colas_{nombre}{etiqueta} {valor}"]
+            for nombre, h in sorted(self.tiempos.items()):
+                base = f"colas_{nombre}_segundos"
+                previa = f'estacion="{self.estacion}",' if self.estacion else ''
+                lineas.append(f"# TYPE {base} histogram")
+                acumulado = 0
+                for limite, n in zip(LIMITES + (float('inf'),), h.cubetas):
+                    acumulado += n
+                    le = '+Inf' if limite == float('inf') else repr(limite)
+                    lineas.append(f'{base}_bucket{{{previa}le="{le}"}} {acumulado}')
+                lineas += [f"{base}_sum{etiqueta} {h.suma}", f"{base}_count{etiqueta} {h.cuenta}"]
+        return '\n'.join(lineas) + '\n'
+
+    def iniciar(self, estacion, directorio=DIRECTORIO_METRICAS, intervalo_s=INTERVALO_S, puerto=None):
+        """Empieza a volcar las métricas de ``estacion`` a disco (y por HTTP si hay puerto)."""
+        self.estacion = estacion
+        self._activo = True
+        threading.Thread(target=self._volcar_periodicamente, args=(directorio, intervalo_s),
+                         name='metricas', daemon=True).start()
+
+        puerto = puerto or os.environ.get(VARIABLE_PUERTO)
+        if puerto:
+            try:
+                self._servir(int(puerto))
+            except (OSError, ValueError) as e:
+                print(f"No se pudo abrir el puerto de métricas {puerto}: {e}")
+
+    def listo(self, root):
+        """Registra ``arranque_s`` cuando la ventana ya se dibujó y espera eventos.
+
+        Cuenta desde que se importó este módulo. Con SISTEMACOLAS_SALIR_AL_INICIAR
+        además lo imprime y cierra la ventana (ver benchmarks/arranque.py).
+        """
+        def medir():
+            segundos = time.perf_counter() - INICIO
+            self.fijar('arranque_s', round(segundos, 3))
+            if os.environ.get(VARIABLE_SALIR):
+                print(f"arranque_s={segundos:.3f}", flush=True)
+                root.destroy()
+        root.after_idle(medir)
+
+    def volcar(self):
+        if self._log is not None:
+            self._log.info(json.dumps(self.instantanea(), ensure_ascii=False))
+
+    def _abrir_log(self, directorio):
+        import logging.handlers  # Importación diferida, fuera del hilo de la interfaz
+
+        try:
+            os.makedirs(directorio, exist_ok=True)
+            manejador = logging.handlers.RotatingFileHandler(
+                os.path.join(directorio, f"{self.estacion}.jsonl"), maxBytes=MAX_BYTES,
+                backupCount=COPIAS, encoding='utf-8')
+            manejador.setFormatter(logging.Formatter('%(message)s'))
+            self._log = logging.getLogger(f"metricas.{self.estacion}")
+            self._log.propagate = False
+            self._log.setLevel(logging.INFO)
+            self._log.addHandler(manejador)
+        except OSError as e:
+            print(f"No se pudo abrir el archivo de métricas: {e}")
+            self._log = None
+
+    def _volcar_periodicamente(self, directorio, intervalo_s):
+        self._abrir_log(directorio)
+        while self._activo:
+            time.sleep(intervalo_s)
+            try:
+                self.volcar()
+            except Exception as e:
+                print(f"No se pudieron guardar las métricas: {e}")
+
+    def _servir(self, puerto):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        registro = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                cuerpo = registro.texto_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def log_message(self, *args):
+                pass
+
+        self._http = ThreadingHTTPServer(('', puerto), Manejador)
+        threading.Thread(target=self._http.serve_forever, name='metricas-http', daemon=True).start()
+
+    def detener(self):
+        """Vuelca el último estado y cierra el servidor HTTP."""
+        self._activo = False
+        try:
+            self.volcar()
+        except Exception:
+            pass
+        if self._http is not None:
+            self._http.shutdown()
+            self._http = None
+
+
+_registro = Metricas()
+
+contar = _registro.contar
+fijar = _registro.fijar
+observar = _registro.observar
+cronometro = _registro.cronometro
+instantanea = _registro.instantanea
+iniciar = _registro.iniciar
+listo = _registro.listo
+detener = _registro.detener
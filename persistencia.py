@@ -0,0 +1,274 @@
+"""Hilo de persistencia de cada estación.
+
+Ningún manejador de Tk toca el disco (ni la red, en modo cliente): las
+escrituras se envían como comandos a una cola que atiende un hilo propio,
+dueño del store, y ese mismo hilo revisa los cambios de otras estaciones.
+Los eventos aplicados y los resultados vuelven por otra cola que la ventana
+vacía con ``root.after``; recién ahí se aplican a ``replica``, la copia en
+memoria que leen las listas. Así la interfaz sólo toca memoria, aunque el
+archivo compartido esté en una unidad de red lenta.
+
+    self.persistencia = Persistencia(abrir_store(archivo))
+    self.store = self.persistencia.replica
+    self.persistencia.iniciar(self.root, self.al_cambiar_datos)
+    self.persistencia.enviar('llamar_siguiente', sala, al_terminar=self.mostrar_llamado)
+
+Los comandos con la misma ``clave`` que llegan juntos se ejecutan una sola
+vez (por ejemplo, varios re-llamados seguidos) y todos reciben ese
+resultado. ``latencia_confirmacion`` mide desde ``enviar`` hasta que corre
+``al_terminar``.
+
+Los registros que llegan dentro de ``ventana_ms`` (50 ms por defecto) se
+escriben juntos con ``QueueStore.registrar_lote``: una sola escritura y un
+solo ``fsync`` en el log para toda la ráfaga de la apertura. Con 0 sólo se
+juntan los que ya esperaban en la cola y con None cada registro va por
+separado. Cada turno se confirma recién cuando su escritura terminó.
+"""
+import queue
+import threading
+import time
+
+import esquema
+import metricas
+from queue_store import EstadoCola
+
+INTERVALO_MS = 20  # Revisión de la cola de resultados en la ventana
+INTERVALO_DISCO_MS = 50  # Revisión de cambios de otras estaciones en el hilo
+VENTANA_GRUPO_MS = 50  # Espera para juntar registros en una sola escritura
+
+
+def copiar_estado(store):
+    """Snapshot en memoria del estado de ``store`` (pacientes copiados, no compartidos)."""
+    with store._lock:
+        return {
+            'version_esquema': esquema.VERSION_ESQUEMA,
+            'especialidades': [dict(e) for e in store.datos['especialidades']],
+            'ultimo_llamado': store.datos['ultimo_llamado'],
+            'pacientes': esquema.particionar(store.cola.pacientes.values()),
+            'ultimo_id': store.cola.ultimo_id,
+            'version': store.version,
+        }
+
+
+class ReplicaLocal(EstadoCola):
+    """Réplica que sólo se actualiza con los eventos que entrega el hilo."""
+
+    def __init__(self, store):
+        self.consultorio = store.consultorio
+        self._lock = threading.RLock()
+        self._cargar_estado(copiar_estado(store))
+
+    def actualizar(self):
+        return []  # Los eventos llegan por Persistencia, nunca del disco
+
+
+class Comando:
+    __slots__ = ('operacion', 'args', 'al_terminar', 'al_fallar', 'clave', 'enviado')
+
+    def __init__(self, operacion, args, al_terminar, al_fallar, clave):
+        self.operacion = operacion
+        self.args = args
+        self.al_terminar = al_terminar
+        self.al_fallar = al_fallar
+        self.clave = clave
+        self.enviado = time.perf_counter()
+
+
+class Persistencia:
+    def __init__(self, store, intervalo_ms=INTERVALO_MS, ventana_ms=VENTANA_GRUPO_MS):
+        self.store = store
+        self.replica = ReplicaLocal(store)
+        self.intervalo_ms = intervalo_ms
+        self.ventana_ms = ventana_ms
+        self.root = None
+        self.al_cambiar = None
+        self._comandos = queue.Queue()
+        self._mensajes = queue.Queue()
+        self._firma = store.firma_cambios()
+        self._pendiente = None
+        self._hilo = None
+        store.escuchar()
+        store.tomar_eventos()  # Ya incluidos en la réplica
+
+    # Hilo de la interfaz
+
+    def iniciar(self, root, al_cambiar=None):
+        self.root = root
+        self.al_cambiar = al_cambiar
+        self._hilo = threading.Thread(target=self._trabajar, name='persistencia', daemon=True)
+        self._hilo.start()
+        self._pendiente = root.after(self.intervalo_ms, self._revisar)
+
+    def enviar(self, operacion, *args, al_terminar=None, al_fallar=None, clave=None):
+        """Encola una operación del store: nombre de método o función ``f(store, *args)``."""
+        self._comandos.put(Comando(operacion, args, al_terminar, al_fallar, clave))
+
+    def procesar(self):
+        """Aplica a la réplica lo que dejó el hilo y corre las respuestas; devuelve los eventos."""
+        eventos = []
+        while True:
+            try:
+                tipo, dato = self._mensajes.get_nowait()
+            except queue.Empty:
+                break
+            if tipo == 'estado':
+                # El log fue rotado: la réplica parte del estado recargado por el hilo
+                self.replica._cargar_estado(dato)
+                eventos.append({'op': 'recarga', 'v': self.replica.version})
+            elif tipo == 'eventos':
+                eventos += [e for e in dato if self.replica._recibir(e)]
+            else:
+                self._responder(*dato)
+        if eventos and self.al_cambiar is not None:
+            self.al_cambiar(eventos)
+            escrito = eventos[-1].get('t')
+            if escrito:
+                metricas.observar('latencia_pantalla', max(0.0, time.time() - escrito))
+        return eventos
+
+    def _responder(self, comandos, valor, error):
+        for comando in comandos:
+            metricas.observar('latencia_confirmacion', time.perf_counter() - comando.enviado)
+            try:
+                if error is None:
+                    if comando.al_terminar is not None:
+                        comando.al_terminar(self._local(valor))
+                elif comando.al_fallar is not None:
+                    comando.al_fallar(error)
+                else:
+                    print(f"Falló {comando.operacion}: {error}")
+            except Exception as e:
+                print(f"Error al procesar la respuesta de {comando.operacion}: {e}")
+
+    def _local(self, valor):
+        """El paciente de la réplica en lugar del objeto del hilo, si existe."""
+        if isinstance(valor, esquema.Paciente):
+            return self.replica.paciente(valor.id) or valor
+        return valor
+
+    def _revisar(self):
+        try:
+            self.procesar()
+        except Exception as e:
+            print(f"Error al aplicar cambios: {e}")
+        finally:
+            self._pendiente = self.root.after(self.intervalo_ms, self._revisar)
+
+    def detener(self):
+        if self._pendiente is not None:
+            self.root.after_cancel(self._pendiente)
+            self._pendiente = None
+        self._comandos.put(None)
+        if self._hilo is not None:
+            self._hilo.join(timeout=5)  # Deja terminar las escrituras ya enviadas
+
+    # Hilo de persistencia
+
+    def _trabajar(self):
+        while True:
+            try:
+                lote = [self._comandos.get(timeout=INTERVALO_DISCO_MS / 1000)]
+            except queue.Empty:
+                lote = []
+            while True:
+                try:
+                    lote.append(self._comandos.get_nowait())
+                except queue.Empty:
+                    break
+            fin = None in lote
+            if not fin and self.ventana_ms and any(self._en_grupo(c) for c in lote):
+                self._esperar_ventana(lote)
+                fin = None in lote
+            respuestas = self._ejecutar_todos(self._agrupar([c for c in lote if c is not None]))
+            try:
+                self._revisar_cambios()
+            except Exception as e:
+                print(f"Error al leer los cambios: {e}")
+            eventos = self.store.tomar_eventos()
+            if any(e.get('op') == 'recarga' for e in eventos):
+                self._mensajes.put(('estado', copiar_estado(self.store)))
+            if eventos:
+                self._mensajes.put(('eventos', eventos))
+            for respuesta in respuestas:  # Después de los eventos que produjeron
+                self._mensajes.put(('respuesta', respuesta))
+            if fin:
+                return
+
+    @metricas.cronometro('verificar_cambios')
+    def _revisar_cambios(self):
+        """Lee los eventos de otras estaciones sólo si el log cambió (un ``os.stat``)."""
+        firma = self.store.firma_cambios()
+        if firma != self._firma:
+            self._firma = firma
+            self.store.actualizar()
+
+    @staticmethod
+    def _agrupar(lote):
+        """Junta los comandos con la misma clave; se ejecuta el último de cada una."""
+        grupos = []
+        por_clave = {}
+        for comando in lote:
+            if comando.clave is None:
+                grupos.append([comando])
+            elif comando.clave in por_clave:
+                por_clave[comando.clave].append(comando)
+            else:
+                por_clave[comando.clave] = [comando]
+                grupos.append(por_clave[comando.clave])
+        if len(grupos) < len(lote):
+            metricas.contar('comandos_agrupados', len(lote) - len(grupos))
+        return grupos
+
+    def _en_grupo(self, comando):
+        """Registros que se pueden escribir junto con otros (no en modo cliente)."""
+        return (self.ventana_ms is not None and comando is not None and comando.operacion == 'registrar'
+                and comando.clave is None and hasattr(self.store, 'registrar_lote'))
+
+    def _esperar_ventana(self, lote):
+        """Junta en ``lote`` lo que llegue hasta ``ventana_ms`` después del primer registro."""
+        primero = next(c for c in lote if self._en_grupo(c))
+        limite = primero.enviado + self.ventana_ms / 1000
+        while None not in lote:
+            restante = limite - time.perf_counter()
+            if restante <= 0:
+                break
+            try:
+                lote.append(self._comandos.get(timeout=restante))
+            except queue.Empty:
+                break
+
+    def _ejecutar_todos(self, grupos):
+        """Ejecuta los grupos en orden; los registros seguidos van en una sola escritura."""
+        respuestas = []
+        registros = []
+        for grupo in grupos + [None]:
+            if grupo is not None and len(grupo) == 1 and self._en_grupo(grupo[0]):
+                registros.append(grupo[0])
+                continue
+            if len(registros) == 1:
+                respuestas.append(self._ejecutar(registros))
+            elif registros:
+                respuestas += self._registrar_lote(registros)
+            registros = []
+            if grupo is not None:
+                respuestas.append(self._ejecutar(grupo))
+        return respuestas
+
+    def _registrar_lote(self, comandos):
+        try:
+            resultados = self.store.registrar_lote([c.args for c in comandos])
+        except Exception as e:
+            return [([c], None, e) for c in comandos]
+        return [([c], None, r) if isinstance(r, Exception) else ([c], r, None)
+                for c, r in zip(comandos, resultados)]
+
+    def _ejecutar(self, comandos):
+        ultimo = comandos[-1]
+        try:
+            if isinstance(ultimo.operacion, str):
+                valor = getattr(self.store, ultimo.operacion)(*ultimo.args)
+            else:
+                valor = ultimo.operacion(self.store, *ultimo.args)
+            return comandos, valor, None
+        except Exception as e:
+            return comandos, None, e
@@ -0,0 +1,582 @@
+"""Almacén compartido de la cola de pacientes.
+
+Cada acción (registro, llamado, re-llamado) se agrega como una línea JSON al
+registro de eventos ``datos_hospital.log`` en lugar de reescribir todo
+``datos_hospital.json``. El snapshot completo (en el formato de
+``serializacion``) sólo se reconstruye bajo demanda con ``compactar()``.
+
+Las escrituras se serializan entre procesos con ``BloqueoArchivo`` y cada
+evento lleva un número de versión consecutivo (``v``). Los lectores no toman
+el bloqueo: sólo aplican líneas completas del log.
+
+Con el bloqueo tomado, cada escritura publica además los consultorios que
+cambiaron en la vista mapeada de ``vista_mapeada`` (la leen las pantallas).
+"""
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from bloqueo import BloqueoArchivo, escribir_atomico, agregar_linea
+from cola_hospital import ColaHospital, TurnoDuplicado, clave_prioridad, dia_de
+import esquema
+import serializacion
+from archivo_historico import ArchivoHistorico, DIRECTORIO_HISTORIAL
+from esquema import Paciente
+from estadisticas import Estadisticas, EstadisticasHistoricas
+from estimacion import EstimadorEspera
+import metricas
+from vista_mapeada import PublicadorVista, habilitada, ruta_vista
+
+ARCHIVO_DATOS = 'datos_hospital.json'
+TAMANO_PAGINA = 200  # Filas por página del reporte
+VARIABLE_SERVIDOR = 'SISTEMACOLAS_SERVIDOR'  # host:puerto de servidor_colas.py
+
+ESPECIALIDADES_BASE = [
+    {'nombre': 'Traumatología', 'consultorio': 'Consultorio 1'},
+    {'nombre': 'Internista', 'consultorio': 'Consultorio 2'},
+    {'nombre': 'Cirugía', 'consultorio': 'Consultorio 3'},
+    {'nombre': 'Pediatría', 'consultorio': 'Consultorio 4'},
+    {'nombre': 'Ginecología', 'consultorio': 'Consultorio 5'},
+    {'nombre': 'Neurología', 'consultorio': 'Consultorio 6'},
+    {'nombre': 'Urólogo', 'consultorio': 'Consultorio 7'},
+    {'nombre': 'Cardiología', 'consultorio': 'Consultorio 8'},
+    {'nombre': 'Radiología', 'consultorio': 'Consultorio 9'},
+    {'nombre': 'Medicina', 'consultorio': 'Consultorio 10'},
+    {'nombre': 'Obstetricia 1', 'consultorio': 'Consultorio 11'},
+    {'nombre': 'Obstetricia 2', 'consultorio': 'Consultorio 12'},
+    {'nombre': 'Psicología', 'consultorio': 'Consultorio 13'},
+    {'nombre': 'Dental', 'consultorio': 'Consultorio 14'}
+]
+
+
+def ahora():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+class ConflictoVersion(Exception):
+    """Otra estación modificó la cola antes de que se confirmara la operación."""
+
+
+class EstadoCola:
+    """Réplica en memoria de la cola que se mantiene aplicando eventos.
+
+    La comparten ``QueueStore`` (eventos leídos del log) y
+    ``cliente_colas.ClienteColas`` (eventos recibidos del servidor).
+    """
+    consultorio = None  # Consultorio (o tupla de consultorios) cargado; None = todos
+    feed = None  # Eventos aplicados pendientes de entregar (ver escuchar())
+
+    def _cargar_estado(self, datos):
+        """Reemplaza el estado por el de un snapshot (se migra si es de un esquema anterior)."""
+        datos = esquema.migrar(datos)
+        if not datos.get('especialidades'):
+            datos['especialidades'] = [dict(e) for e in ESPECIALIDADES_BASE]
+
+        self.version = datos.get('version', 0)
+        self.datos = {
+            'especialidades': datos['especialidades'],
+            'ultimo_llamado': datos.get('ultimo_llamado')
+        }
+        self.cola = ColaHospital(esquema.leer_pacientes(datos, self.consultorio))
+        self.cola.ultimo_id = max(self.cola.ultimo_id, datos.get('ultimo_id', 0))
+        self.estadisticas = Estadisticas.desde_pacientes(self.cola.pacientes.values())
+        self.estimador = EstimadorEspera.desde_pacientes(self.cola.pacientes.values())
+        return datos
+
+    def _recibir(self, evento):
+        """Aplica un evento si es posterior a la versión actual."""
+        if evento.get('v', self.version + 1) <= self.version:
+            return False  # Ya incluido en el snapshot
+        self._aplicar(evento)
+        self.version = evento.get('v', self.version + 1)
+        if self.feed is not None:
+            self.feed.append(evento)
+        return True
+
+    def _aplicar(self, evento):
+        op = evento.get('op')
+        if op == 'registro':
+            p = evento['paciente']
+            if self._carga(p['consultorio']):
+                paciente = Paciente.desde_dict(p)
+                self.cola.agregar(paciente)
+                self.estadisticas.registrar(paciente)
+        elif op == 'llamado':
+            if 'paciente' in evento:
+                # Lo llamó otra sala del grupo: primero pasa a ese consultorio
+                self._aplicar({'op': 'reasignado', 'paciente': evento['paciente']})
+            self.cola.atender(evento['id'], evento['fecha_atencion'])
+            paciente = self.cola.pacientes.get(evento['id'])
+            if paciente is not None:
+                self.estadisticas.atender(paciente)
+                self.estimador.atender(paciente.consultorio, paciente.segundos_atencion)
+        elif op == 'reasignado':
+            p = evento['paciente']
+            propio = self._carga(p['consultorio'])
+            if p['id'] in self.cola.pacientes:
+                if propio:
+                    self.cola.reasignar(p['id'], p['consultorio'], p['especialidad'])
+                else:
+                    self.cola.quitar(p['id'])  # Pasó a un consultorio que esta réplica no carga
+            elif propio:
+                self.cola.agregar(Paciente.desde_dict(p))
+        elif op == 'rellamado':
+            self.datos['ultimo_llamado'] = evento['mensaje']
+        elif op == 'rellamado_atendido':
+            self.datos['ultimo_llamado'] = None
+
+    def _carga(self, consultorio):
+        """Indica si esta réplica carga los pacientes de ``consultorio``."""
+        if self.consultorio is None or self.consultorio == consultorio:
+            return True
+        return not isinstance(self.consultorio, str) and consultorio in self.consultorio
+
+    def especialidad_de(self, consultorio):
+        return next((e['nombre'] for e in self.datos['especialidades'] if e['consultorio'] == consultorio), None)
+
+    def escuchar(self):
+        """Empieza a acumular en ``feed`` cada evento aplicado, propio o ajeno."""
+        if self.feed is None:
+            self.feed = deque()
+
+    def tomar_eventos(self):
+        """Devuelve y vacía los eventos acumulados desde la última llamada."""
+        with self._lock:
+            eventos = list(self.feed or ())
+            if self.feed:
+                self.feed.clear()
+            return eventos
+
+    def paciente(self, paciente_id):
+        return self.cola.pacientes.get(paciente_id)
+
+    def espera_estimada(self, paciente, delante=None):
+        """Minutos estimados hasta que llamen a un paciente en espera.
+
+        Sin ``delante`` se cuenta su posición en la cola de su consultorio.
+        """
+        if delante is None:
+            delante = self.cola.delante(paciente)
+        return self.estimador.espera(paciente.consultorio, delante, esquema.segundos_de(ahora()))
+
+
+class QueueStore(EstadoCola):
+    """Cola compartida respaldada por el snapshot y el log de eventos.
+
+    Con ``consultorio`` sólo se carga la partición de ese consultorio (o de
+    varios, si se pasa una tupla) y se ignoran los registros de los demás
+    (útil para ``ModuloConsultorio``).
+    """
+
+    def __init__(self, archivo_datos=ARCHIVO_DATOS, consultorio=None):
+        self.archivo_datos = archivo_datos
+        self.consultorio = consultorio
+        base = os.path.splitext(archivo_datos)[0]
+        self.archivo_log = base + '.log'
+        self.bloqueo = BloqueoArchivo(base + '.lock')
+        self.historial = ArchivoHistorico(
+            os.path.join(os.path.dirname(os.path.abspath(archivo_datos)), DIRECTORIO_HISTORIAL))
+        self.historicas = EstadisticasHistoricas(self.historial)
+        self._lock = threading.RLock()
+        self._offset = 0  # Bytes del log ya aplicados
+        self._id_log = None  # (dispositivo, inodo) del log leído, cambia al rotarlo
+        self.vista = PublicadorVista(ruta_vista(archivo_datos)) if habilitada(archivo_datos) else None
+        self._tocados = set()  # Consultorios cambiados desde la última publicación
+        self._cargar_snapshot()
+        self.actualizar()
+
+    def _aplicar(self, evento):
+        if self.vista is not None:
+            p = evento.get('paciente')
+            if p is not None:
+                self._tocados.add(p['consultorio'])
+            if evento.get('op') in ('llamado', 'reasignado'):
+                anterior = self.cola.pacientes.get(evento.get('id', p and p['id']))
+                if anterior is not None:
+                    self._tocados.add(anterior.consultorio)
+        super()._aplicar(evento)
+
+    def _publicar(self, consultorios=None):
+        """Escribe en la vista los consultorios cambiados (o ``consultorios``); con el bloqueo tomado."""
+        if self.vista is None:
+            return
+        if consultorios is None:
+            consultorios = self._tocados
+        try:
+            self.vista.publicar(self, sorted(c for c in consultorios if self._carga(c)), dia_de(ahora()))
+            self._tocados = set()
+        except (OSError, ValueError) as e:
+            # La vista es sólo una copia para las pantallas: el log ya quedó escrito y los
+            # consultorios pendientes se vuelven a publicar con la próxima escritura
+            print(f"No se pudo publicar la vista: {e}")
+            metricas.contar('vista_errores')
+
+    def _todos_los_consultorios(self):
+        return ({e['consultorio'] for e in self.datos['especialidades']}
+                | {p.consultorio for p in self.cola.pacientes.values()})
+
+    def _cargar_snapshot(self):
+        """Carga el último snapshot completo (o la estructura base si no existe)."""
+        datos = {}
+        if os.path.exists(self.archivo_datos):
+            try:
+                datos = serializacion.leer_archivo(self.archivo_datos, self.consultorio)
+            except (OSError, ValueError) as e:
+                print(f"No se pudo leer el snapshot: {e}")
+        datos = self._cargar_estado(datos)
+        self._offset = datos.get('log_offset', 0)
+
+    def firma_cambios(self):
+        """Valor barato (un ``os.stat``) que cambia cuando se escribe el log."""
+        try:
+            st = os.stat(self.archivo_log)
+            return (st.st_size, st.st_mtime_ns)
+        except FileNotFoundError:
+            return None
+
+    def actualizar(self):
+        """Aplica los eventos nuevos del log y devuelve la lista de eventos aplicados."""
+        with self._lock:
+            try:
+                with open(self.archivo_log, 'rb') as f:
+                    st = os.fstat(f.fileno())
+                    identidad = (st.st_dev, st.st_ino)
+                    if self._id_log not in (None, identidad) or st.st_size < self._offset:
+                        # El log fue rotado (archivo diario): se parte del snapshot nuevo
+                        self._cargar_snapshot()
+                        if self.feed is not None:
+                            self.feed.append({'op': 'recarga', 'v': self.version})
+                    self._id_log = identidad
+                    f.seek(self._offset)
+                    bloque = f.read()
+            except FileNotFoundError:
+                self._id_log = False  # Si aparece después, se relee el snapshot
+                return []
+
+            # Sólo se aplican líneas completas; una escritura a medias se lee después
+            fin = bloque.rfind(b'\n') + 1
+            eventos = []
+            for linea in bloque[:fin].splitlines():
+                if not linea.strip():
+                    continue
+                try:
+                    evento = json.loads(linea.decode('utf-8'))
+                except ValueError:
+                    continue
+                if self._recibir(evento):
+                    eventos.append(evento)
+            self._offset += fin
+            metricas.fijar('tamano_log_bytes', self._offset)
+            return eventos
+
+    @metricas.cronometro('guardar_datos')
+    def _transaccion(self, construir, version_esperada=None):
+        """Agrega al log el evento que devuelve ``construir()`` de forma atómica.
+
+        Con el bloqueo tomado se aplican primero los eventos de otras
+        estaciones, así ``construir`` decide sobre el estado más reciente.
+        Si se indica ``version_esperada`` y la cola cambió desde entonces se
+        lanza ``ConflictoVersion`` (compare-and-swap optimista).
+        """
+        def verificar():
+            if version_esperada is not None and version_esperada != self.version:
+                raise ConflictoVersion(f"Versión {self.version}, se esperaba {version_esperada}")
+            return construir()
+
+        resultado, = self._transacciones([verificar])
+        if isinstance(resultado, Exception):
+            raise resultado
+        return resultado
+
+    def _transacciones(self, construcciones):
+        """Varias transacciones con un solo bloqueo, una escritura y un ``fsync``.
+
+        Cada evento se aplica en memoria al construirse, así el siguiente ve
+        el turno y los duplicados anteriores; las líneas se agregan juntas al
+        log y recién después del ``fsync`` se devuelven. Devuelve, en orden,
+        el evento de cada ``construir`` o la excepción que lanzó (las demás
+        siguen adelante). Si la escritura falla se sacan del ``feed`` los
+        eventos del lote, se recarga el estado del disco y se relanza el
+        error: ningún evento devuelto ni entregado queda sin guardar.
+        """
+        resultados = []
+        lineas = []
+        with self._lock, self.bloqueo:
+            metricas.observar('espera_bloqueo', self.bloqueo.espera)
+            self.actualizar()
+            self._descartar_escritura_cortada()
+            entregados = len(self.feed) if self.feed is not None else 0
+            for construir in construcciones:
+                try:
+                    evento = construir()
+                except Exception as e:
+                    resultados.append(e)
+                    continue
+                evento['v'] = self.version + 1
+                evento['t'] = time.time()
+                lineas.append(json.dumps(evento, ensure_ascii=False) + '\n')
+                self._recibir(evento)
+                resultados.append(evento)
+            if lineas:
+                try:
+                    agregar_linea(self.archivo_log, ''.join(lineas).encode('utf-8'))
+                except BaseException:
+                    while self.feed is not None and len(self.feed) > entregados:
+                        self.feed.pop()  # Nunca llegaron al log
+                    self._recargar()
+                    raise
+                for evento in resultados:
+                    if isinstance(evento, dict):
+                        metricas.contar(f"eventos_{evento['op']}")
+                if len(lineas) > 1:
+                    metricas.contar('escrituras_en_grupo')
+                    metricas.contar('eventos_en_grupo', len(lineas))
+            self.actualizar()  # Avanza sobre las líneas propias, ya aplicadas
+            if lineas:
+                self._publicar()
+        return resultados
+
+    def _descartar_escritura_cortada(self):
+        """Corta del log una línea incompleta de una estación que se cayó al escribir.
+
+        Con el bloqueo tomado nadie más está escribiendo, así que lo que
+        sigue a la última línea completa nunca fue confirmado; sin cortarlo,
+        el evento siguiente quedaría pegado a esa línea e ilegible.
+        """
+        try:
+            if os.path.getsize(self.archivo_log) > self._offset:
+                with open(self.archivo_log, 'r+b') as f:
+                    f.truncate(self._offset)
+                metricas.contar('escrituras_cortadas_descartadas')
+        except FileNotFoundError:
+            pass
+
+    def _recargar(self):
+        """Vuelve al estado del disco (snapshot y log) descartando lo aplicado en memoria."""
+        self._cargar_snapshot()
+        self._id_log = None
+        self.actualizar()
+        if self.feed is not None:
+            self.feed.append({'op': 'recarga', 'v': self.version})
+
+    def _construir_registro(self, nombre, especialidad, consultorio, prioridad=0):
+        def construir():
+            fecha = ahora()
+            if self.cola.duplicado(nombre, dia_de(fecha)):
+                raise TurnoDuplicado(f"{nombre} ya tiene un turno pendiente para hoy")
+            paciente = Paciente(self.cola.siguiente_id(), nombre, especialidad, consultorio, fecha,
+                                prioridad=prioridad)
+            return {'op': 'registro', 'paciente': paciente.a_dict()}
+        return construir
+
+    def registrar(self, nombre, especialidad, consultorio, prioridad=0):
+        """Registra un turno; lanza ``TurnoDuplicado`` si ya tiene uno pendiente hoy.
+
+        ``prioridad`` es el índice en ``cola_hospital.PRIORIDADES``.
+        """
+        evento = self._transaccion(self._construir_registro(nombre, especialidad, consultorio, prioridad))
+        return self.cola.pacientes[evento['paciente']['id']]
+
+    @metricas.cronometro('guardar_lote')
+    def registrar_lote(self, solicitudes):
+        """Registra varios turnos con una sola escritura a disco (group commit).
+
+        ``solicitudes`` son tuplas con los argumentos de ``registrar``.
+        Devuelve, en orden, el paciente de cada una o la excepción que la
+        rechazó (``TurnoDuplicado``).
+        """
+        resultados = self._transacciones([self._construir_registro(*s) for s in solicitudes])
+        return [r if isinstance(r, Exception) else self.cola.pacientes[r['paciente']['id']]
+                for r in resultados]
+
+    def llamar(self, paciente_id, version_esperada=None, consultorio=None):
+        """Marca al paciente como atendido; falla si otra estación ya lo llamó.
+
+        Si lo llama otro ``consultorio`` que el suyo, el paciente pasa a esa
+        sala en el mismo evento del llamado.
+        """
+        def construir():
+            p = self.cola.pacientes.get(paciente_id)
+            if p is None or p.atendido:
+                raise ConflictoVersion(f"El paciente {paciente_id} ya no está en espera")
+            evento = {'op': 'llamado', 'id': paciente_id, 'fecha_atencion': ahora()}
+            if consultorio is not None and consultorio != p.consultorio:
+                datos = p.a_dict()
+                datos.update(consultorio=consultorio,
+                             especialidad=self.especialidad_de(consultorio) or p.especialidad)
+                evento['paciente'] = datos
+            return evento
+
+        self._transaccion(construir, version_esperada)
+        return self.cola.pacientes[paciente_id]
+
+    def reasignar(self, paciente_id, consultorio, especialidad):
+        """Pasa un paciente en espera a otro consultorio; falla si ya lo llamaron."""
+        def construir():
+            p = self.cola.pacientes.get(paciente_id)
+            if p is None or p.atendido:
+                raise ConflictoVersion(f"El paciente {paciente_id} ya no está en espera")
+            datos = p.a_dict()
+            datos.update(consultorio=consultorio, especialidad=especialidad)
+            return {'op': 'reasignado', 'paciente': datos}
+
+        self._transaccion(construir)
+        return self.cola.pacientes[paciente_id]
+
+    def llamar_siguiente(self, consultorio, grupo=()):
+        """Llama al primer paciente en espera del consultorio, o devuelve None.
+
+        Con ``grupo`` (las otras salas de la misma especialidad, cargadas en
+        este store), un consultorio sin pacientes toma al siguiente de ellas
+        según ``clave_prioridad``. El cambio de sala va en el mismo evento del
+        llamado, así dos médicos nunca llaman al mismo paciente.
+        """
+        while True:
+            self.actualizar()
+            hoy = dia_de(ahora())
+            p = self.cola.primero(consultorio, hoy)
+            if p is None:
+                ajenos = [q for q in (self.cola.primero(c, hoy) for c in grupo) if q is not None]
+                if not ajenos:
+                    return None
+                p = min(ajenos, key=clave_prioridad)
+                metricas.contar('pacientes_tomados_del_grupo')
+            try:
+                return self.llamar(p.id, consultorio=consultorio)
+            except ConflictoVersion:
+                continue  # Otra estación lo llamó primero: se toma el siguiente
+
+    def rellamar(self, mensaje, paciente_id=None):
+        evento = {'op': 'rellamado', 'mensaje': mensaje}
+        if paciente_id is not None:
+            evento['id'] = paciente_id  # Permite armar el anuncio con clips en caché
+        self._transaccion(lambda: dict(evento))
+
+    def confirmar_rellamado(self):
+        self._transaccion(lambda: {'op': 'rellamado_atendido'})
+
+    def snapshot(self):
+        """Reconstruye el snapshot completo (esquema actual) a partir de la cola."""
+        if self.consultorio is not None:
+            raise RuntimeError("Un store parcial no puede generar el snapshot completo")
+        with self._lock:
+            self.actualizar()
+            return {
+                'version_esquema': esquema.VERSION_ESQUEMA,
+                'columnas': esquema.COLUMNAS,
+                'especialidades': self.datos['especialidades'],
+                'pacientes': esquema.particionar(self.cola.pacientes.values()),
+                'ultimo_llamado': self.datos['ultimo_llamado'],
+                'ultimo_id': self.cola.ultimo_id,
+                'log_offset': self._offset,
+                'version': self.version
+            }
+
+    def compactar(self):
+        """Escribe un snapshot completo que cubre el log hasta la posición actual."""
+        with self._lock, self.bloqueo:
+            datos = self.snapshot()
+            serializacion.escribir_archivo(self.archivo_datos, datos)
+            self._publicar(self._todos_los_consultorios())
+
+    def archivar(self, hoy=None):
+        """Pasa los días anteriores a ``hoy`` al archivo histórico y rota el log.
+
+        Se ejecuta al iniciar admisión y al cambiar de día. Deja en el
+        snapshot y en memoria sólo los pacientes de hoy; las demás estaciones
+        detectan el log nuevo y recargan el snapshot, y quien escucha este
+        store recibe una ``recarga``. Si no hay días anteriores no toca nada.
+        """
+        if self.consultorio is not None:
+            raise RuntimeError("Un store parcial no puede archivar")
+        hoy = hoy or dia_de(ahora())
+        with self._lock, self.bloqueo:
+            self.actualizar()
+            pasados = {}
+            for p in self.cola.pacientes.values():
+                if p.dia < hoy:
+                    pasados.setdefault(p.dia, []).append(p)
+            if not pasados:
+                return 0
+
+            for dia, pacientes in pasados.items():
+                self.historial.agregar_dia(dia, pacientes)
+                self.historicas.recalcular(dia)
+
+            vigentes = [p for p in self.cola.pacientes.values() if p.dia >= hoy]
+            ultimo_id = self.cola.ultimo_id
+            self.cola = ColaHospital(vigentes)
+            self.cola.ultimo_id = ultimo_id  # Los turnos siguen siendo únicos entre días
+            self.estadisticas = Estadisticas.desde_pacientes(vigentes)  # Lo archivado está en historicas
+            datos = self.snapshot()
+            datos['log_offset'] = 0
+            serializacion.escribir_archivo(self.archivo_datos, datos)
+            # El log nuevo arranca vacío; las versiones siguen desde el snapshot
+            escribir_atomico(self.archivo_log, b'')
+            self._offset = 0
+            self._id_log = None
+            self.actualizar()
+            if self.feed is not None:
+                self.feed.append({'op': 'recarga', 'v': self.version})  # La réplica de la ventana se rehace
+            self._publicar(self._todos_los_consultorios())
+            return sum(len(p) for p in pasados.values())
+
+    def consultar(self, desde=None, hasta=None):
+        """Genera los pacientes registrados entre ``desde`` y ``hasta`` (archivo + día en curso)."""
+        yield from self.historial.consultar(desde, hasta)
+        self.actualizar()
+        for p in list(self.cola.pacientes.values()):
+            if (desde is None or p.dia >= desde) and (hasta is None or p.dia <= hasta):
+                yield p
+
+    def resumen_estadisticas(self, desde=None, hasta=None, por='especialidad'):
+        """Resumen de esperas y atenciones por consultorio o especialidad, sin recorrer pacientes."""
+        total = self.historicas.consultar(desde, hasta)
+        with self._lock:
+            self.actualizar()
+            total.sumar(self.estadisticas)
+        return total.resumen(por, desde, hasta)
+
+    def pagina(self, desde=None, hasta=None, cursor=None, tamano=TAMANO_PAGINA,
+               consultorio=None, especialidad=None):
+        """Una página de ``consultar`` sin leer el resto del rango.
+
+        ``cursor`` es ``(dia, posición)`` de la primera fila (None para empezar).
+        Devuelve las filas y el cursor de la página siguiente, o None al final.
+        Sólo se abren los segmentos de los días que caen en la página.
+        ``consultorio`` y ``especialidad`` filtran las filas sin cambiar el cursor.
+        """
+        vivos = {}
+        with self._lock:  # También se usa desde el hilo de exportación
+            self.actualizar()
+            for p in self.cola.pacientes.values():
+                vivos.setdefault(p.dia, []).append(p)
+        filas = []
+        for dia in sorted(set(self.historial.dias()) | set(vivos)):
+            if (desde and dia < desde) or (hasta and dia > hasta) or (cursor and dia < cursor[0]):
+                continue
+            inicio = cursor[1] if cursor and dia == cursor[0] else 0
+            del_dia = itertools.chain(self.historial.leer_dia(dia), vivos.get(dia, ()))
+            for i, p in enumerate(itertools.islice(del_dia, inicio, None), inicio):
+                if (consultorio and p.consultorio != consultorio) or (especialidad and p.especialidad != especialidad):
+                    continue
+                if len(filas) == tamano:
+                    return filas, (dia, i)
+                filas.append(p)
+        return filas, None
+
+
+def abrir_store(archivo_datos=ARCHIVO_DATOS, consultorio=None):
+    """Almacén de una estación: el servidor de colas si está configurado, si no el archivo."""
+    direccion = os.environ.get(VARIABLE_SERVIDOR)
+    if direccion:
+        from cliente_colas import ClienteColas
+        try:
+            return ClienteColas(direccion, consultorio)
+        except OSError as e:
+            print(f"Servidor de colas no disponible ({e}), usando {archivo_datos}")
+    return QueueStore(archivo_datos, consultorio)
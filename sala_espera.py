@@ -1,17 +1,17 @@
+import os
 import tkinter as tk
 from tkinter import font as tkfont
-import json
-import os
-import time
-import pygame
 from datetime import datetime
-from gtts import gTTS
-import winsound
-from PIL import Image, ImageTk
-import threading  # Importar threading para el Lock
-
-# Crear un objeto Lock global
-file_lock = threading.Lock()
+from queue_store import abrir_store, ahora, VARIABLE_SERVIDOR
+from vista_mapeada import LectorVista, VistaCambiada, habilitada, ruta_vista
+from persistencia import Persistencia
+from vista_incremental import ListaVirtual
+from audio_anuncios import AudioAnuncios, ReproductorAnuncios
+from estimacion import formato_espera
+from esquema import segundos_de
+from cola_hospital import etiqueta_prioridad
+from logos import logo
+import metricas
 
 # Configuración de tamaños
 WINDOW_WIDTH = 1200
@@ -20,17 +20,33 @@ FONT_TITLE_SIZE = 28
 FONT_LIST_SIZE = 26
 LOGO_WIDTH = 800
 LOGO_HEIGHT = 600
+REINTENTO_VISTA_MS = 20  # La vista se publica apenas después de escribir el log
+MAX_REINTENTOS_VISTA = 10
 
 class SalaEspera:
     def __init__(self):
-        # Inicializa audio
-        pygame.mixer.quit()
-        pygame.mixer.init(frequency=22050, size=-16, channels=2, buffer=512)
+        metricas.iniciar('sala_espera')
+
+        # Audio: clips en caché (las frases fijas se preparan en segundo plano)
+        # y un hilo propio que reproduce los anuncios sin bloquear la pantalla
+        self.audio = AudioAnuncios()
+        self.audio.precalentar()
+        self.reproductor = ReproductorAnuncios(self.audio)
 
         # Datos
         self.archivo =  'datos_hospital.json'
+        # Las listas se leen de la vista mapeada que publican las estaciones
+        # que escriben; el store sólo sigue el log (sin cargar pacientes) para
+        # los llamados y re-llamados. Sin vista se carga la cola completa.
+        self.vista = None
+        if habilitada(self.archivo) and not os.environ.get(VARIABLE_SERVIDOR):
+            self.vista = LectorVista.abrir(ruta_vista(self.archivo))
+        self.persistencia = Persistencia(abrir_store(self.archivo, consultorio=() if self.vista else None))
+        self.store = self.persistencia.replica
         self.datos = self._cargar_datos()
         self.ultimo_llamado = None
+        self._eventos_pendientes = []  # Recibidos antes de que la vista los refleje
+        self._reintento_vista = None
         self.logo = None
 
         # Ventana principal
@@ -53,20 +69,11 @@ class SalaEspera:
         self._setup_ui()
         self._cargar_listas()
         self._verificar_cambios()
+        self.root.after(60000, self._refrescar_esperas)
 
+    @metricas.cronometro('cargar_datos')
     def _cargar_datos(self):
-        with file_lock:  # Bloquear acceso al archivo
-            base = {'especialidades': [], 'pacientes': [], 'ultimo_llamado': None}
-            if os.path.exists(self.archivo):
-                try:
-                    with open(self.archivo, 'r', encoding='utf-8') as f:
-                        return json.load(f)
-                except:
-                    return base
-            else:
-                with open(self.archivo, 'w', encoding='utf-8') as f:
-                    json.dump(base, f, indent=4)
-                return base
+        return self.store.datos
 
     def _setup_ui(self):
         # Columna Izquierda
@@ -77,9 +84,7 @@ class SalaEspera:
 
         # Logo
         try:
-            image = Image.open("logo_hospital.png")
-            image = image.resize((LOGO_WIDTH, LOGO_HEIGHT), Image.LANCZOS)
-            self.logo = ImageTk.PhotoImage(image)
+            self.logo = logo(LOGO_WIDTH, LOGO_HEIGHT)
             tk.Label(izq, image=self.logo, bg='black').grid(row=0, column=0, pady=(10,20))
         except:
             tk.Label(izq, text="HOSPITAL DE APOYO PALPA", font=('Arial', FONT_TITLE_SIZE, 'bold'), fg='white', bg='black').grid(row=0, column=0, pady=(10,20))
@@ -119,83 +124,164 @@ class SalaEspera:
         self.txt_atencion = tk.Listbox(atencion, font=self.fuente_lst, bg='#ffe6e6')
         self.txt_atencion.grid(row=1, column=0, sticky='nsew')
 
+        # Sólo se dibujan las filas que caben en pantalla
+        self._esperas = {}  # id -> espera estimada, recalculada en cada refresco
+        self._delante = {}  # id -> pacientes antes en su consultorio
+        self._momento = None
+        self.lista_espera = ListaVirtual(self.txt_espera, self._fila_espera, "Sin pacientes en espera",
+                                         firma=self._espera_de)
+        self.lista_atencion = ListaVirtual(self.txt_atencion, self._fila, "Sin pacientes en atención")
+
     def _update_clock(self):
         self.lbl_reloj.config(text=datetime.now().strftime("%H:%M:%S"))
         self.root.after(1000, self._update_clock)
 
+    @metricas.cronometro('cargar_listas')
     def _cargar_listas(self):
-        self.txt_espera.delete(0, tk.END)
-        self.txt_atencion.delete(0, tk.END)
-
-        espera = [p for p in self.datos['pacientes'] if not p.get('atendido')]
-        espera.sort(key=lambda x: x['fecha_registro'])
-        for p in espera:
-            texto = f"{p['id']}. {p['nombre']} ({p['especialidad']})"
-            self.txt_espera.insert(tk.END, texto)
-
-        atend = [p for p in self.datos['pacientes'] if p.get('atendido')]
-        atend.sort(key=lambda x: (x.get('fecha_atencion',''), x.get('id',0)), reverse=True)
-        for p in atend:
-            texto = f"{p['id']}. {p['nombre']} ({p['especialidad']})"
-            self.txt_atencion.insert(tk.END, texto)
+        hoy = datetime.now().strftime("%Y-%m-%d")
+        fuente = self.vista or self.store.cola
+        try:
+            espera = fuente.espera_del_dia(hoy)
+            self._estimador = self.vista.estimador(hoy) if self.vista else self.store.estimador
+            self._calcular_esperas(espera)
+            self.lista_espera.sincronizar(espera)  # De la vista se decodifican sólo las filas visibles
+
+            # Atendidos de hoy, el más reciente primero
+            atend = fuente.atendidos_del_dia(hoy)
+            self.lista_atencion.sincronizar(atend)
+            ultimo = atend[0] if atend else None
+        except VistaCambiada:
+            metricas.contar('vista_no_disponible')
+            return  # Se vuelve a leer con el próximo evento o refresco
 
         # Actualizar último atendido
-        if atend:
-            ultimo = atend[0]
-            self.lbl_last.config(text=f"En atención: {ultimo['id']}. {ultimo['nombre']} ({ultimo['especialidad']})")
+        if ultimo is not None:
+            texto = f"En atención: {ultimo.id}. {ultimo.nombre} ({ultimo.especialidad})"
         else:
-            self.lbl_last.config(text="En atención: Ninguno")
-
-        if not espera:
-            self.txt_espera.insert(tk.END, "Sin pacientes en espera")
-        if not atend:
-            self.txt_atencion.insert(tk.END, "Sin pacientes en atención")
-
-    def _verificar_cambios(self):
-        nuevos_datos = self._cargar_datos()
-        pygame.mixer.music.stop()
-
-        if 'ultimo_llamado' in nuevos_datos and nuevos_datos['ultimo_llamado'] and nuevos_datos['ultimo_llamado'].startswith("RELLAMADO_"):
-            mensaje = nuevos_datos['ultimo_llamado'].split('_',1)[1]
-            nuevos_datos['ultimo_llamado']=None
-            with open(self.archivo,'w',encoding='utf-8') as f:
-                json.dump(nuevos_datos,f,indent=4)
-            self._play_audio(mensaje)
-            self.datos=nuevos_datos
-            self._cargar_listas()
-            self.root.after(3000,self._verificar_cambios)
+            texto = "En atención: Ninguno"
+        if self.lbl_last.cget('text') != texto:
+            self.lbl_last.config(text=texto)
+
+    @staticmethod
+    def _fila(p):
+        return f"{p.id}. {p.nombre} ({p.especialidad})"
+
+    def _fila_espera(self, p):
+        return f"{SalaEspera._fila(p)}{etiqueta_prioridad(p)}  {self._espera_de(p)}"
+
+    def _calcular_esperas(self, espera):
+        """Cuántos tiene delante en su consultorio cada paciente; la espera se estima al mostrarlo.
+
+        Las filas de la vista ya traen esa cuenta (``FilasVista.delante``)
+        al decodificarse, así no se recorre la espera completa.
+        """
+        self._momento = segundos_de(ahora())  # Una sola conversión para todas las filas
+        self._esperas = {}
+        if hasattr(espera, 'delante'):
+            self._delante = espera.delante
             return
+        contados = {}
+        delante = {}
+        for p in espera:
+            n = contados.get(p.consultorio, 0)
+            delante[p.id] = n
+            contados[p.consultorio] = n + 1
+        self._delante = delante
+
+    def _espera_de(self, p):
+        espera = self._esperas.get(p.id)
+        if espera is None:
+            minutos = self._estimador.espera(p.consultorio, self._delante.get(p.id, 0), self._momento)
+            espera = self._esperas[p.id] = formato_espera(minutos)
+        return espera
+
+    def _refrescar_esperas(self):
+        """Las esperas bajan con el tiempo aunque nadie sea llamado."""
+        try:
+            self._cargar_listas()
+        finally:
+            self.root.after(60000, self._refrescar_esperas)
 
-        atend = [p for p in nuevos_datos['pacientes'] if p.get('atendido')]
-        if atend:
-            ultimo = sorted(atend,key=lambda x:(x.get('fecha_atencion',''),x.get('id',0)),reverse=True)[0]
-            if not self.ultimo_llamado or ultimo['id']!=self.ultimo_llamado['id']:
-                self.ultimo_llamado=ultimo
-                mensaje=f"Paciente {ultimo['nombre']}, favor dirigirse al {ultimo['consultorio']}"
-                self._play_audio(mensaje)
-
-        self.datos=nuevos_datos
+    @metricas.cronometro('verificar_cambios_inicio')
+    def _verificar_cambios(self):
+        pendiente = self.store.datos.get('ultimo_llamado')
+        self.persistencia.iniciar(self.root, self._aplicar_cambios)
+        if pendiente:
+            # Re-llamado registrado mientras la pantalla estaba apagada
+            self._aplicar_cambios([{'op': 'rellamado', 'mensaje': pendiente}])
+
+    def _paciente(self, paciente_id):
+        if self.vista is None or paciente_id is None:
+            return self.store.paciente(paciente_id)
+        try:
+            return self.vista.paciente(paciente_id, datetime.now().strftime("%Y-%m-%d"))
+        except VistaCambiada:
+            return None
+
+    def _aplicar_cambios(self, eventos):
+        self._eventos_pendientes.extend(eventos)
+        if self._reintento_vista is None:
+            self._procesar_eventos()
+
+    def _procesar_eventos(self, intento=0):
+        """Anuncia los llamados nuevos y refresca las listas con los eventos recibidos.
+
+        La vista se publica justo después de escribir el log: si todavía no
+        llegó a la versión de los eventos se espera un poco, sin desordenar
+        los anuncios, y después de ``MAX_REINTENTOS_VISTA`` se sigue igual.
+        """
+        self._reintento_vista = None
+        eventos = self._eventos_pendientes
+        if self.vista is not None and intento < MAX_REINTENTOS_VISTA:
+            try:
+                atrasada = self.vista.version() < max((e.get('v', 0) for e in eventos), default=0)
+            except VistaCambiada:
+                atrasada = True
+            if atrasada:
+                metricas.contar('vista_reintentos')
+                self._reintento_vista = self.root.after(REINTENTO_VISTA_MS,
+                                                        lambda: self._procesar_eventos(intento + 1))
+                return
+        self._eventos_pendientes = []
+        self.datos = self.store.datos
         self._cargar_listas()
-        self.root.after(3000,self._verificar_cambios)
 
-    def _play_audio(self,texto):
-        try:
-            pygame.mixer.quit()
-            pygame.mixer.init(frequency=22050,size=-16,channels=2,buffer=512)
-            temp_file=f"temp_audio_{int(time.time())}.mp3"
-            tts=gTTS(text=texto, lang='es', slow=False)
-            tts.save(temp_file)
-            pygame.mixer.music.load(temp_file)
-            pygame.mixer.music.play()
-            while pygame.mixer.music.get_busy(): pygame.time.Clock().tick(10)
-            pygame.mixer.music.unload()
-            os.remove(temp_file)
-        except:
-            winsound.Beep(1000,500)
+        for evento in eventos:
+            if evento['op'] == 'llamado':
+                ultimo = self._paciente(evento['id'])
+                if ultimo is None:
+                    continue
+                self.ultimo_llamado = ultimo
+                self._play_audio(('llamado', ultimo.id), self.audio.partes_llamado(ultimo.nombre, ultimo.consultorio))
+            elif evento['op'] == 'rellamado' and evento['mensaje'].startswith("RELLAMADO_"):
+                self.persistencia.enviar('confirmar_rellamado', clave='confirmar_rellamado')
+                p = self._paciente(evento.get('id'))
+                if p is not None:
+                    partes = self.audio.partes_llamado(p.nombre, p.consultorio, rellamado=True)
+                else:
+                    partes = [evento['mensaje'].split('_',1)[1]]
+                self._play_audio(('rellamado', evento['mensaje']), partes)
+
+    @metricas.cronometro('play_audio')
+    def _play_audio(self, clave, partes):
+        """Encola el anuncio en el hilo de audio; no bloquea la interfaz."""
+        self.reproductor.anunciar(clave, partes)
 
     def run(self):
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        metricas.listo(self.root)
         self.root.mainloop()
 
+    def on_close(self):
+        if self._reintento_vista is not None:
+            self.root.after_cancel(self._reintento_vista)
+        self.persistencia.detener()
+        self.reproductor.detener()
+        if self.vista:
+            self.vista.cerrar()
+        metricas.detener()
+        self.root.destroy()
+
 if __name__ == "__main__":
     app = SalaEspera()
     app.run()
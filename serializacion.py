@@ -0,0 +1,280 @@
+"""Formatos del snapshot de la cola.
+
+El snapshot (``datos_hospital.json``, ver ``esquema``) se puede guardar en
+varios formatos; al leerlo el formato se reconoce por los primeros bytes,
+así estaciones configuradas distinto comparten el mismo archivo:
+
+    json      el JSON compacto del esquema (filas por consultorio)
+    binario   tabla de cadenas y columnas empaquetadas con ``array``: la
+              especialidad es un índice en la tabla, las fechas segundos
+              enteros y los nombres un solo bloque UTF-8. Cada consultorio
+              es una sección aparte, así un store parcial sólo decodifica
+              las suyas.
+    msgpack   el mismo contenido que ``binario`` en MessagePack (requiere
+              el paquete msgpack)
+
+Se escribe en ``binario`` salvo que SISTEMACOLAS_FORMATO_SNAPSHOT indique
+otro. El JSON queda para exportar e inspeccionar:
+
+    python serializacion.py datos_hospital.json --exportar copia.json
+    python serializacion.py datos_hospital.json --formato json
+"""
+import argparse
+import importlib.util
+import json
+import os
+import struct
+import sys
+from array import array
+from datetime import datetime, timedelta
+
+from bloqueo import escribir_atomico
+import esquema
+
+VARIABLE_FORMATO = 'SISTEMACOLAS_FORMATO_SNAPSHOT'
+FORMATO_POR_DEFECTO = 'binario'
+
+MAGIA = b'SCOL'
+VERSION_BINARIO = 1
+CABECERA = struct.Struct('<4scBI')  # Magia, tipo, versión, largo de la cabecera JSON
+EPOCA = datetime(1970, 1, 1)
+SEPARADOR_NOMBRES = '\x00'
+# Columnas de cada sección binaria, en orden (la de nombres va al final)
+COLUMNAS_BINARIAS = (('id', 'I'), ('especialidad', 'H'), ('fecha_registro', 'I'),
+                     ('fecha_atencion', 'I'), ('atendido', 'B'), ('prioridad', 'B'))
+
+_prefijos = {}  # Día desde 1970 -> 'AAAA-MM-DD '
+_horas = []  # Segundo del día -> 'HH:MM:SS' (se arma la primera vez)
+
+
+a_segundos = esquema.segundos_de  # '2024-05-01 08:30:00' -> segundos desde 1970; None -> 0
+
+
+def desde_segundos(segundos):
+    """Inversa de ``a_segundos``."""
+    return _fechas((segundos,))[0]
+
+
+def _fechas(columna):
+    """Columna de segundos -> columna de fechas; cada día y cada hora se formatean una sola vez."""
+    if not _horas:
+        _horas.extend(f"{h:02d}:{m:02d}:{s:02d}" for h in range(24) for m in range(60) for s in range(60))
+    fechas = []
+    for segundos in columna:
+        if not segundos:
+            fechas.append(None)
+            continue
+        dia, resto = divmod(segundos, 86400)
+        prefijo = _prefijos.get(dia)
+        if prefijo is None:
+            prefijo = _prefijos[dia] = (EPOCA + timedelta(days=dia)).strftime('%Y-%m-%d ')
+        fechas.append(prefijo + _horas[resto])
+    return fechas
+
+
+def _cabecera(datos):
+    """Todo el snapshot salvo los pacientes (especialidades, versión, offset del log...)."""
+    return {k: v for k, v in datos.items() if k not in ('pacientes', 'columnas')}
+
+
+def _columnas(filas, cadenas):
+    """Filas de ``esquema.COLUMNAS`` -> columnas con enteros e índices en ``cadenas``."""
+    indices = {c: i for i, c in enumerate(cadenas)}
+    columnas = {nombre: [] for nombre, _ in COLUMNAS_BINARIAS}
+    nombres = []
+    for id_, nombre, especialidad, registro, atendido, atencion, prioridad in filas:
+        if especialidad not in indices:
+            indices[especialidad] = len(cadenas)
+            cadenas.append(especialidad)
+        columnas['id'].append(id_)
+        columnas['especialidad'].append(indices[especialidad])
+        columnas['fecha_registro'].append(a_segundos(registro))
+        columnas['fecha_atencion'].append(a_segundos(atencion))
+        columnas['atendido'].append(int(atendido))
+        columnas['prioridad'].append(prioridad)
+        nombres.append(nombre)
+    return columnas, nombres
+
+
+def _filas(columnas, nombres, cadenas):
+    """Inversa de ``_columnas``."""
+    return list(map(list, zip(columnas['id'], nombres, [cadenas[i] for i in columnas['especialidad']],
+                              _fechas(columnas['fecha_registro']), columnas['atendido'],
+                              _fechas(columnas['fecha_atencion']), columnas['prioridad'])))
+
+
+def _elegidas(particiones, consultorio):
+    if consultorio is None:
+        return particiones
+    nombres = {consultorio} if isinstance(consultorio, str) else set(consultorio)
+    return [p for p in particiones if p[0] in nombres]
+
+
+class FormatoJson:
+    nombre = 'json'
+
+    def disponible(self):
+        return True
+
+    def codificar(self, datos):
+        return json.dumps(datos, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    def decodificar(self, contenido, consultorio=None):
+        return json.loads(contenido.decode('utf-8'))
+
+
+class FormatoBinario:
+    """Cabecera JSON con la tabla de cadenas y secciones de columnas por consultorio."""
+    nombre = 'binario'
+    tipo = b'B'
+
+    def disponible(self):
+        return True
+
+    def codificar(self, datos):
+        cadenas = []
+        particiones = []
+        secciones = []
+        posicion = 0
+        for consultorio, filas in datos.get('pacientes', {}).items():
+            columnas, nombres = _columnas(filas, cadenas)
+            bloque = b''.join(self._empaquetar(codigo, columnas[nombre]) for nombre, codigo in COLUMNAS_BINARIAS)
+            bloque_nombres = SEPARADOR_NOMBRES.join(nombres).encode('utf-8')
+            particiones.append([consultorio, posicion, len(filas), len(bloque_nombres)])
+            secciones += [bloque, bloque_nombres]
+            posicion += len(bloque) + len(bloque_nombres)
+        cabecera = dict(_cabecera(datos), cadenas=cadenas, particiones=particiones)
+        texto = json.dumps(cabecera, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        return CABECERA.pack(MAGIA, self.tipo, VERSION_BINARIO, len(texto)) + texto + b''.join(secciones)
+
+    @staticmethod
+    def _empaquetar(codigo, valores):
+        columna = array(codigo, valores)
+        if sys.byteorder == 'big':
+            columna.byteswap()  # El archivo es little-endian
+        return columna.tobytes()
+
+    def decodificar(self, contenido, consultorio=None):
+        _, _, version, largo = CABECERA.unpack_from(contenido)
+        if version > VERSION_BINARIO:
+            raise ValueError(f"Formato binario {version} más nuevo que el soportado ({VERSION_BINARIO})")
+        inicio = CABECERA.size + largo
+        cabecera = json.loads(contenido[CABECERA.size:inicio].decode('utf-8'))
+        cadenas = cabecera.pop('cadenas')
+        pacientes = {}
+        vista = memoryview(contenido)
+        for nombre_particion, posicion, cantidad, largo_nombres in _elegidas(cabecera.pop('particiones'), consultorio):
+            posicion += inicio
+            columnas = {}
+            for nombre, codigo in COLUMNAS_BINARIAS:
+                columna = array(codigo)
+                fin = posicion + cantidad * columna.itemsize
+                columna.frombytes(vista[posicion:fin])
+                if sys.byteorder == 'big':
+                    columna.byteswap()
+                columnas[nombre] = columna
+                posicion = fin
+            nombres = bytes(vista[posicion:posicion + largo_nombres]).decode('utf-8').split(SEPARADOR_NOMBRES)
+            pacientes[nombre_particion] = _filas(columnas, nombres, cadenas)
+        cabecera['columnas'] = esquema.COLUMNAS
+        cabecera['pacientes'] = pacientes
+        return cabecera
+
+
+class FormatoMsgpack:
+    """Las mismas columnas que ``binario``, en un documento MessagePack."""
+    nombre = 'msgpack'
+    tipo = b'M'
+
+    def disponible(self):
+        return importlib.util.find_spec('msgpack') is not None
+
+    def codificar(self, datos):
+        import msgpack  # Importación diferida: dependencia opcional
+
+        cadenas = []
+        particiones = {}
+        for consultorio, filas in datos.get('pacientes', {}).items():
+            columnas, nombres = _columnas(filas, cadenas)
+            particiones[consultorio] = [nombres] + [columnas[nombre] for nombre, _ in COLUMNAS_BINARIAS]
+        cuerpo = msgpack.packb({'cabecera': _cabecera(datos), 'cadenas': cadenas, 'particiones': particiones})
+        return CABECERA.pack(MAGIA, self.tipo, VERSION_BINARIO, 0) + cuerpo
+
+    def decodificar(self, contenido, consultorio=None):
+        import msgpack
+
+        documento = msgpack.unpackb(contenido[CABECERA.size:], strict_map_key=False)
+        datos = documento['cabecera']
+        cadenas = documento['cadenas']
+        pacientes = {}
+        for nombre_particion, (nombres, *valores) in _elegidas(list(documento['particiones'].items()), consultorio):
+            columnas = {nombre: v for (nombre, _), v in zip(COLUMNAS_BINARIAS, valores)}
+            pacientes[nombre_particion] = _filas(columnas, nombres, cadenas)
+        datos['columnas'] = esquema.COLUMNAS
+        datos['pacientes'] = pacientes
+        return datos
+
+
+FORMATOS = {f.nombre: f for f in (FormatoJson(), FormatoBinario(), FormatoMsgpack())}
+_POR_TIPO = {f.tipo: f for f in FORMATOS.values() if hasattr(f, 'tipo')}
+
+
+def formato_actual():
+    """Formato en que se escriben los snapshots (SISTEMACOLAS_FORMATO_SNAPSHOT)."""
+    nombre = os.environ.get(VARIABLE_FORMATO) or FORMATO_POR_DEFECTO
+    formato = FORMATOS.get(nombre)
+    if formato is None or not formato.disponible():
+        print(f"Formato de snapshot {nombre!r} no disponible, se usa JSON")
+        return FORMATOS['json']
+    return formato
+
+
+def formato_de(contenido):
+    """El formato de un snapshot según sus primeros bytes."""
+    if contenido[:len(MAGIA)] == MAGIA:
+        formato = _POR_TIPO.get(contenido[len(MAGIA):len(MAGIA) + 1])
+        if formato is None:
+            raise ValueError("Snapshot en un formato binario desconocido")
+        return formato
+    return FORMATOS['json']
+
+
+def codificar(datos, formato=None):
+    return (formato or formato_actual()).codificar(datos)
+
+
+def decodificar(contenido, consultorio=None):
+    """Snapshot con los pacientes como filas de ``esquema.COLUMNAS``.
+
+    Con ``consultorio`` (un nombre o varios) los formatos binarios sólo
+    decodifican esas particiones; el JSON se lee completo.
+    """
+    return formato_de(contenido).decodificar(contenido, consultorio)
+
+
+def leer_archivo(ruta, consultorio=None):
+    with open(ruta, 'rb') as f:
+        return decodificar(f.read(), consultorio)
+
+
+def escribir_archivo(ruta, datos, formato=None):
+    escribir_atomico(ruta, codificar(datos, formato))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convierte o exporta el snapshot de la cola")
+    parser.add_argument('archivo', nargs='?', default='datos_hospital.json')
+    parser.add_argument('--formato', choices=sorted(FORMATOS), help="reescribe el snapshot en este formato")
+    parser.add_argument('--exportar', metavar='DESTINO', help="escribe una copia en JSON legible")
+    args = parser.parse_args()
+    with open(args.archivo, 'rb') as f:
+        contenido = f.read()
+    datos = esquema.migrar(decodificar(contenido))
+    if args.exportar:
+        with open(args.exportar, 'w', encoding='utf-8') as f:
+            json.dump(datos, f, ensure_ascii=False, indent=4)
+        print(f"{args.archivo} ({formato_de(contenido).nombre}) exportado a {args.exportar}")
+    if args.formato:
+        escribir_archivo(args.archivo, datos, FORMATOS[args.formato])
+        print(f"{args.archivo}: {len(contenido)} bytes en {formato_de(contenido).nombre}, "
+              f"{os.path.getsize(args.archivo)} bytes en {args.formato}")
@@ -0,0 +1,217 @@
+"""Servidor de colas opcional para las estaciones.
+
+Un proceso único es dueño de la cola (un ``QueueStore`` sobre
+``datos_hospital.json``) y las estaciones le hablan por TCP en vez de leer
+el archivo compartido. El protocolo es una línea JSON por mensaje:
+
+    -> {"op": "registrar", "nombre": ..., "especialidad": ..., "consultorio": ...}
+    <- {"ok": true, "paciente": {...}, "v": 42}
+    <- {"ok": false, "error": "TurnoDuplicado", "mensaje": "..."}
+
+Operaciones: ``registrar``, ``llamar``, ``llamar_siguiente``, ``reasignar``,
+``rellamar``, ``confirmar_rellamado``, ``consultar``, ``pagina``,
+``estadisticas``, ``archivar`` y ``suscribir``. Una conexión de suscripción
+recibe primero ``{"op": "estado", "datos": ...}`` con el snapshot completo
+y luego cada evento nuevo, igual que en el log. ``archivar`` usa la fecha
+del servidor, no la del cliente; cuando rota el log (o el store se recarga
+del disco) los suscriptores reciben de nuevo ``estado`` y rehacen su réplica.
+
+Las operaciones del store (y su ``fsync``) corren en un único hilo aparte,
+en orden, así una escritura lenta no frena las demás conexiones ni las
+suscripciones.
+
+Por defecto sólo escucha en la máquina local; para las estaciones de la
+red se indica la interfaz:
+
+    python servidor_colas.py --host 0.0.0.0 --puerto 8765
+
+Las estaciones lo usan si se define SISTEMACOLAS_SERVIDOR=host:puerto; si
+no, o si no responde, siguen trabajando sobre el archivo compartido.
+"""
+import argparse
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import metricas
+
+from queue_store import QueueStore, ConflictoVersion, ARCHIVO_DATOS
+from cola_hospital import TurnoDuplicado
+from cliente_colas import PUERTO_POR_DEFECTO
+
+INTERVALO_VIGILANCIA = 0.05  # Eventos escritos en el archivo por estaciones sin servidor
+
+
+def _codificar(mensaje):
+    return json.dumps(mensaje, ensure_ascii=False).encode('utf-8') + b'\n'
+
+
+class ServidorColas:
+    def __init__(self, store, host='127.0.0.1', puerto=PUERTO_POR_DEFECTO):
+        self.store = store
+        self.host = host
+        self.puerto = puerto
+        self._suscriptores = set()
+        self._firma = None
+        self._servidor = None
+        self._vigilancia = None
+        self._ejecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='store')
+        store.escuchar()
+
+    async def iniciar(self):
+        self._servidor = await asyncio.start_server(self._atender, self.host, self.puerto)
+        self.puerto = self._servidor.sockets[0].getsockname()[1]
+        self._vigilancia = asyncio.ensure_future(self._vigilar())
+        return self
+
+    async def detener(self):
+        self._vigilancia.cancel()
+        self._servidor.close()
+        await self._servidor.wait_closed()
+        self._ejecutor.shutdown()
+
+    async def _en_store(self, funcion, *args):
+        """Corre ``funcion(*args)`` en el hilo del store, después de las operaciones ya pedidas."""
+        return await asyncio.get_running_loop().run_in_executor(self._ejecutor, funcion, *args)
+
+    def _tomar_mensajes(self):
+        """Los eventos nuevos ya codificados (en el hilo del store).
+
+        Una recarga (log rotado por ``archivar``) se manda como ``estado``
+        completo: los eventos no alcanzan para sacar los días archivados.
+        """
+        mensajes = []
+        for evento in self.store.tomar_eventos():
+            if evento.get('op') == 'recarga':
+                evento = {'op': 'estado', 'datos': self.store.snapshot()}
+            mensajes.append(_codificar(evento))
+        return mensajes
+
+    def _revisar_cambios(self):
+        firma = self.store.firma_cambios()
+        if firma != self._firma:
+            self._firma = firma
+            self.store.actualizar()
+        return self._tomar_mensajes()
+
+    def _ejecutar_y_tomar(self, pedido):
+        return self._ejecutar(pedido), self._tomar_mensajes()
+
+    async def _vigilar(self):
+        while True:
+            await asyncio.sleep(INTERVALO_VIGILANCIA)
+            self._difundir(await self._en_store(self._revisar_cambios))
+
+    def _difundir(self, mensajes):
+        for mensaje in mensajes:
+            for cola in self._suscriptores:
+                cola.put_nowait(mensaje)
+
+    async def _atender(self, reader, writer):
+        try:
+            while True:
+                linea = await reader.readline()
+                if not linea:
+                    break
+                try:
+                    pedido = json.loads(linea)
+                except ValueError:
+                    writer.write(_codificar({'ok': False, 'error': 'Protocolo', 'mensaje': 'JSON inválido'}))
+                    await writer.drain()
+                    continue
+                if pedido.get('op') == 'suscribir':
+                    await self._suscripcion(writer)
+                    break
+                respuesta, mensajes = await self._en_store(self._ejecutar_y_tomar, pedido)
+                self._difundir(mensajes)
+                writer.write(_codificar(respuesta))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _suscripcion(self, writer):
+        def preparar():
+            self.store.actualizar()
+            return self._tomar_mensajes(), self.store.snapshot()
+
+        # El suscriptor se agrega antes de pedir el snapshot, así ningún evento queda
+        # entre ambos; los que ya incluye el snapshot el cliente los descarta por versión
+        cola = asyncio.Queue()
+        self._suscriptores.add(cola)
+        try:
+            mensajes, snapshot = await self._en_store(preparar)
+            self._difundir(mensajes)
+            writer.write(_codificar({'op': 'estado', 'datos': snapshot}))
+            await writer.drain()
+            while True:
+                writer.write(await cola.get())
+                await writer.drain()
+        finally:
+            self._suscriptores.discard(cola)
+
+    def _ejecutar(self, pedido):
+        op = pedido.get('op')
+        try:
+            if op == 'registrar':
+                p = self.store.registrar(pedido['nombre'], pedido['especialidad'], pedido['consultorio'],
+                                         pedido.get('prioridad', 0))
+                return {'ok': True, 'paciente': p.a_dict(), 'v': self.store.version}
+            if op == 'llamar':
+                p = self.store.llamar(pedido['id'], pedido.get('version_esperada'), pedido.get('consultorio'))
+                return {'ok': True, 'paciente': p.a_dict(), 'v': self.store.version}
+            if op == 'reasignar':
+                p = self.store.reasignar(pedido['id'], pedido['consultorio'], pedido['especialidad'])
+                return {'ok': True, 'paciente': p.a_dict(), 'v': self.store.version}
+            if op == 'llamar_siguiente':
+                p = self.store.llamar_siguiente(pedido['consultorio'], pedido.get('grupo', ()))
+                return {'ok': True, 'paciente': p.a_dict() if p else None, 'v': self.store.version}
+            if op == 'rellamar':
+                self.store.rellamar(pedido['mensaje'], pedido.get('id'))
+                return {'ok': True, 'v': self.store.version}
+            if op == 'confirmar_rellamado':
+                self.store.confirmar_rellamado()
+                return {'ok': True, 'v': self.store.version}
+            if op == 'consultar':
+                pacientes = [p.a_dict() for p in self.store.consultar(pedido.get('desde'), pedido.get('hasta'))]
+                return {'ok': True, 'pacientes': pacientes}
+            if op == 'pagina':
+                cursor = pedido.get('cursor')
+                filas, siguiente = self.store.pagina(pedido.get('desde'), pedido.get('hasta'),
+                                                     tuple(cursor) if cursor else None, pedido['tamano'],
+                                                     pedido.get('consultorio'), pedido.get('especialidad'))
+                return {'ok': True, 'pacientes': [p.a_dict() for p in filas], 'cursor': siguiente}
+            if op == 'estadisticas':
+                resumen = self.store.resumen_estadisticas(pedido.get('desde'), pedido.get('hasta'),
+                                                          pedido.get('por', 'especialidad'))
+                return {'ok': True, 'resumen': resumen}
+            if op == 'archivar':
+                return {'ok': True, 'archivados': self.store.archivar()}  # Con la fecha del servidor
+            return {'ok': False, 'error': 'Protocolo', 'mensaje': f"Operación desconocida: {op}"}
+        except (TurnoDuplicado, ConflictoVersion) as e:
+            return {'ok': False, 'error': type(e).__name__, 'mensaje': str(e)}
+        except Exception as e:
+            return {'ok': False, 'error': 'Error', 'mensaje': str(e)}
+
+
+async def servir(archivo, host, puerto):
+    metricas.iniciar('servidor')
+    store = QueueStore(archivo)
+    store.archivar()
+    servidor = await ServidorColas(store, host, puerto).iniciar()
+    print(f"Servidor de colas escuchando en {host}:{servidor.puerto}")
+    await servidor._servidor.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor de colas del hospital")
+    parser.add_argument('--archivo', default=ARCHIVO_DATOS)
+    parser.add_argument('--host', default='127.0.0.1',
+                        help="interfaz donde escuchar (0.0.0.0 para aceptar estaciones de la red)")
+    parser.add_argument('--puerto', type=int, default=PUERTO_POR_DEFECTO)
+    args = parser.parse_args()
+    try:
+        asyncio.run(servir(args.archivo, args.host, args.puerto))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,131 @@
+"""Listas de pacientes que se actualizan por diferencias.
+
+En lugar de borrar el ``Listbox`` completo y volver a insertar todas las
+filas en cada refresco, ``ListaIncremental`` compara el estado anterior con
+el nuevo por ``id`` de paciente y sólo inserta, quita o reemplaza las filas
+que cambiaron. El texto de cada fila se arma una sola vez y se guarda.
+
+``ListaVirtual`` va un paso más allá para colas largas: el ``Listbox`` sólo
+contiene las filas visibles y la barra de desplazamiento recorre la lista
+de pacientes en memoria, así el costo de cada refresco no depende del largo
+de la cola.
+"""
+import tkinter as tk
+
+
+class ListaIncremental:
+    def __init__(self, listbox, render, texto_vacio, firma=None):
+        self.listbox = listbox
+        self.render = render  # paciente -> texto de la fila
+        self.firma = firma  # paciente -> valor que invalida el texto guardado
+        self.texto_vacio = texto_vacio
+        self._ids = []  # id del paciente mostrado en cada fila
+        self._cache = {}  # id -> (firma, texto)
+        self._vacia = False
+
+    def _texto(self, p):
+        firma = self.firma(p) if self.firma else None
+        guardado = self._cache.get(p.id)
+        if guardado is None or guardado[0] != firma:
+            guardado = (firma, self.render(p))
+            self._cache[p.id] = guardado
+        return guardado[1]
+
+    def sincronizar(self, pacientes):
+        """Deja el Listbox con las filas de ``pacientes`` en ese orden."""
+        if not pacientes:
+            if not self._vacia:
+                self.listbox.delete(0, tk.END)
+                self.listbox.insert(tk.END, self.texto_vacio)
+                self._ids = []
+                self._cache.clear()
+                self._vacia = True
+            return
+        if self._vacia:
+            self.listbox.delete(0, tk.END)
+            self._vacia = False
+
+        # Quitar las filas de pacientes que ya no están (de abajo hacia arriba)
+        nuevos = {p.id for p in pacientes}
+        for i in range(len(self._ids) - 1, -1, -1):
+            if self._ids[i] not in nuevos:
+                self.listbox.delete(i)
+                self._cache.pop(self._ids.pop(i), None)
+
+        actuales = set(self._ids)
+        for i, p in enumerate(pacientes):
+            pid = p.id
+            anterior = self._cache.get(pid)
+            texto = self._texto(p)
+            if i < len(self._ids) and self._ids[i] == pid:
+                if anterior is not None and anterior[1] != texto:
+                    self.listbox.delete(i)
+                    self.listbox.insert(i, texto)
+                continue
+            if pid in actuales:
+                # Cambió de posición: se quita de donde estaba
+                j = self._ids.index(pid, i)
+                self.listbox.delete(j)
+                self._ids.pop(j)
+            self.listbox.insert(i, texto)
+            self._ids.insert(i, pid)
+            actuales.add(pid)
+
+
+class ListaVirtual:
+    """Muestra sólo la ventana visible de una lista de pacientes.
+
+    ``sincronizar`` recibe la lista completa (cualquier secuencia indexable)
+    pero sólo pasa al ``Listbox`` las filas desde ``inicio`` hasta llenar su
+    alto, usando ``ListaIncremental`` para esa ventana.
+    """
+
+    def __init__(self, listbox, render, texto_vacio, firma=None, scrollbar=None):
+        self.listbox = listbox
+        self.scrollbar = scrollbar
+        self.ventana = ListaIncremental(listbox, render, texto_vacio, firma)
+        self.pacientes = []
+        self.inicio = 0
+        self._visibles = int(listbox.cget('height')) or 10
+        if scrollbar is not None:
+            scrollbar.config(command=self.desplazar)
+            listbox.config(yscrollcommand='')
+        listbox.bind('<Configure>', self._al_redimensionar, add='+')
+        listbox.bind('<MouseWheel>', lambda e: self._rueda(-1 if e.delta > 0 else 1))
+        listbox.bind('<Button-4>', lambda e: self._rueda(-1))
+        listbox.bind('<Button-5>', lambda e: self._rueda(1))
+
+    def sincronizar(self, pacientes):
+        self.pacientes = pacientes
+        self._mostrar()
+
+    def _mostrar(self):
+        total = len(self.pacientes)
+        self.inicio = max(0, min(self.inicio, total - self._visibles))
+        self.ventana.sincronizar(self.pacientes[self.inicio:self.inicio + self._visibles])
+        self.listbox.yview_moveto(0)
+        if self.scrollbar is not None:
+            if total:
+                self.scrollbar.set(self.inicio / total, min(1.0, (self.inicio + self._visibles) / total))
+            else:
+                self.scrollbar.set(0.0, 1.0)
+
+    def desplazar(self, accion, cantidad, unidad=None):
+        """Recibe los comandos de la barra (``moveto`` y ``scroll``)."""
+        if accion == 'moveto':
+            self.inicio = int(float(cantidad) * len(self.pacientes))
+        elif accion == 'scroll':
+            paso = self._visibles if unidad == 'pages' else 1
+            self.inicio += int(cantidad) * paso
+        self._mostrar()
+
+    def _rueda(self, filas):
+        self.desplazar('scroll', filas * 3)
+        return 'break'
+
+    def _al_redimensionar(self, evento):
+        linea = self.listbox.tk.call('font', 'metrics', self.listbox.cget('font'), '-linespace')
+        visibles = max(1, evento.height // (int(linea) + 1))
+        if visibles != self._visibles:
+            self._visibles = visibles
+            self._mostrar()
@@ -0,0 +1,469 @@
+"""Vista de sólo lectura de la cola del día, mapeada en memoria.
+
+Las pantallas sólo muestran unas filas, pero cargar el snapshot y seguir el
+log les obliga a tener en memoria todos los pacientes del día. Por eso cada
+store que escribe en el log publica además, con el bloqueo de escritura
+tomado, los consultorios que cambiaron en ``datos_hospital.vista``:
+
+    cabecera    magia, secuencia, versión del log reflejada, fin de los
+                datos y bytes de basura
+    directorio  por consultorio: día, versión, posición y largo de su
+                tramo, cuántos esperan, cuántos se atendieron y el ritmo
+                de atención (``EstimadorEspera``)
+    cadenas     tabla de especialidades; las filas guardan el índice
+    tramos      filas de ancho fijo (``REGISTRO``): primero los pacientes
+                en espera, en orden de atención, y después los atendidos,
+                el más reciente primero; detrás, los nombres (cada fila
+                guarda la distancia hasta el suyo)
+
+Un tramo reescrito se agrega al final y el anterior queda como basura hasta
+que ocupa la mitad de los datos; entonces se compacta en el lugar. El
+archivo se crea con un tamaño fijo (``TAMANO_VISTA``) y nunca se agranda:
+en Windows no se puede cambiar el tamaño de un archivo que otras
+estaciones tienen mapeado.
+
+Los lectores leen el archivo con ``read`` comunes (sin mapearlo) y nunca
+toman el bloqueo (seqlock): el escritor deja la secuencia impar mientras
+escribe y la vuelve par al terminar, y el lector descarta lo que leyó si la
+secuencia cambió.
+``LectorVista`` devuelve ``FilasVista``, secuencias que sólo decodifican las
+filas que se piden, así la memoria de una pantalla no crece con el día.
+``version()`` lee un entero de la cabecera sin decodificar nada más.
+
+Windows no mantiene coherente entre máquinas un archivo de una carpeta
+compartida escrito por un mapa, así que la vista sólo se usa cuando los
+datos están en un disco local; en una carpeta de red las pantallas siguen
+con la réplica completa. SISTEMACOLAS_VISTA=1 la fuerza y =0 la apaga.
+"""
+import heapq
+import itertools
+import math
+import mmap
+import os
+import struct
+import sys
+import time
+from datetime import date
+
+from cola_hospital import ADELANTO_MIN, clave_prioridad
+from esquema import Paciente
+from estimacion import EstimadorEspera
+from serializacion import desde_segundos
+
+VARIABLE_VISTA = 'SISTEMACOLAS_VISTA'
+
+MAGIA = b'SCVM'
+FORMATO_VISTA = 1
+CABECERA = struct.Struct('<4sB3xQQQQ')  # Magia, formato, secuencia, versión, fin, basura
+POS_SECUENCIA = 8
+POS_VERSION = 16
+POS_FIN = 24
+# Consultorio, día, versión, inicio, largo, en espera, atendidos, media, segundos del último llamado
+ENTRADA = struct.Struct('<40sIQQIIIdd')
+# Id, registro, atención, orden, distancia al nombre, largo del nombre, atendido, prioridad, especialidad.
+# El orden es ``clave_prioridad`` en los que esperan y la hora de atención en los atendidos.
+REGISTRO = struct.Struct('<IIIIIHBBH')
+POS_ORDEN = 12  # Dentro del registro
+CADENA = struct.Struct('<40s')
+MAX_CONSULTORIOS = 64
+MAX_CADENAS = 128
+POS_DIRECTORIO = 64
+POS_CADENAS = POS_DIRECTORIO + MAX_CONSULTORIOS * ENTRADA.size
+POS_DATOS = POS_CADENAS + MAX_CADENAS * CADENA.size
+TAMANO_VISTA = 16 * 1024 * 1024  # Unos 60 bytes por paciente: sobra para un día aun con la basura
+BASURA_MINIMA = 64 * 1024  # Por debajo no vale la pena compactar
+SIN_ESPECIALIDAD = 0xFFFF
+DRIVE_REMOTE = 4  # GetDriveTypeW
+SISTEMAS_DE_RED = {'nfs', 'nfs4', 'cifs', 'smb3', 'smbfs', 'sshfs', 'fuse.sshfs', '9p', 'afs', 'ceph', 'glusterfs'}
+ESPERA_MAXIMA_S = 0.5  # Una secuencia impar por más tiempo es una escritura interrumpida
+
+
+class VistaCambiada(Exception):
+    """La vista sigue a medio escribir (una estación se cayó escribiéndola); se reescribe con el próximo evento."""
+
+
+def habilitada(archivo_datos):
+    """Indica si se publica y se lee la vista de ``archivo_datos``."""
+    valor = os.environ.get(VARIABLE_VISTA, '')
+    if valor:
+        return valor != '0'
+    return es_local(archivo_datos)
+
+
+def es_local(ruta):
+    """Indica si ``ruta`` está en un disco local y no en una carpeta compartida de la red."""
+    ruta = os.path.realpath(ruta)
+    if sys.platform == 'win32':
+        import ctypes  # Importación diferida: sólo en Windows
+
+        unidad = os.path.splitdrive(ruta)[0]
+        if not unidad or unidad.startswith('\\\\'):
+            return False  # Ruta UNC (\\servidor\carpeta)
+        return ctypes.windll.kernel32.GetDriveTypeW(unidad + '\\') != DRIVE_REMOTE
+    try:
+        with open('/proc/mounts', encoding='utf-8') as f:
+            montajes = [linea.split()[1:3] for linea in f]
+    except OSError:
+        return False  # Sin forma de saberlo: sólo si se pide con SISTEMACOLAS_VISTA=1
+    tipo, largo = None, -1
+    for punto, sistema in montajes:
+        punto = punto.replace('\\040', ' ')
+        dentro = ruta == punto or ruta.startswith(punto.rstrip('/') + '/')
+        if dentro and len(punto) > largo:
+            tipo, largo = sistema, len(punto)
+    return tipo is not None and tipo not in SISTEMAS_DE_RED
+
+
+def ruta_vista(archivo_datos):
+    return os.path.splitext(archivo_datos)[0] + '.vista'
+
+
+def _a_bytes(texto, largo):
+    return texto.encode('utf-8')[:largo]  # Un carácter cortado se descarta al leer
+
+
+def _a_texto(datos):
+    return datos.rstrip(b'\0').decode('utf-8', 'ignore')
+
+
+def _ordinal(dia):
+    return date.fromisoformat(dia).toordinal()
+
+
+def _orden_espera(p):
+    """``clave_prioridad`` sin el turno, como entero no negativo (el turno va en la fila)."""
+    minuto, segundo, _ = clave_prioridad(p)
+    return (minuto + max(ADELANTO_MIN)) * 60 + int(segundo)
+
+
+class PublicadorVista:
+    """Reescribe los tramos de la vista; se usa con el bloqueo de escritura del log tomado."""
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._archivo = None
+        self._mapa = None
+        self._dia = None
+        self._campos = {}  # id -> (fecha de atención, registro, atención, orden, nombre) ya codificados
+
+    def cerrar(self):
+        if self._mapa is not None:
+            self._mapa.close()
+            self._archivo.close()
+            self._mapa = self._archivo = None
+
+    def _preparar(self):
+        """Mapa de escritura de la vista; crea el archivo con su tamaño fijo o lo reinicia."""
+        if self._mapa is not None and len(self._mapa) < os.fstat(self._archivo.fileno()).st_size:
+            self.cerrar()  # Otra estación llevó una vista anterior al tamaño fijo
+        if self._mapa is None:
+            self._archivo = open(self.ruta, 'r+b' if os.path.exists(self.ruta) else 'w+b')
+            if os.fstat(self._archivo.fileno()).st_size < TAMANO_VISTA:
+                try:
+                    self._archivo.truncate(TAMANO_VISTA)
+                except OSError:
+                    pass  # Vista de una versión anterior mapeada por otra estación (Windows): se usa como está
+            self._mapa = mmap.mmap(self._archivo.fileno(), 0)
+        if self._mapa[:5] != MAGIA + bytes([FORMATO_VISTA]):
+            self._mapa[:POS_DATOS] = bytes(POS_DATOS)
+            CABECERA.pack_into(self._mapa, 0, MAGIA, FORMATO_VISTA, 0, 0, POS_DATOS, 0)
+        return self._mapa
+
+    def publicar(self, store, consultorios, hoy):
+        """Escribe el estado de ``consultorios`` en ``store`` (que debe cargarlos completos)."""
+        mapa = self._preparar()
+        cadenas = [_a_texto(CADENA.unpack_from(mapa, POS_CADENAS + i * CADENA.size)[0]) for i in range(MAX_CADENAS)]
+        indices = {c: i for i, c in enumerate(cadenas) if c}
+        nuevas = {}
+
+        def indice(especialidad):
+            if especialidad not in indices:
+                libre = next((i for i, c in enumerate(cadenas) if not c and i not in nuevas.values()), None)
+                if libre is None:
+                    return SIN_ESPECIALIDAD
+                indices[especialidad] = nuevas[especialidad] = libre
+            return indices[especialidad]
+
+        if hoy != self._dia:
+            self._dia = hoy
+            self._campos = {}
+
+        def campos(p):
+            # Cada consultorio se reescribe entero: sólo se codifica lo que cambió desde la última vez
+            guardados = self._campos.get(p.id)
+            if guardados is None or guardados[0] != p.fecha_atencion:
+                atencion = p.segundos_atencion
+                guardados = self._campos[p.id] = (p.fecha_atencion, p.segundos_registro, atencion,
+                                                  atencion if p.atendido else _orden_espera(p),
+                                                  p.nombre.encode('utf-8'))
+            return guardados
+
+        tramos = {}
+        for c in consultorios:
+            espera = store.cola.en_espera(c, hoy)
+            atendidos = store.cola.atendidos(c, hoy)  # En el orden de la réplica (hora de atención y turno)
+            filas = [(p, campos(p)) for p in itertools.chain(espera, atendidos)]
+            registros = []
+            distancia = len(filas) * REGISTRO.size
+            for i, (p, (_, registro, atencion, orden, nombre)) in enumerate(filas):
+                registros.append(REGISTRO.pack(p.id, registro, atencion, orden, distancia - i * REGISTRO.size,
+                                               len(nombre), int(p.atendido), p.prioridad, indice(p.especialidad)))
+                distancia += len(nombre)
+            nombres = [f[1][4] for f in filas]
+            media, ultimo = store.estimador.estado(c)
+            tramos[c] = (b''.join(registros) + b''.join(nombres), len(espera), len(atendidos),
+                         math.nan if media is None else media, math.nan if ultimo is None else ultimo)
+        self._escribir(tramos, nuevas, store.version, _ordinal(hoy))
+
+    def _escribir(self, tramos, nuevas, version, dia):
+        mapa = self._mapa
+        _, _, secuencia, _, fin, basura = CABECERA.unpack_from(mapa, 0)
+        directorio = {}
+        libres = []
+        for i in range(MAX_CONSULTORIOS):
+            entrada = ENTRADA.unpack_from(mapa, POS_DIRECTORIO + i * ENTRADA.size)
+            nombre = _a_texto(entrada[0])
+            if nombre and entrada[1] == dia:
+                directorio[nombre] = (i, entrada)
+            else:
+                libres.append(i)  # Vacía o de otro día
+        total = sum(len(t[0]) for t in tramos.values())
+        # Lo que sigue vigente; el resto (tramos reemplazados o de otro día) es basura
+        vivos = sum(e[4] for n, (_, e) in directorio.items() if n not in tramos)
+        basura = fin - POS_DATOS - vivos
+
+        # Impar mientras se escribe; si una estación se cayó a mitad, la secuencia ya era impar
+        secuencia |= 1
+        struct.pack_into('<Q', mapa, POS_SECUENCIA, secuencia)
+        if basura > max(vivos + total, BASURA_MINIMA) or fin + total > len(mapa):
+            # Compactar: los tramos de los demás consultorios se copian al principio
+            otros = [(i, e, mapa[e[3]:e[3] + e[4]])
+                     for n, (i, e) in directorio.items() if n not in tramos]
+            fin = POS_DATOS
+            for i, entrada, datos in otros:
+                mapa[fin:fin + len(datos)] = datos
+                ENTRADA.pack_into(mapa, POS_DIRECTORIO + i * ENTRADA.size, *entrada[:3], fin, *entrada[4:])
+                fin += len(datos)
+            basura = 0
+            for i in libres:  # Los tramos de días anteriores ya no ocupan lugar
+                mapa[POS_DIRECTORIO + i * ENTRADA.size:POS_DIRECTORIO + (i + 1) * ENTRADA.size] = bytes(ENTRADA.size)
+        for especialidad, i in nuevas.items():
+            CADENA.pack_into(mapa, POS_CADENAS + i * CADENA.size, _a_bytes(especialidad, 40))
+        for nombre, (datos, en_espera, atendidos, media, ultimo) in tramos.items():
+            if nombre in directorio:
+                i = directorio[nombre][0]
+            elif libres:
+                i = libres.pop(0)
+            else:
+                print(f"Vista: no hay lugar para {nombre}")
+                continue
+            if fin + len(datos) > len(mapa):
+                # Sin lugar aun compactando: el consultorio queda vacío antes que con datos viejos
+                print(f"Vista: no hay lugar para {nombre}")
+                mapa[POS_DIRECTORIO + i * ENTRADA.size:POS_DIRECTORIO + (i + 1) * ENTRADA.size] = bytes(ENTRADA.size)
+                continue
+            mapa[fin:fin + len(datos)] = datos
+            ENTRADA.pack_into(mapa, POS_DIRECTORIO + i * ENTRADA.size, _a_bytes(nombre, 40), dia, version,
+                              fin, len(datos), en_espera, atendidos, media, ultimo)
+            fin += len(datos)
+        CABECERA.pack_into(mapa, 0, MAGIA, FORMATO_VISTA, secuencia + 1, version, fin, basura)
+
+
+class FilasVista:
+    """Pacientes del día de uno o varios consultorios, decodificados al pedirlos.
+
+    Secuencia para ``ListaVirtual``: los que esperan en orden de atención o
+    los atendidos, el más reciente primero. Para ordenar sólo se lee el campo
+    de orden y el turno de cada fila. Si la vista cambió desde la última
+    lectura (por ejemplo, al desplazar la lista) se vuelven a tomar los
+    tramos antes de decodificar, así el largo puede cambiar.
+
+    ``delante`` guarda, de cada paciente en espera ya decodificado, cuántos
+    tiene antes en su consultorio.
+    """
+
+    def __init__(self, lector, dia, consultorio=None, atendidos=False):
+        self._lector = lector
+        self._dia = dia
+        self._consultorio = consultorio
+        self._atendidos = atendidos
+        self.delante = {}
+        self._secuencia = None
+        self._secuencia, (self._tramos, self._cadenas) = lector._consistente(self._directorio)
+
+    def _directorio(self):
+        """Los tramos ([(consultorio, primera posición, cantidad)]) y especialidades vigentes."""
+        if self._secuencia is not None and self._lector.secuencia() == self._secuencia:
+            return self._tramos, self._cadenas
+        return self._lector._tramos(self._dia, self._consultorio, self._atendidos)
+
+    def __len__(self):
+        return sum(n for _, _, n in self._tramos)
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def _recorrer(self, consultorio, inicio, cantidad):
+        """(clave de orden, consultorio, posición, índice en el tramo) de cada fila, sin decodificarla."""
+        bloque = self._lector._leer(inicio, cantidad * REGISTRO.size)  # Todo el tramo en una lectura
+        for i in range(cantidad):
+            id_, = struct.unpack_from('<I', bloque, i * REGISTRO.size)
+            orden, = struct.unpack_from('<I', bloque, i * REGISTRO.size + POS_ORDEN)
+            yield (orden, id_), consultorio, inicio + i * REGISTRO.size, i
+
+    def _filas(self, tramos, cadenas, desde, hasta, paso):
+        if len(tramos) == 1:
+            consultorio, inicio, _ = tramos[0]
+            seleccion = ((None, consultorio, inicio + i * REGISTRO.size, i) for i in range(desde, hasta, paso))
+        else:
+            todos = heapq.merge(*(self._recorrer(*t) for t in tramos), reverse=self._atendidos)
+            seleccion = itertools.islice(todos, desde, hasta, paso)
+        filas = []
+        for _, consultorio, posicion, i in seleccion:
+            p = self._lector._paciente(consultorio, posicion, cadenas)
+            if not self._atendidos:
+                self.delante[p.id] = i
+            filas.append(p)
+        return filas
+
+    def __getitem__(self, indice):
+        def leer():
+            # Si la vista cambió se toman de nuevo los tramos, en la misma lectura consistente
+            tramos, cadenas = self._directorio()
+            largo = sum(n for _, _, n in tramos)
+            if isinstance(indice, slice):
+                rango = indice.indices(largo)
+            else:
+                i = indice + largo if indice < 0 else indice
+                if not 0 <= i < largo:
+                    return tramos, cadenas, None
+                rango = (i, i + 1, 1)
+            return tramos, cadenas, self._filas(tramos, cadenas, *rango)
+
+        self._secuencia, (self._tramos, self._cadenas, filas) = self._lector._consistente(leer)
+        if isinstance(indice, slice):
+            return filas
+        if not filas:
+            raise IndexError(indice)
+        return filas[0]
+
+
+class LectorVista:
+    """Lee la vista sin bloqueos; ofrece lo que las pantallas piden a ``ColaHospital``."""
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._archivo = open(ruta, 'rb', buffering=0)  # Sin búfer: cada lectura ve lo último escrito
+        if self._leer(0, 5) != MAGIA + bytes([FORMATO_VISTA]):
+            self.cerrar()
+            raise ValueError(f"{ruta} no es una vista de la cola")
+
+    @classmethod
+    def abrir(cls, ruta):
+        """El lector, o None si la vista todavía no existe."""
+        try:
+            return cls(ruta)
+        except (OSError, ValueError):
+            return None
+
+    def cerrar(self):
+        self._archivo.close()
+
+    def _leer(self, posicion, largo):
+        self._archivo.seek(posicion)
+        return self._archivo.read(largo)
+
+    def _entero(self, posicion):
+        return struct.unpack('<Q', self._leer(posicion, 8))[0]
+
+    def secuencia(self):
+        return self._entero(POS_SECUENCIA)
+
+    def version(self):
+        """Versión del log que refleja la vista (un entero de la cabecera, sin decodificar nada)."""
+        return self._consistente(lambda: self._entero(POS_VERSION))[1]
+
+    def _consistente(self, leer):
+        """(secuencia, ``leer()``) sin que un escritor haya cambiado la vista en el medio."""
+        impar = limite = None
+        while True:
+            antes = self.secuencia()
+            if antes % 2:
+                if antes != impar:  # Otra escritura: el plazo cuenta desde que empezó
+                    impar, limite = antes, time.monotonic() + ESPERA_MAXIMA_S
+                elif time.monotonic() > limite:
+                    raise VistaCambiada("La vista quedó a medio escribir")
+                time.sleep(0.0005)  # Escritura en curso: se cede la CPU al escritor
+                continue
+            try:
+                valor = leer()
+            except Exception:
+                if self.secuencia() == antes:
+                    raise
+                continue  # Leyó un tramo a medio escribir
+            if self.secuencia() == antes:
+                return antes, valor
+
+    def _directorio(self, dia):
+        """[(consultorio, entrada)] de los tramos de ``dia``, y la tabla de especialidades."""
+        ordinal = _ordinal(dia)
+        bloque = self._leer(POS_DIRECTORIO, POS_DATOS - POS_DIRECTORIO)  # Directorio y cadenas juntos
+        tramos = []
+        for i in range(MAX_CONSULTORIOS):
+            entrada = ENTRADA.unpack_from(bloque, i * ENTRADA.size)
+            if entrada[1] == ordinal and entrada[0][0]:
+                tramos.append((_a_texto(entrada[0]), entrada))
+        cadenas = [_a_texto(CADENA.unpack_from(bloque, POS_CADENAS - POS_DIRECTORIO + i * CADENA.size)[0])
+                   for i in range(MAX_CADENAS)]
+        return tramos, cadenas
+
+    def _paciente(self, consultorio, posicion, cadenas):
+        id_, registro, atencion, _, distancia, largo, atendido, prioridad, especialidad = \
+            REGISTRO.unpack(self._leer(posicion, REGISTRO.size))
+        nombre = self._leer(posicion + distancia, largo)
+        return Paciente(id_, nombre.decode('utf-8'), '' if especialidad == SIN_ESPECIALIDAD else cadenas[especialidad],
+                        consultorio, desde_segundos(registro), bool(atendido), desde_segundos(atencion), prioridad)
+
+    def _tramos(self, dia, consultorio=None, atendidos=False):
+        """[(consultorio, primera posición, cantidad)] de los que esperan o de los atendidos."""
+        tramos, cadenas = self._directorio(dia)
+        return [(nombre, e[3] + e[5] * REGISTRO.size, e[6]) if atendidos else (nombre, e[3], e[5])
+                for nombre, e in tramos if consultorio is None or nombre == consultorio], cadenas
+
+    def en_espera(self, consultorio, dia):
+        """Pacientes en espera del consultorio, en orden de atención."""
+        return FilasVista(self, dia, consultorio)
+
+    def espera_del_dia(self, dia):
+        """Todos los pacientes en espera del día, en orden de atención."""
+        return FilasVista(self, dia)
+
+    def historial(self, consultorio, dia):
+        """Atendidos del consultorio, el más reciente primero."""
+        return FilasVista(self, dia, consultorio, atendidos=True)
+
+    def atendidos_del_dia(self, dia):
+        return FilasVista(self, dia, atendidos=True)
+
+    def paciente(self, paciente_id, dia):
+        """Busca un paciente del día por su turno (sólo se decodifica el que coincide)."""
+        def buscar():
+            tramos, cadenas = self._directorio(dia)
+            for nombre, e in tramos:
+                bloque = self._leer(e[3], (e[5] + e[6]) * REGISTRO.size)
+                for i in range(e[5] + e[6]):
+                    if struct.unpack_from('<I', bloque, i * REGISTRO.size)[0] == paciente_id:
+                        return self._paciente(nombre, e[3] + i * REGISTRO.size, cadenas)
+            return None
+        return self._consistente(buscar)[1]
+
+    def estimador(self, dia):
+        """``EstimadorEspera`` con el ritmo de atención que publicó cada consultorio."""
+        def leer():
+            estimador = EstimadorEspera()
+            for nombre, e in self._directorio(dia)[0]:
+                media, ultimo = e[7], e[8]
+                estimador.fijar(nombre, None if math.isnan(media) else media,
+                                None if math.isnan(ultimo) else int(ultimo))
+            return estimador
+        return self._consistente(leer)[1]